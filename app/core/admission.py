@@ -0,0 +1,239 @@
+"""
+프로바이더별 Admission Control
+Gemini, HuggingFace(fal-ai/nebius/nscale), Ollama 등 업스트림 호출 전에
+동시 실행 수와 초당 요청 수(QPS)를 제한하고, 대기열이 가득 차면 즉시 거절합니다.
+
+- 동시 실행 한도를 넘는 요청은 크기가 제한된 대기열에서 timeout까지 대기합니다.
+- 대기열이 가득 찼거나 대기 시간을 넘기면 503 + Retry-After
+- QPS 한도로 대기 시간 안에 처리할 수 없으면 429 + Retry-After
+"""
+import asyncio
+import math
+import time
+from typing import Dict, Optional
+from app.core.config import (
+    ADMISSION_LIMITS,
+    ADMISSION_DEFAULT_CONCURRENCY,
+    ADMISSION_DEFAULT_QPS,
+    ADMISSION_DEFAULT_QUEUE,
+    ADMISSION_DEFAULT_TIMEOUT,
+)
+from app.core.exceptions import service_unavailable, too_many_requests
+from app.core.metrics import get_metrics_registry
+
+
+class Permit:
+    """확보한 실행 슬롯 (release는 여러 번 호출해도 한 번만 반영)"""
+
+    def __init__(self, limiter: "_Limiter"):
+        self._limiter = limiter
+        self._released = False
+        self.acquired_at = time.monotonic()
+
+    def release(self) -> None:
+        if not self._released:
+            self._released = True
+            self._limiter._release(time.monotonic() - self.acquired_at)
+
+    async def __aenter__(self) -> "Permit":
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        self.release()
+
+
+class _Limiter:
+    """동시 실행 수 + 토큰 버킷(QPS) + 제한된 대기열"""
+
+    def __init__(self, name: str, concurrency: int, qps: float, queue: int, timeout: float):
+        self.name = name
+        self.concurrency = concurrency
+        self.qps = qps
+        self.max_queue = queue
+        self.timeout = timeout
+        self.active = 0
+        self.waiting = 0
+        self.rejected = 0
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._burst = max(1.0, qps)
+        self._tokens = self._burst
+        self._refilled_at = time.monotonic()
+        self._hold_avg = 1.0  # 슬롯 점유 시간 이동 평균 (Retry-After 추정용)
+
+    def _retry_after(self) -> int:
+        """현재 대기열이 비워질 때까지의 예상 시간(초)"""
+        backlog = self.waiting + 1
+        return max(1, math.ceil(self._hold_avg * backlog / max(1, self.concurrency)))
+
+    def _take_token(self) -> float:
+        """QPS 토큰 하나를 소비. 토큰이 없으면 다음 토큰까지 남은 시간 반환"""
+        if self.qps <= 0:
+            return 0.0
+        now = time.monotonic()
+        self._tokens = min(self._burst, self._tokens + (now - self._refilled_at) * self.qps)
+        self._refilled_at = now
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return 0.0
+        return (1 - self._tokens) / self.qps
+
+    def _refund_token(self) -> None:
+        """슬롯을 확보하지 못한 요청이 소비한 QPS 토큰 반환 (과부하 중 QPS 용량이 소진되지 않도록)"""
+        if self.qps > 0:
+            self._tokens = min(self._burst, self._tokens + 1)
+
+    async def acquire(self, timeout: Optional[float] = None) -> Permit:
+        timeout = self.timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        started = time.monotonic()
+        registry = get_metrics_registry()
+
+        # 빈 슬롯이 없고 대기열도 가득 찬 경우 즉시 거절
+        if self._semaphore.locked() and self.waiting >= self.max_queue:
+            self._reject("queue_full")
+            raise service_unavailable(
+                "upstream_overloaded",
+                self._retry_after(),
+                {"provider": self.name, "reason": "queue_full", "queue_depth": self.waiting},
+            )
+
+        self.waiting += 1
+        try:
+            # QPS 제한: 다음 토큰까지 기다릴 수 있으면 대기, 아니면 429
+            while True:
+                wait = self._take_token()
+                if wait == 0:
+                    break
+                if time.monotonic() + wait > deadline:
+                    self._reject("rate_limited")
+                    raise too_many_requests(
+                        "upstream_rate_limited",
+                        max(1, math.ceil(wait)),
+                        {"provider": self.name, "reason": "rate_limited", "qps": self.qps},
+                    )
+                await asyncio.sleep(wait)
+
+            # 동시 실행 제한: 빈 슬롯이 있으면 즉시 확보, 없으면 남은 시간 동안 대기
+            try:
+                if not self._semaphore.locked():
+                    await self._semaphore.acquire()
+                else:
+                    await asyncio.wait_for(self._semaphore.acquire(), max(0.0, deadline - time.monotonic()))
+            except asyncio.CancelledError:
+                self._refund_token()
+                raise
+            except asyncio.TimeoutError:
+                self._refund_token()
+                self._reject("timeout")
+                raise service_unavailable(
+                    "upstream_overloaded",
+                    self._retry_after(),
+                    {"provider": self.name, "reason": "queue_timeout", "queue_depth": self.waiting},
+                )
+        finally:
+            self.waiting -= 1
+
+        self.active += 1
+        registry.observe("admission_wait_seconds", time.monotonic() - started, limiter=self.name)
+        return Permit(self)
+
+    async def try_acquire(self) -> Optional[Permit]:
+        """대기 없이 확보할 수 있을 때만 슬롯 확보 (대기 중인 요청이 있거나 빈 슬롯/QPS 토큰이 없으면 None)"""
+        if self.waiting or self._semaphore.locked() or self._take_token() > 0:
+            return None
+        # 빈 슬롯이 있으므로 대기 없이 바로 반환됨
+        await self._semaphore.acquire()
+        self.active += 1
+        return Permit(self)
+
+    def _release(self, held: float) -> None:
+        self.active -= 1
+        self._hold_avg += 0.2 * (held - self._hold_avg)
+        self._semaphore.release()
+
+    def _reject(self, reason: str) -> None:
+        self.rejected += 1
+        get_metrics_registry().inc("admission_rejected_total", limiter=self.name, reason=reason)
+        print(f"⚠️ Admission 거절 ({self.name}, {reason}, 대기 {self.waiting}, 실행 {self.active})")
+
+    def stats(self) -> dict:
+        return {
+            "concurrency": self.concurrency,
+            "qps": self.qps,
+            "active": self.active,
+            "queue_depth": self.waiting,
+            "max_queue": self.max_queue,
+            "rejected": self.rejected,
+            "avg_hold_seconds": round(self._hold_avg, 3),
+        }
+
+
+class AdmissionController:
+    """프로바이더/모델별 Limiter 관리"""
+
+    def __init__(self, limits: Dict[str, dict] = None):
+        self.limits = ADMISSION_LIMITS if limits is None else limits
+        self._limiters: Dict[str, _Limiter] = {}
+
+    def _limiter_for(self, provider: str, model: Optional[str]) -> _Limiter:
+        # "프로바이더/모델" 설정이 있으면 모델 전용 Limiter, 없으면 프로바이더 공용 Limiter
+        name = f"{provider}/{model}" if model and f"{provider}/{model}" in self.limits else provider
+        limiter = self._limiters.get(name)
+        if limiter is None:
+            config = self.limits.get(name, {})
+            limiter = _Limiter(
+                name,
+                concurrency=int(config.get("concurrency", ADMISSION_DEFAULT_CONCURRENCY)),
+                qps=float(config.get("qps", ADMISSION_DEFAULT_QPS)),
+                queue=int(config.get("queue", ADMISSION_DEFAULT_QUEUE)),
+                timeout=float(config.get("timeout", ADMISSION_DEFAULT_TIMEOUT)),
+            )
+            self._limiters[name] = limiter
+        return limiter
+
+    async def acquire(self, provider: str, model: Optional[str] = None, timeout: Optional[float] = None) -> Permit:
+        """
+        업스트림 호출 슬롯 확보
+
+        Raises:
+            APIError: 대기열 초과/대기 시간 초과(503), QPS 초과(429). Retry-After 헤더 포함
+        """
+        return await self._limiter_for(provider, model).acquire(timeout)
+
+    async def try_acquire(self, provider: str, model: Optional[str] = None) -> Optional[Permit]:
+        """
+        대기열을 거치지 않는 슬롯 확보 (헤지 요청처럼 여유가 있을 때만 보내는 호출용)
+
+        Returns:
+            바로 확보한 Permit, 빈 슬롯이 없으면 None (거절로 집계하지 않음)
+        """
+        return await self._limiter_for(provider, model).try_acquire()
+
+    def slot(self, provider: str, model: Optional[str] = None, timeout: Optional[float] = None) -> "_SlotContext":
+        """async with admission.slot("fal-ai", model): ... 형태로 사용"""
+        return _SlotContext(self, provider, model, timeout)
+
+    def stats(self) -> dict:
+        return {name: limiter.stats() for name, limiter in self._limiters.items()}
+
+
+class _SlotContext:
+    def __init__(self, controller: AdmissionController, provider: str, model: Optional[str], timeout: Optional[float]):
+        self._controller = controller
+        self._args = (provider, model, timeout)
+        self._permit: Optional[Permit] = None
+
+    async def __aenter__(self) -> Permit:
+        self._permit = await self._controller.acquire(*self._args)
+        return self._permit
+
+    async def __aexit__(self, *exc) -> None:
+        self._permit.release()
+
+
+admission = AdmissionController()
+get_metrics_registry().register_gauge("admission", admission.stats)
+
+
+def get_admission_controller() -> AdmissionController:
+    return admission
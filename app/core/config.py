@@ -3,6 +3,7 @@
 프로젝트 전체에서 사용하는 환경 변수를 중앙에서 관리합니다.
 """
 import os
+import json
 from pathlib import Path
 from dotenv import load_dotenv
 
@@ -36,6 +37,155 @@ PORT = int(os.getenv("PORT", "8502"))
 # ============================================
 GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-2.5-flash")
 
+# ============================================
+# 생성 결과 캐시 저장 위치 (디스크 계층)
+# ============================================
+RESULT_CACHE_DIR = Path(os.getenv("RESULT_CACHE_DIR", str(BASE_DIR / ".cache")))
+
+# 생성 이미지 저장소 (SHA-256 digest로 저장, GET /api/image/{digest}로 제공)
+IMAGE_STORE_DIR = Path(os.getenv("IMAGE_STORE_DIR", str(RESULT_CACHE_DIR / "images")))
+IMAGE_STORE_MAX_MB = int(os.getenv("IMAGE_STORE_MAX_MB", "1024"))  # 초과 시 오래 사용하지 않은 이미지부터 삭제
+
+# 이미지 생성 결과 캐시 (모델 + 프롬프트 + 기본 이미지 해시 + 파라미터 → 저장소 digest, fresh=true로 우회)
+# 이미지 바이트는 이미지 저장소에 있으므로 용량(바이트) 기준 LRU는 IMAGE_STORE_MAX_MB를 따름
+IMAGE_CACHE_ENABLED = os.getenv("IMAGE_CACHE_ENABLED", "True").lower() == "true"
+IMAGE_CACHE_TTL = int(os.getenv("IMAGE_CACHE_TTL", "604800"))  # 초
+IMAGE_CACHE_MEMORY_ENTRIES = int(os.getenv("IMAGE_CACHE_MEMORY_ENTRIES", "512"))  # 메모리 계층 최대 항목 수
+IMAGE_CACHE_DISK_ENTRIES = int(os.getenv("IMAGE_CACHE_DISK_ENTRIES", "20000"))  # 디스크 계층 최대 항목 수 (0 = 사용 안 함)
+
+# 이미지 생성 비동기 작업 (POST /image/jobs/*, 워커 프로세스마다 별도 워커 풀)
+IMAGE_JOB_WORKERS = int(os.getenv("IMAGE_JOB_WORKERS", "4"))  # 동시에 실행할 작업 수
+IMAGE_JOB_QUEUE_SIZE = int(os.getenv("IMAGE_JOB_QUEUE_SIZE", "100"))  # 대기 작업 최대 수 (초과 시 503)
+IMAGE_JOB_TTL = int(os.getenv("IMAGE_JOB_TTL", "3600"))  # 완료된 작업 결과 보관 시간(초)
+IMAGE_JOB_SSE_HEARTBEAT = float(os.getenv("IMAGE_JOB_SSE_HEARTBEAT", "15"))  # SSE 연결 유지용 주석 전송 간격(초)
+IMAGE_JOB_STALE_AFTER = int(os.getenv("IMAGE_JOB_STALE_AFTER", "1800"))  # 제출 후 N초가 지나도 끝나지 않은 스냅샷은 실패로 취급(초)
+
+# 입력 이미지 정규화 (EXIF 회전 적용, 메타데이터 제거, 모델별 최대 해상도로 축소 후 재인코딩)
+IMAGE_INPUT_NORMALIZE = os.getenv("IMAGE_INPUT_NORMALIZE", "True").lower() == "true"
+IMAGE_INPUT_WORKERS = int(os.getenv("IMAGE_INPUT_WORKERS", "2"))  # 디코딩/인코딩 전용 스레드 수
+IMAGE_INPUT_MAX_PIXELS = int(os.getenv("IMAGE_INPUT_MAX_PIXELS", "50000000"))  # 초과 시 400 (압축 폭탄 방지)
+IMAGE_INPUT_QUALITY = int(os.getenv("IMAGE_INPUT_QUALITY", "90"))  # JPEG 재인코딩 품질
+
+# multipart 이미지 업로드 (POST /image/generate/upload, /image/modify/upload)
+IMAGE_UPLOAD_MAX_MB = int(os.getenv("IMAGE_UPLOAD_MAX_MB", "20"))  # 파일 하나의 최대 크기, 읽는 도중 초과하면 413
+IMAGE_UPLOAD_MAX_FILES = int(os.getenv("IMAGE_UPLOAD_MAX_FILES", "5"))  # 기본 이미지 + 인물 사진 + 스타일 참고 사진 3장
+
+# 여러 모델 동시 비교 (POST /image/compare)
+IMAGE_COMPARE_MAX_MODELS = int(os.getenv("IMAGE_COMPARE_MAX_MODELS", "6"))  # 한 요청에서 비교할 최대 모델 수
+IMAGE_COMPARE_TIMEOUT_MS = int(os.getenv("IMAGE_COMPARE_TIMEOUT_MS", "90000"))  # 모델별 제한 시간 (요청의 timeout_ms로 덮어쓰기 가능)
+
+# model="auto": 후보 모델 중 최근 지연 시간/오류율(EWMA)이 가장 좋은 모델로 보내고, 실패/시간 초과 시 다음 후보로 전환
+IMAGE_AUTO_MODELS = [m.strip() for m in os.getenv("IMAGE_AUTO_MODELS", "flux-schnell,sdxl,flux-dev,flux,playground").split(",") if m.strip()]  # 비슷한 결과를 내는 후보 (우선순위 순)
+IMAGE_AUTO_BUDGET_MS = int(os.getenv("IMAGE_AUTO_BUDGET_MS", "150000"))  # 전환을 포함한 요청 전체 제한 시간
+IMAGE_AUTO_ATTEMPT_TIMEOUT_MS = int(os.getenv("IMAGE_AUTO_ATTEMPT_TIMEOUT_MS", "60000"))  # 후보 하나의 제한 시간
+IMAGE_AUTO_DEFAULT_LATENCY = float(os.getenv("IMAGE_AUTO_DEFAULT_LATENCY", "20"))  # 기록이 없는 모델의 예상 지연 시간(초)
+IMAGE_AUTO_MAX_ERROR_RATE = float(os.getenv("IMAGE_AUTO_MAX_ERROR_RATE", "0.5"))  # 이보다 오류율이 높으면 비정상으로 보고 후순위
+IMAGE_AUTO_COOLDOWN = float(os.getenv("IMAGE_AUTO_COOLDOWN", "60"))  # 비정상 모델을 마지막 실패 후 N초 동안 제외
+
+# HuggingFace Inference 호출 제한 시간(초): 호출 측이 먼저 포기해도 스레드가 이 시간 이상 남지 않음
+HF_REQUEST_TIMEOUT = float(os.getenv("HF_REQUEST_TIMEOUT", str(IMAGE_AUTO_ATTEMPT_TIMEOUT_MS / 1000)))
+
+# ============================================
+# Gemini 프롬프트 프리픽스 캐시 설정
+# ============================================
+GEMINI_PREFIX_CACHE_ENABLED = os.getenv("GEMINI_PREFIX_CACHE_ENABLED", "True").lower() == "true"
+GEMINI_PREFIX_CACHE_TTL = int(os.getenv("GEMINI_PREFIX_CACHE_TTL", "3600"))  # 초
+GEMINI_PREFIX_CACHE_REFRESH_MARGIN = int(os.getenv("GEMINI_PREFIX_CACHE_REFRESH_MARGIN", "300"))  # 만료 N초 전 갱신
+GEMINI_PREFIX_CACHE_RETRY_AFTER = int(os.getenv("GEMINI_PREFIX_CACHE_RETRY_AFTER", "600"))  # 등록 실패 후 재시도 간격(초)
+
+# ============================================
+# Gemini 참조 이미지 업로드 캐시 설정 (Files API)
+# ============================================
+GEMINI_FILE_CACHE_ENABLED = os.getenv("GEMINI_FILE_CACHE_ENABLED", "True").lower() == "true"
+GEMINI_FILE_CACHE_BACKEND = os.getenv("GEMINI_FILE_CACHE_BACKEND", "genai").lower()  # genai, local (테스트/오프라인용)
+GEMINI_FILE_CACHE_TTL = int(os.getenv("GEMINI_FILE_CACHE_TTL", "172800"))  # 초 (Files API 보관 기간 48시간)
+GEMINI_FILE_CACHE_REFRESH_MARGIN = int(os.getenv("GEMINI_FILE_CACHE_REFRESH_MARGIN", "3600"))  # 만료 N초 전부터 다시 업로드
+GEMINI_FILE_CACHE_MIN_BYTES = int(os.getenv("GEMINI_FILE_CACHE_MIN_BYTES", "65536"))  # 이보다 작은 이미지는 inline 전송
+GEMINI_FILE_CACHE_PRUNE_INTERVAL = float(os.getenv("GEMINI_FILE_CACHE_PRUNE_INTERVAL", "600"))  # 만료된 핸들 정리 주기(초)
+
+# ============================================
+# 스트리밍 출력 설정 (WebSocket / NDJSON)
+# ============================================
+STREAM_COALESCE_MS = int(os.getenv("STREAM_COALESCE_MS", "30"))  # 청크 병합 시간 창(ms)
+STREAM_COALESCE_BYTES = int(os.getenv("STREAM_COALESCE_BYTES", "1024"))  # 청크 병합 최대 크기
+STREAM_BUFFER_EVENTS = int(os.getenv("STREAM_BUFFER_EVENTS", "256"))  # 연결별 최대 버퍼 이벤트 수
+STREAM_STALL_TIMEOUT = float(os.getenv("STREAM_STALL_TIMEOUT", "15"))  # 버퍼가 가득 찬 상태로 허용하는 시간(초)
+GEMINI_WS_MAX_CONCURRENT = int(os.getenv("GEMINI_WS_MAX_CONCURRENT", "3"))  # WebSocket 연결당 동시 생성 수
+
+# ============================================
+# 프로바이더별 동시 호출 제한 (Admission Control)
+# ============================================
+ADMISSION_DEFAULT_CONCURRENCY = int(os.getenv("ADMISSION_DEFAULT_CONCURRENCY", "8"))
+ADMISSION_DEFAULT_QPS = float(os.getenv("ADMISSION_DEFAULT_QPS", "0"))  # 0 = 제한 없음
+ADMISSION_DEFAULT_QUEUE = int(os.getenv("ADMISSION_DEFAULT_QUEUE", "16"))  # 대기열 최대 길이
+ADMISSION_DEFAULT_TIMEOUT = float(os.getenv("ADMISSION_DEFAULT_TIMEOUT", "10"))  # 대기열 최대 대기 시간(초)
+
+# 프로바이더 또는 "프로바이더/모델" 단위 제한 (ADMISSION_LIMITS에 JSON으로 덮어쓰기 가능)
+# 예: ADMISSION_LIMITS='{"fal-ai": {"concurrency": 2}, "gemini/gemini-2.5-pro": {"qps": 1}}'
+ADMISSION_LIMITS = {
+    "gemini": {"concurrency": 16, "qps": 10},
+    "gemini-image": {"concurrency": 2, "qps": 0.5, "queue": 4, "timeout": 5},
+    "imagen": {"concurrency": 2, "qps": 0.5, "queue": 4, "timeout": 5},
+    "fal-ai": {"concurrency": 4, "queue": 8, "timeout": 30},
+    "nebius": {"concurrency": 4, "queue": 8, "timeout": 30},
+    "nscale": {"concurrency": 4, "queue": 8, "timeout": 30},
+    "hf-inference": {"concurrency": 2, "queue": 8, "timeout": 30},
+    "ollama": {"concurrency": 4, "queue": 32, "timeout": 30},
+}
+ADMISSION_LIMITS.update(json.loads(os.getenv("ADMISSION_LIMITS", "{}")))
+
+# ============================================
+# Ollama 클라이언트 설정
+# ============================================
+OLLAMA_HOST = os.getenv("OLLAMA_HOST", "http://localhost:11434")
+# 여러 Ollama 서버로 부하 분산 (쉼표 구분, 비어 있으면 OLLAMA_HOST 하나만 사용)
+OLLAMA_HOSTS = [h.strip() for h in os.getenv("OLLAMA_HOSTS", OLLAMA_HOST).split(",") if h.strip()]
+OLLAMA_HEALTH_INTERVAL = float(os.getenv("OLLAMA_HEALTH_INTERVAL", "10"))  # 헬스 체크 주기(초)
+OLLAMA_EJECT_FAILURES = int(os.getenv("OLLAMA_EJECT_FAILURES", "3"))  # 연속 실패 N회 시 제외
+OLLAMA_EJECT_SECONDS = float(os.getenv("OLLAMA_EJECT_SECONDS", "30"))  # 제외 유지 시간(초)
+OLLAMA_AFFINITY_SLACK = int(os.getenv("OLLAMA_AFFINITY_SLACK", "2"))  # 모델이 로드된 호스트를 우선할 최대 요청 수 차이
+OLLAMA_CONNECT_TIMEOUT = float(os.getenv("OLLAMA_CONNECT_TIMEOUT", "5"))  # 연결 대기(초)
+OLLAMA_READ_TIMEOUT = float(os.getenv("OLLAMA_READ_TIMEOUT", "120"))  # 청크 간 최대 대기(초, 모델 로딩 포함)
+OLLAMA_MAX_CONNECTIONS = int(os.getenv("OLLAMA_MAX_CONNECTIONS", "64"))  # 공유 연결 풀 크기
+# 응답 후 모델을 메모리에 유지할 시간 ("5m", "1h", 초 단위 숫자, -1 = 무기한)
+OLLAMA_KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "5m")
+if OLLAMA_KEEP_ALIVE.lstrip("-").isdigit():
+    OLLAMA_KEEP_ALIVE = int(OLLAMA_KEEP_ALIVE)
+
+# 모델 상주 관리: 허용된 채팅 모델만 사용, 핫 모델은 시작 시 로드 후 메모리에 고정
+OLLAMA_CHAT_MODELS = [m.strip() for m in os.getenv("OLLAMA_CHAT_MODELS", "gemma3:4b").split(",") if m.strip()]
+OLLAMA_HOT_MODELS = [m.strip() for m in os.getenv("OLLAMA_HOT_MODELS", "gemma3:4b").split(",") if m.strip()]
+OLLAMA_MAX_RESIDENT = int(os.getenv("OLLAMA_MAX_RESIDENT", "2"))  # 동시에 메모리에 올릴 최대 모델 수
+OLLAMA_WARMUP_ON_STARTUP = os.getenv("OLLAMA_WARMUP_ON_STARTUP", "True").lower() == "true"
+
+# ============================================
+# 텍스트 LLM 복원력 설정 (서킷 브레이커 / 헤지 요청 / 로컬 폴백)
+# ============================================
+LLM_PRIMARY_TIMEOUT = float(os.getenv("LLM_PRIMARY_TIMEOUT", "12"))  # Gemini 시도 최대 대기(초)
+LLM_FALLBACK_TIMEOUT = float(os.getenv("LLM_FALLBACK_TIMEOUT", "20"))  # Ollama 폴백 최대 대기(초)
+LLM_BREAKER_FAILURES = int(os.getenv("LLM_BREAKER_FAILURES", "5"))  # 연속 실패 N회 시 차단
+LLM_BREAKER_RESET = float(os.getenv("LLM_BREAKER_RESET", "30"))  # 차단 후 half-open 전환까지(초)
+LLM_HEDGE_ENABLED = os.getenv("LLM_HEDGE_ENABLED", "True").lower() == "true"
+LLM_HEDGE_DEFAULT_DELAY = float(os.getenv("LLM_HEDGE_DEFAULT_DELAY", "4"))  # p95 표본이 부족할 때 헤지 지연(초)
+LLM_HEDGE_MIN_DELAY = float(os.getenv("LLM_HEDGE_MIN_DELAY", "0.5"))
+LLM_FALLBACK_ENABLED = os.getenv("LLM_FALLBACK_ENABLED", "True").lower() == "true"
+LLM_FALLBACK_MODEL = os.getenv("LLM_FALLBACK_MODEL", "gemma3:4b")  # Gemini 장애 시 사용할 Ollama 모델
+
+# ============================================
+# 청첩장 문구 추천 설정
+# ============================================
+INVITATION_TONE_RETRIES = int(os.getenv("INVITATION_TONE_RETRIES", "1"))  # 톤별 병렬 생성 실패 시 재시도 횟수
+
+# 추천 결과 캐시 (같은 예식 정보로 다시 요청하면 저장된 결과 반환, regenerate=true로 우회)
+INVITATION_CACHE_ENABLED = os.getenv("INVITATION_CACHE_ENABLED", "True").lower() == "true"
+INVITATION_CACHE_TTL = int(os.getenv("INVITATION_CACHE_TTL", "86400"))  # 초
+INVITATION_CACHE_MEMORY_ENTRIES = int(os.getenv("INVITATION_CACHE_MEMORY_ENTRIES", "256"))  # 메모리 계층 최대 항목 수
+INVITATION_CACHE_DISK_ENTRIES = int(os.getenv("INVITATION_CACHE_DISK_ENTRIES", "5000"))  # 디스크 계층 최대 항목 수 (0 = 사용 안 함)
+
+# 응답 기한: 기한 안에 Gemini가 응답하지 않으면 로컬 템플릿 문구를 먼저 반환 (요청의 deadline_ms로 덮어쓰기 가능)
+INVITATION_DEADLINE_MS = int(os.getenv("INVITATION_DEADLINE_MS", "8000"))  # 0 = 기한 없음
+INVITATION_UPGRADE_TTL = int(os.getenv("INVITATION_UPGRADE_TTL", "600"))  # 기한 초과 후 생성된 결과 보관 시간(초)
+
 # ============================================
 # 검증 및 디버깅
 # ============================================
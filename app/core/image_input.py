@@ -0,0 +1,132 @@
+"""
+입력 이미지 정규화 (업스트림 전송 전 전처리)
+클라이언트가 보낸 사진(휴대폰 원본 10MB+, EXIF 포함)을 그대로 FLUX/Gemini로 보내지 않고,
+모델이 실제로 활용하는 해상도에 맞춰 줄인 뒤 다시 인코딩합니다.
+
+1. 디코딩 (픽셀 수가 IMAGE_INPUT_MAX_PIXELS를 넘으면 400)
+2. EXIF Orientation 적용 (회전된 사진이 옆으로 눕지 않도록)
+3. 긴 변이 max_side를 넘으면 비율을 유지하며 축소
+4. EXIF/XMP 등 메타데이터 제거 후 재인코딩 (투명도가 없으면 JPEG, 있으면 PNG)
+   ICC 프로필은 색 공간이 그대로일 때만 유지하고, CMYK 등 다른 색 공간은 sRGB로 변환한 뒤 프로필을 제거
+
+이미 충분히 작고 메타데이터가 없는 JPEG/PNG/WEBP는 화질 손실 없이 원본 그대로 전달합니다.
+디코딩/인코딩은 CPU 작업이므로 전용 스레드 풀(IMAGE_INPUT_WORKERS)에서 실행합니다.
+"""
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from typing import Optional, Tuple
+from PIL import Image, ImageCms, ImageOps
+from app.core.config import (
+    IMAGE_INPUT_NORMALIZE,
+    IMAGE_INPUT_WORKERS,
+    IMAGE_INPUT_MAX_PIXELS,
+    IMAGE_INPUT_QUALITY,
+)
+from app.core.exceptions import bad_request
+from app.core.metrics import get_metrics_registry
+
+_PASSTHROUGH_FORMATS = ("JPEG", "PNG", "WEBP")
+_EXIF_ORIENTATION = 0x0112
+
+_executor: Optional[ThreadPoolExecutor] = None
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=IMAGE_INPUT_WORKERS, thread_name_prefix="image-input")
+    return _executor
+
+
+def _has_alpha(image: Image.Image) -> bool:
+    return image.mode in ("RGBA", "LA", "PA") or (image.mode == "P" and "transparency" in image.info)
+
+
+def _convert(image: Image.Image, mode: str, icc_profile: Optional[bytes]) -> Tuple[Image.Image, Optional[bytes]]:
+    """
+    mode로 변환하면서 ICC 프로필 처리
+    프로필의 색 공간이 결과와 같으면(RGB) 그대로 유지하고, 다르면(CMYK, 흑백) sRGB로 색 변환 후 프로필 제거
+    (CMYK 프로필이 붙은 RGB JPEG는 뷰어/모델이 잘못 렌더링하거나 거부함)
+    """
+    if image.mode == mode:
+        return image, icc_profile
+    if icc_profile:
+        try:
+            source = ImageCms.ImageCmsProfile(BytesIO(icc_profile))
+            if source.profile.xcolor_space.strip() == "RGB":
+                return image.convert(mode), icc_profile
+            converted = ImageCms.profileToProfile(image, source, ImageCms.createProfile("sRGB"), outputMode=mode)
+            return converted, None
+        except (ImageCms.PyCMSError, OSError, ValueError) as e:
+            print(f"⚠️ ICC 색 변환 실패, 프로필 없이 변환: {e}")
+    return image.convert(mode), None
+
+
+def _normalize(data: bytes, max_side: int) -> bytes:
+    try:
+        image = Image.open(BytesIO(data))
+        if image.width * image.height > IMAGE_INPUT_MAX_PIXELS:
+            raise bad_request("image_too_large", {
+                "width": image.width,
+                "height": image.height,
+                "max_pixels": IMAGE_INPUT_MAX_PIXELS,
+            })
+        image.load()
+    except Image.DecompressionBombError:
+        raise bad_request("image_too_large", {"max_pixels": IMAGE_INPUT_MAX_PIXELS})
+    except (OSError, SyntaxError, ValueError) as e:
+        # PIL.UnidentifiedImageError는 OSError의 하위 클래스
+        raise bad_request("invalid_image", {"details": str(e)})
+
+    exif = image.getexif()
+    orientation = exif.get(_EXIF_ORIENTATION, 1)
+    has_metadata = bool(exif) or "xmp" in image.info or "XML:com.adobe.xmp" in image.info
+    if (
+        image.format in _PASSTHROUGH_FORMATS
+        and max(image.size) <= max_side
+        and orientation == 1
+        and not has_metadata
+    ):
+        return data
+
+    icc_profile = image.info.get("icc_profile")
+    image = ImageOps.exif_transpose(image)
+    if max(image.size) > max_side:
+        image.thumbnail((max_side, max_side), Image.Resampling.LANCZOS)
+
+    buffered = BytesIO()
+    if _has_alpha(image):
+        image, icc_profile = _convert(image, "RGBA", icc_profile)
+        image.save(buffered, format="PNG", optimize=True, icc_profile=icc_profile)
+    else:
+        image, icc_profile = _convert(image, "RGB", icc_profile)
+        image.save(buffered, format="JPEG", quality=IMAGE_INPUT_QUALITY, optimize=True, icc_profile=icc_profile)
+    return buffered.getvalue()
+
+
+async def normalize_input_image(data: bytes, max_side: int) -> bytes:
+    """
+    업스트림 전송용 입력 이미지 정규화
+
+    Args:
+        data: 클라이언트가 보낸 이미지 바이트
+        max_side: 모델이 활용하는 최대 해상도 (긴 변, 픽셀)
+
+    Returns:
+        정규화된 이미지 바이트 (변경이 필요 없으면 원본)
+
+    Raises:
+        APIError: 이미지가 아니거나 픽셀 수가 너무 큰 경우 (400)
+    """
+    if not IMAGE_INPUT_NORMALIZE:
+        return data
+    started = time.monotonic()
+    loop = asyncio.get_running_loop()
+    result = await loop.run_in_executor(_get_executor(), _normalize, data, max_side)
+    registry = get_metrics_registry()
+    registry.observe("image_input_normalize_seconds", time.monotonic() - started)
+    registry.observe("image_input_bytes", len(data), stage="received")
+    registry.observe("image_input_bytes", len(result), stage="normalized")
+    return result
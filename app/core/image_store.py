@@ -0,0 +1,170 @@
+"""
+생성 이미지 저장소 (content-addressed)
+이미지 바이트의 SHA-256 해시를 이름으로 저장하여 같은 이미지는 한 번만 저장하고,
+해시(digest)만으로 언제든 다시 내려받을 수 있게 합니다.
+
+- 경로: IMAGE_STORE_DIR/<digest 앞 2자>/<다음 2자>/<digest>.<확장자>
+- 용량: 전체 크기가 IMAGE_STORE_MAX_MB를 넘으면 가장 오래 사용하지 않은 이미지부터 삭제
+- 인덱스(digest → 경로/크기/MIME/마지막 사용 시각)는 메모리에 두고, 처음 사용할 때 디렉터리를 스캔하여 복원
+- 파일 I/O는 스레드에서 실행 (인덱스는 스레드 락으로 보호)
+"""
+import asyncio
+import hashlib
+import os
+import re
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional
+from app.core.config import IMAGE_STORE_DIR, IMAGE_STORE_MAX_MB
+from app.core.images import GeneratedImage, IMAGE_EXTENSIONS
+from app.core.metrics import get_metrics_registry
+
+_DIGEST_RE = re.compile(r"^[0-9a-f]{64}$")
+_MIME_TYPES = {ext: mime for mime, ext in IMAGE_EXTENSIONS.items()}
+_MIME_TYPES["bin"] = "application/octet-stream"
+
+
+def is_digest(value: str) -> bool:
+    return bool(_DIGEST_RE.match(value))
+
+
+class StoredImage:
+    __slots__ = ("digest", "path", "size", "mime_type", "last_used")
+
+    def __init__(self, digest: str, path: Path, size: int, mime_type: str, last_used: float):
+        self.digest = digest
+        self.path = path
+        self.size = size
+        self.mime_type = mime_type
+        self.last_used = last_used
+
+
+class ImageStore:
+
+    def __init__(self, root: Path, max_bytes: int):
+        self.root = root
+        self.max_bytes = max_bytes
+        self._index: Dict[str, StoredImage] = {}
+        self._total = 0
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    def _path(self, digest: str, extension: str) -> Path:
+        return self.root / digest[:2] / digest[2:4] / f"{digest}.{extension}"
+
+    def _load(self) -> None:
+        """디렉터리를 스캔하여 인덱스 복원 (락 안에서 호출)"""
+        if self._loaded:
+            return
+        if self.root.exists():
+            for path in self.root.glob("*/*/*.*"):
+                digest, _, extension = path.name.partition(".")
+                if not is_digest(digest) or extension not in _MIME_TYPES:
+                    continue
+                stat = path.stat()
+                self._index[digest] = StoredImage(digest, path, stat.st_size, _MIME_TYPES[extension], stat.st_mtime)
+                self._total += stat.st_size
+        self._loaded = True
+
+    def _put(self, image: GeneratedImage) -> str:
+        digest = hashlib.sha256(image.data).hexdigest()
+        with self._lock:
+            self._load()
+            entry = self._index.get(digest)
+            if entry is not None:
+                entry.last_used = time.time()
+                return digest
+
+        path = self._path(digest, image.extension)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(tmp, "wb") as f:
+            f.write(image.data)
+        os.replace(tmp, path)
+
+        with self._lock:
+            if digest not in self._index:
+                self._index[digest] = StoredImage(digest, path, len(image.data), image.mime_type, time.time())
+                self._total += len(image.data)
+            self._evict(keep=digest)
+        return digest
+
+    def _evict(self, keep: str) -> None:
+        """전체 크기가 한도를 넘으면 LRU 순으로 삭제 (락 안에서 호출, 방금 저장한 이미지는 제외)"""
+        if self._total <= self.max_bytes:
+            return
+        registry = get_metrics_registry()
+        for entry in sorted(self._index.values(), key=lambda e: e.last_used):
+            if self._total <= self.max_bytes:
+                break
+            if entry.digest == keep:
+                continue
+            entry.path.unlink(missing_ok=True)
+            del self._index[entry.digest]
+            self._total -= entry.size
+            registry.inc("image_store_evicted_total")
+
+    def _lookup(self, digest: str) -> Optional[StoredImage]:
+        with self._lock:
+            self._load()
+            entry = self._index.get(digest)
+            if entry is None:
+                return None
+            if not entry.path.exists():
+                # 외부에서 삭제된 경우 인덱스에서도 제거
+                del self._index[digest]
+                self._total -= entry.size
+                return None
+            entry.last_used = time.time()
+            return entry
+
+    async def put(self, image: GeneratedImage) -> str:
+        """
+        이미지 저장 (이미 있으면 저장하지 않음)
+
+        Returns:
+            SHA-256 digest (hex)
+        """
+        return await asyncio.to_thread(self._put, image)
+
+    async def get(self, digest: str) -> Optional[StoredImage]:
+        """digest에 해당하는 저장된 이미지 (없거나 삭제되었으면 None)"""
+        if not is_digest(digest):
+            return None
+        return await asyncio.to_thread(self._lookup, digest)
+
+    def _read(self, digest: str) -> Optional[GeneratedImage]:
+        entry = self._lookup(digest)
+        if entry is None:
+            return None
+        try:
+            data = entry.path.read_bytes()
+        except FileNotFoundError:
+            return None
+        return GeneratedImage(data, entry.mime_type, {"X-Image-Digest": digest})
+
+    async def read(self, digest: str) -> Optional[GeneratedImage]:
+        """저장된 이미지 바이트 읽기 (없거나 삭제되었으면 None)"""
+        if not is_digest(digest):
+            return None
+        return await asyncio.to_thread(self._read, digest)
+
+    def stats(self) -> dict:
+        return {
+            "images": len(self._index),
+            "bytes": self._total,
+            "max_bytes": self.max_bytes,
+            "loaded": self._loaded,
+        }
+
+
+_store: Optional[ImageStore] = None
+
+
+def get_image_store() -> ImageStore:
+    global _store
+    if _store is None:
+        _store = ImageStore(IMAGE_STORE_DIR, IMAGE_STORE_MAX_MB * 1024 * 1024)
+        get_metrics_registry().register_gauge("image_store", _store.stats)
+    return _store
@@ -0,0 +1,87 @@
+"""
+생성 이미지 공통 타입과 바이너리 응답 변환
+이미지 생성 서비스는 업스트림이 준 바이트를 그대로 GeneratedImage로 반환하고,
+응답 형식(base64 data URI / 바이너리 / multipart)은 라우터에서 고릅니다.
+"""
+import base64
+import uuid
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+from fastapi.responses import Response
+
+IMAGE_EXTENSIONS = {
+    "image/png": "png",
+    "image/jpeg": "jpg",
+    "image/webp": "webp",
+    "image/gif": "gif",
+}
+
+
+def sniff_mime_type(data: bytes, default: str = "image/png") -> str:
+    """매직 바이트로 이미지 MIME 타입 판별"""
+    if data[:8] == b"\x89PNG\r\n\x1a\n":
+        return "image/png"
+    if data[:3] == b"\xff\xd8\xff":
+        return "image/jpeg"
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "image/webp"
+    if data[:6] in (b"GIF87a", b"GIF89a"):
+        return "image/gif"
+    return default
+
+
+@dataclass
+class GeneratedImage:
+    data: bytes
+    mime_type: str
+    metadata: Dict[str, str] = field(default_factory=dict)  # 응답 헤더로 전달할 부가 정보 (X-...)
+
+    @classmethod
+    def from_bytes(cls, data: bytes, mime_type: Optional[str] = None) -> "GeneratedImage":
+        """업스트림 바이트를 디코딩/재인코딩 없이 감쌈 (MIME 타입이 없으면 매직 바이트로 판별)"""
+        return cls(data, mime_type or sniff_mime_type(data))
+
+    @property
+    def extension(self) -> str:
+        return IMAGE_EXTENSIONS.get(self.mime_type, "bin")
+
+    def to_data_uri(self) -> str:
+        return f"data:{self.mime_type};base64,{base64.b64encode(self.data).decode()}"
+
+
+def _header_value(value) -> str:
+    # HTTP 헤더는 latin-1만 허용되므로 그 밖의 문자는 제거
+    return str(value).encode("latin-1", "ignore").decode("latin-1")
+
+
+def image_response(images: List[GeneratedImage], headers: Dict[str, str] = None) -> Response:
+    """
+    이미지 바이너리 응답
+    - 1장: 이미지 바이트 그대로 (Content-Type: image/png 등)
+    - 여러 장: multipart/mixed, 각 파트에 Content-Type/Content-Disposition과 메타데이터 헤더
+
+    Args:
+        images: 생성된 이미지 목록
+        headers: 응답 헤더로 전달할 메타데이터 (X-Model 등)
+    """
+    headers = {name: _header_value(value) for name, value in (headers or {}).items()}
+    headers["X-Image-Count"] = str(len(images))
+    if len(images) == 1:
+        image = images[0]
+        headers.update({name: _header_value(value) for name, value in image.metadata.items()})
+        return Response(content=image.data, media_type=image.mime_type, headers=headers)
+
+    boundary = uuid.uuid4().hex
+    parts = []
+    for index, image in enumerate(images):
+        part_headers = [
+            f"Content-Type: {image.mime_type}",
+            f"Content-Length: {len(image.data)}",
+            f'Content-Disposition: attachment; name="image"; filename="image-{index}.{image.extension}"',
+        ] + [f"{name}: {_header_value(value)}" for name, value in image.metadata.items()]
+        header_block = "".join(f"{h}\r\n" for h in part_headers)
+        parts.append(f"--{boundary}\r\n{header_block}\r\n".encode("latin-1"))
+        parts.append(image.data)
+        parts.append(b"\r\n")
+    parts.append(f"--{boundary}--\r\n".encode("latin-1"))
+    return Response(content=b"".join(parts), media_type=f"multipart/mixed; boundary={boundary}", headers=headers)
@@ -0,0 +1,381 @@
+"""
+비동기 작업 큐 (프로세스 내 워커 풀)
+오래 걸리는 생성 요청을 HTTP 요청과 분리하여, 제출 즉시 작업 ID를 반환하고
+제한된 수의 워커가 순서대로 실행합니다. 클라이언트가 연결을 끊어도 작업은 계속 진행됩니다.
+
+- 상태: queued → running → succeeded / failed
+- 이벤트: 상태 변경, 진행 상황(report_progress, 예: Gemini 중간 텍스트), 최종 결과/오류
+  구독자는 지난 이벤트를 먼저 받고 이후 이벤트를 실시간으로 받습니다.
+- 대기열이 가득 차면 503 (job_queue_full)
+- 완료된 작업은 ttl 동안 보관 후 삭제
+- 진행 이벤트는 작업마다 최근 Job.MAX_PROGRESS_EVENTS개만 보관 (상태/결과/오류 이벤트는 모두 보관)
+- 상태가 바뀔 때마다 스냅샷을 RESULT_CACHE_DIR/jobs/<이름>/<작업 ID>.json에 저장하여
+  작업을 실행하지 않는 다른 gunicorn 워커에서도 상태/결과를 조회할 수 있습니다. (중간 진행 이벤트는 실행 중인 워커에서만)
+  스냅샷에는 base64 이미지 결과가 포함될 수 있으므로 직렬화/쓰기는 스레드에서 실행합니다.
+- 서버 종료 시 끝나지 않은 작업은 실패로 저장하고, 프로세스가 비정상 종료되어 stale_after가 지나도록
+  queued/running으로 남은 스냅샷은 실패(job_lost)로 취급합니다.
+"""
+import asyncio
+import json
+import os
+import re
+import time
+import uuid
+from collections import OrderedDict
+from contextvars import ContextVar
+from pathlib import Path
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional
+from app.core.config import (
+    RESULT_CACHE_DIR,
+    IMAGE_JOB_WORKERS,
+    IMAGE_JOB_QUEUE_SIZE,
+    IMAGE_JOB_TTL,
+    IMAGE_JOB_STALE_AFTER,
+)
+from app.core.exceptions import APIError, service_unavailable
+from app.core.metrics import get_metrics_registry
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+FINISHED = (SUCCEEDED, FAILED)
+_FINAL_EVENTS = ("status", "result", "error")
+
+_JOB_ID_RE = re.compile(r"^[0-9a-f]{32}$")
+_CLOSED = object()
+
+# 현재 실행 중인 작업 (워커 태스크의 컨텍스트에만 설정됨)
+_current_job: ContextVar[Optional["Job"]] = ContextVar("current_job", default=None)
+
+
+def report_progress(event_type: str, **data) -> None:
+    """
+    실행 중인 작업에 진행 이벤트 전달 (작업 밖에서 호출되면 아무것도 하지 않음)
+    서비스 코드는 작업 여부와 상관없이 호출하면 됩니다.
+    """
+    job = _current_job.get()
+    if job is not None:
+        job.emit(event_type, **data)
+
+
+class Job:
+    MAX_PROGRESS_EVENTS = 100
+
+    def __init__(self, kind: str, fn: Callable[[], Awaitable[dict]], meta: dict = None):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.meta = meta or {}
+        self.status = QUEUED
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.result: Optional[dict] = None
+        self.error: Optional[dict] = None
+        self.events: List[dict] = []
+        self._fn = fn
+        self._subscribers: List[asyncio.Queue] = []
+        self._seq = 0
+        self._progress_events = 0
+        self._persist_lock = asyncio.Lock()
+
+    def emit(self, event_type: str, **data) -> None:
+        event = {"type": event_type, "job_id": self.id, "seq": self._seq, **data}
+        self._seq += 1
+        if event_type not in _FINAL_EVENTS:
+            # 진행 이벤트(Gemini 중간 텍스트 등)는 최근 것만 보관 (나중에 구독한 클라이언트용 기록)
+            if self._progress_events >= self.MAX_PROGRESS_EVENTS:
+                oldest = next(i for i, e in enumerate(self.events) if e["type"] not in _FINAL_EVENTS)
+                del self.events[oldest]
+            else:
+                self._progress_events += 1
+        self.events.append(event)
+        for queue in self._subscribers:
+            queue.put_nowait(event)
+
+    def fail(self, error: dict) -> None:
+        """끝나지 않은 작업을 실패로 종료하고 구독자에게 알림"""
+        self.status = FAILED
+        self.error = error
+        self.finished_at = time.time()
+        self.emit("error", error=error)
+        self.emit("status", status=FAILED)
+        self._close_subscribers()
+
+    def _close_subscribers(self) -> None:
+        for queue in self._subscribers:
+            queue.put_nowait(_CLOSED)
+        self._subscribers.clear()
+
+    def snapshot(self) -> dict:
+        data = {
+            "job_id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            **self.meta,
+        }
+        if self.result is not None:
+            data["result"] = self.result
+        if self.error is not None:
+            data["error"] = self.error
+        return data
+
+
+class JobManager:
+
+    def __init__(
+        self,
+        name: str,
+        workers: int,
+        max_queue: int,
+        ttl: float,
+        directory: Optional[Path] = None,
+        stale_after: float = IMAGE_JOB_STALE_AFTER,
+    ):
+        self.name = name
+        self.workers = workers
+        self.max_queue = max_queue
+        self.ttl = ttl
+        self.stale_after = stale_after
+        self.directory = directory or RESULT_CACHE_DIR / "jobs" / name
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker_tasks: List[asyncio.Task] = []
+
+    def _ensure_workers(self) -> None:
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._worker_tasks = [task for task in self._worker_tasks if not task.done()]
+        while len(self._worker_tasks) < self.workers:
+            self._worker_tasks.append(asyncio.create_task(self._worker()))
+
+    async def submit(self, kind: str, fn: Callable[[], Awaitable[dict]], meta: dict = None) -> Job:
+        """
+        작업 제출 (실행은 워커가 담당)
+
+        Args:
+            kind: 작업 종류 (generate, modify 등)
+            fn: 작업 결과 dict를 반환하는 코루틴 함수
+            meta: 상태 조회에 함께 보여줄 정보 (model 등)
+
+        Raises:
+            APIError: 대기열이 가득 찬 경우 (503)
+        """
+        self._ensure_workers()
+        self._prune()
+        job = Job(kind, fn, meta)
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            get_metrics_registry().inc("jobs_total", queue=self.name, status="rejected")
+            raise service_unavailable("job_queue_full", retry_after=5, data={"queued": self._queue.qsize()})
+        self._jobs[job.id] = job
+        job.emit("status", status=QUEUED, position=self._queue.qsize())
+        await self._persist(job)
+        return job
+
+    async def _worker(self) -> None:
+        # 새 작업이 없어도 완료 작업(base64 이미지가 포함될 수 있음)이 메모리에 남지 않도록 주기적으로 정리
+        prune_interval = max(1.0, min(self.ttl / 4, 60.0))
+        while True:
+            try:
+                job = await asyncio.wait_for(self._queue.get(), prune_interval)
+            except asyncio.TimeoutError:
+                self._prune()
+                continue
+            try:
+                await self._run(job)
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job: Job) -> None:
+        registry = get_metrics_registry()
+        job.status = RUNNING
+        job.started_at = time.time()
+        registry.observe("job_queue_wait_seconds", job.started_at - job.created_at, queue=self.name)
+        job.emit("status", status=RUNNING)
+        await self._persist(job)
+
+        token = _current_job.set(job)
+        try:
+            job.result = await job._fn()
+            job.status = SUCCEEDED
+            job.emit("result", result=job.result)
+        except asyncio.CancelledError:
+            job.status = FAILED
+            job.error = {"message": "job_cancelled"}
+            raise
+        except APIError as e:
+            job.status = FAILED
+            job.error = {"message": e.message, "data": e.data}
+        except Exception as e:
+            print(f"❌ 작업 실패 ({self.name}/{job.kind} {job.id}): {type(e).__name__}: {e}")
+            job.status = FAILED
+            job.error = {"message": "job_failed", "data": {"details": str(e)}}
+        finally:
+            _current_job.reset(token)
+            job.finished_at = time.time()
+            if job.error is not None:
+                job.emit("error", error=job.error)
+            job.emit("status", status=job.status)
+            try:
+                # 구독이 끝난 클라이언트가 바로 조회해도 완료 상태가 보이도록 저장 후 구독 종료
+                await self._persist(job)
+            finally:
+                job._close_subscribers()
+            registry.inc("jobs_total", queue=self.name, status=job.status)
+            registry.observe("job_run_seconds", job.finished_at - job.started_at, queue=self.name, kind=job.kind)
+
+    def _path(self, job_id: str) -> Path:
+        return self.directory / f"{job_id}.json"
+
+    async def _persist(self, job: Job) -> None:
+        """
+        상태 스냅샷을 디스크에 저장 (다른 워커 프로세스 조회용, 실패해도 작업에는 영향 없음)
+        같은 작업의 저장은 상태가 바뀐 순서대로 실행합니다.
+        """
+        snapshot = job.snapshot()
+        async with job._persist_lock:
+            await asyncio.to_thread(self._write, job.id, snapshot)
+
+    def _write(self, job_id: str, snapshot: dict) -> None:
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            path = self._path(job_id)
+            tmp = path.with_suffix(f".{os.getpid()}.tmp")
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(snapshot, f, ensure_ascii=False)
+            os.replace(tmp, path)
+        except Exception as e:
+            print(f"⚠️ 작업 상태 저장 실패 ({self.name} {job_id}): {e}")
+
+    def _load(self, job_id: str) -> Optional[dict]:
+        path = self._path(job_id)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+        now = time.time()
+        if data.get("status") not in FINISHED and data.get("created_at", 0) + self.stale_after <= now:
+            # 실행하던 프로세스가 종료 처리 없이 사라진 작업: 실패로 취급해야 구독이 끝남
+            data.update({
+                "status": FAILED,
+                "finished_at": data["created_at"] + self.stale_after,
+                "error": {"message": "job_lost"},
+            })
+        if data.get("finished_at") and data["finished_at"] + self.ttl <= now:
+            path.unlink(missing_ok=True)
+            return None
+        return data
+
+    def _prune(self) -> None:
+        """보관 시간이 지난 완료 작업 삭제"""
+        now = time.time()
+        for job_id, job in list(self._jobs.items()):
+            if job.status in FINISHED and job.finished_at + self.ttl <= now:
+                del self._jobs[job_id]
+                self._path(job_id).unlink(missing_ok=True)
+
+    def get(self, job_id: str) -> Optional[Job]:
+        self._prune()
+        return self._jobs.get(job_id)
+
+    async def snapshot(self, job_id: str) -> Optional[dict]:
+        """작업 상태 조회 (이 프로세스에 없으면 디스크 스냅샷)"""
+        if not _JOB_ID_RE.match(job_id):
+            return None
+        job = self.get(job_id)
+        if job is not None:
+            return job.snapshot()
+        return await asyncio.to_thread(self._load, job_id)
+
+    async def subscribe(self, job_id: str, poll_interval: float = 1.0) -> AsyncIterator[dict]:
+        """
+        작업 이벤트 구독 (지난 이벤트부터 작업이 끝날 때까지)
+        다른 워커 프로세스의 작업이면 디스크 스냅샷을 poll_interval마다 확인하여 상태/결과 이벤트만 전달합니다.
+        """
+        job = self.get(job_id)
+        if job is None:
+            async for event in self._follow_snapshot(job_id, poll_interval):
+                yield event
+            return
+
+        history = list(job.events)
+        queue = None
+        if job.status not in FINISHED:
+            queue = asyncio.Queue()
+            job._subscribers.append(queue)
+        try:
+            for event in history:
+                yield event
+            while queue is not None:
+                event = await queue.get()
+                if event is _CLOSED:
+                    break
+                yield event
+        finally:
+            if queue is not None and queue in job._subscribers:
+                job._subscribers.remove(queue)
+
+    async def _follow_snapshot(self, job_id: str, poll_interval: float) -> AsyncIterator[dict]:
+        status = None
+        while True:
+            data = await self.snapshot(job_id)
+            if data is None:
+                return
+            if data["status"] != status:
+                status = data["status"]
+                if status == SUCCEEDED:
+                    yield {"type": "result", "job_id": job_id, "result": data.get("result")}
+                elif status == FAILED:
+                    yield {"type": "error", "job_id": job_id, "error": data.get("error")}
+                yield {"type": "status", "job_id": job_id, "status": status}
+            if status in FINISHED:
+                return
+            await asyncio.sleep(poll_interval)
+
+    async def close(self) -> None:
+        """
+        워커 중단 (서버 종료 시)
+        실행 중이던 작업은 job_cancelled, 대기 중이던 작업은 server_shutdown으로 실패 처리하여 저장합니다.
+        """
+        for task in self._worker_tasks:
+            task.cancel()
+        await asyncio.gather(*self._worker_tasks, return_exceptions=True)
+        self._worker_tasks.clear()
+        for job in list(self._jobs.values()):
+            if job.status not in FINISHED:
+                job.fail({"message": "server_shutdown"})
+                await self._persist(job)
+
+    def stats(self) -> dict:
+        counts: Dict[str, int] = {}
+        for job in self._jobs.values():
+            counts[job.status] = counts.get(job.status, 0) + 1
+        return {
+            "workers": len(self._worker_tasks),
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "max_queue": self.max_queue,
+            "jobs": counts,
+        }
+
+
+_image_jobs: Optional[JobManager] = None
+
+
+def get_image_job_manager() -> JobManager:
+    """이미지 생성 작업 큐 (IMAGE_JOB_WORKERS개 워커)"""
+    global _image_jobs
+    if _image_jobs is None:
+        _image_jobs = JobManager("image", IMAGE_JOB_WORKERS, IMAGE_JOB_QUEUE_SIZE, IMAGE_JOB_TTL)
+        get_metrics_registry().register_gauge("image_jobs", _image_jobs.stats)
+    return _image_jobs
+
+
+async def close_job_managers() -> None:
+    if _image_jobs is not None:
+        await _image_jobs.close()
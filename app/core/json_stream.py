@@ -0,0 +1,111 @@
+"""
+LLM 스트리밍 응답용 증분 JSON 파서
+응답 전체를 기다리지 않고, 지정한 배열(예: "options")의 원소 객체가 닫히는 즉시 꺼냅니다.
+
+- 루트 JSON 시작 전의 마크다운 펜스(```json)나 설명 문구는 건너뜁니다.
+- 루트 JSON이 닫힌 뒤의 내용(닫는 펜스, 추가 설명 등)은 무시합니다.
+- 루트가 객체면 array_key 배열의 원소를, 루트가 배열이면 배열의 원소를 꺼냅니다.
+- 문자열 안의 괄호/이스케이프는 구조로 취급하지 않습니다.
+"""
+import json
+from typing import Any, List, Optional
+
+
+class _Container:
+    __slots__ = ("kind", "key", "expect_key")
+
+    def __init__(self, kind: str, key: Optional[str]):
+        self.kind = kind          # "{" 또는 "["
+        self.key = key            # 부모 객체에서의 키
+        self.expect_key = kind == "{"
+
+
+class JsonArrayStreamParser:
+
+    def __init__(self, array_key: str = "options"):
+        self.array_key = array_key
+        self.done = False
+        self.emitted = 0
+        self._buf = ""
+        self._pos = 0
+        self._stack: List[_Container] = []
+        self._in_string = False
+        self._escape = False
+        self._string_start = 0
+        self._pending_key: Optional[str] = None
+        self._root_start: Optional[int] = None
+        self._item_start: Optional[int] = None
+
+    def _is_target(self, index: int) -> bool:
+        """stack[index]가 원소를 꺼낼 대상 배열인지"""
+        if index < 0 or index >= len(self._stack) or self._stack[index].kind != "[":
+            return False
+        if index == 0:
+            return True
+        return index == 1 and self._stack[0].kind == "{" and self._stack[index].key == self.array_key
+
+    def feed(self, text: str) -> List[dict]:
+        """
+        청크를 추가하고 새로 완성된 배열 원소 목록 반환
+        """
+        self._buf += text
+        buf = self._buf
+        items: List[dict] = []
+        i = self._pos
+        while i < len(buf) and not self.done:
+            c = buf[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif c == "\\":
+                    self._escape = True
+                elif c == '"':
+                    self._in_string = False
+                    top = self._stack[-1]
+                    if top.kind == "{" and top.expect_key:
+                        try:
+                            self._pending_key = json.loads(buf[self._string_start:i + 1])
+                        except ValueError:
+                            self._pending_key = None
+            elif not self._stack:
+                # 루트 시작 전 (펜스, 설명 문구) 건너뛰기
+                if c in "{[":
+                    self._root_start = i
+                    self._stack.append(_Container(c, None))
+            elif c == '"':
+                self._in_string = True
+                self._string_start = i
+            elif c in "{[":
+                key = self._pending_key if self._stack[-1].kind == "{" else None
+                self._pending_key = None
+                self._stack.append(_Container(c, key))
+                if c == "{" and self._is_target(len(self._stack) - 2):
+                    self._item_start = i
+            elif c in "}]":
+                closed = self._stack.pop()
+                if closed.kind == "{" and self._item_start is not None and self._is_target(len(self._stack) - 1):
+                    try:
+                        items.append(json.loads(buf[self._item_start:i + 1]))
+                        self.emitted += 1
+                    except ValueError:
+                        pass
+                    self._item_start = None
+                if not self._stack:
+                    self.done = True
+            elif c == ":":
+                self._stack[-1].expect_key = False
+            elif c == ",":
+                if self._stack[-1].kind == "{":
+                    self._stack[-1].expect_key = True
+            i += 1
+        self._pos = i
+        return items
+
+    def result(self) -> Optional[Any]:
+        """루트 JSON이 완성된 경우 전체 파싱 결과 (단일 객체 응답 등 하위 호환 처리용)"""
+        if not self.done or self._root_start is None:
+            return None
+        try:
+            return json.loads(self._buf[self._root_start:self._pos])
+        except ValueError:
+            return None
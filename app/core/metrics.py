@@ -0,0 +1,107 @@
+"""
+인메모리 메트릭 레지스트리
+프로세스(워커) 단위로 카운터/게이지/요약 통계를 집계하고 /api/metrics 에서 조회합니다.
+"""
+import math
+import threading
+from collections import defaultdict, deque
+from typing import Callable, Dict, Tuple
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: Dict[str, object]) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items() if v is not None))
+
+
+class _Summary:
+    """관측값 요약 (count / sum / min / max + 최근 관측값 기준 분위수)"""
+
+    __slots__ = ("count", "total", "min", "max", "recent")
+
+    _window = 1024  # 분위수 계산에 사용하는 최근 관측값 수
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.min = float("inf")
+        self.max = 0.0
+        self.recent = deque(maxlen=self._window)
+
+    def observe(self, value: float) -> None:
+        self.count += 1
+        self.total += value
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+        self.recent.append(value)
+
+    def to_dict(self) -> dict:
+        ordered = sorted(self.recent)
+
+        def quantile(q: float) -> float:
+            if not ordered:
+                return 0.0
+            return round(ordered[min(len(ordered) - 1, math.ceil(q * len(ordered)) - 1)], 6)
+
+        return {
+            "count": self.count,
+            "sum": round(self.total, 6),
+            "avg": round(self.total / self.count, 6) if self.count else 0.0,
+            "min": round(self.min, 6) if self.count else 0.0,
+            "max": round(self.max, 6),
+            "p50": quantile(0.5),
+            "p90": quantile(0.9),
+            "p99": quantile(0.99),
+        }
+
+
+class MetricsRegistry:
+    """이름 + 레이블 조합별 카운터/게이지/요약 통계 저장소"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Dict[LabelKey, float]] = defaultdict(lambda: defaultdict(float))
+        self._summaries: Dict[str, Dict[LabelKey, _Summary]] = defaultdict(lambda: defaultdict(_Summary))
+        self._gauges: Dict[str, Callable[[], object]] = {}
+
+    def inc(self, name: str, value: float = 1, **labels) -> None:
+        """카운터 증가"""
+        with self._lock:
+            self._counters[name][_label_key(labels)] += value
+
+    def observe(self, name: str, value: float, **labels) -> None:
+        """관측값 기록 (대기 시간, 지연 시간 등)"""
+        with self._lock:
+            self._summaries[name][_label_key(labels)].observe(value)
+
+    def register_gauge(self, name: str, collect: Callable[[], object]) -> None:
+        """조회 시점에 값을 계산하는 게이지 등록 (큐 깊이 등)"""
+        self._gauges[name] = collect
+
+    def get(self, name: str, **labels) -> float:
+        """카운터 현재 값 조회"""
+        with self._lock:
+            return self._counters.get(name, {}).get(_label_key(labels), 0.0)
+
+    def snapshot(self) -> dict:
+        """전체 메트릭을 JSON 직렬화 가능한 형태로 반환"""
+        with self._lock:
+            snapshot = {
+                "counters": {
+                    name: [{"labels": dict(key), "value": value} for key, value in series.items()]
+                    for name, series in self._counters.items()
+                },
+                "summaries": {
+                    name: [{"labels": dict(key), **summary.to_dict()} for key, summary in series.items()]
+                    for name, series in self._summaries.items()
+                },
+            }
+        snapshot["gauges"] = {name: collect() for name, collect in self._gauges.items()}
+        return snapshot
+
+
+metrics = MetricsRegistry()
+
+
+def get_metrics_registry() -> MetricsRegistry:
+    return metrics
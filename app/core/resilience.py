@@ -0,0 +1,219 @@
+"""
+업스트림 호출 복원력 유틸리티
+모델별 서킷 브레이커, 지연 시간 p95 추적, 지연 시간/오류율 EWMA, 헤지(hedged) 요청을 제공합니다.
+
+- 서킷 브레이커: 연속 실패가 임계치를 넘으면 open → reset_timeout 후 half-open에서
+  한 번의 시험 호출을 허용하고, 성공하면 closed로 복귀합니다.
+- 헤지 요청: 첫 시도가 최근 p95 지연 시간 안에 끝나지 않으면 두 번째 시도를 보내고
+  먼저 성공한 결과를 사용합니다. 나머지 시도는 취소합니다.
+  두 시도가 모두 실패하면 첫 시도의 예외를 전달합니다 (헤지 쪽 오류가 결과를 대신하지 않음).
+"""
+import asyncio
+import math
+import time
+from collections import deque
+from typing import Awaitable, Callable, Dict, Optional, TypeVar
+from app.core.config import (
+    LLM_BREAKER_FAILURES,
+    LLM_BREAKER_RESET,
+    LLM_HEDGE_DEFAULT_DELAY,
+    LLM_HEDGE_MIN_DELAY,
+)
+from app.core.metrics import get_metrics_registry
+
+T = TypeVar("T")
+
+
+class CircuitOpenError(Exception):
+    """서킷 브레이커가 열려 있어 호출하지 않은 경우"""
+
+
+class HedgeSkipped(Exception):
+    """헤지 시도를 보낼 여유가 없어 보내지 않은 경우 (예: 빈 admission 슬롯 없음)"""
+
+
+class CircuitBreaker:
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str, failure_threshold: int = LLM_BREAKER_FAILURES, reset_timeout: float = LLM_BREAKER_RESET):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+
+    def allow(self) -> bool:
+        """지금 호출해도 되는지 판단 (half-open에서는 시험 호출 1건만 허용)"""
+        if self.state == self.OPEN:
+            if time.monotonic() - self._opened_at < self.reset_timeout:
+                return False
+            self._transition(self.HALF_OPEN)
+        if self.state == self.HALF_OPEN:
+            if self._probe_in_flight:
+                return False
+            self._probe_in_flight = True
+        return True
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self._probe_in_flight = False
+        if self.state != self.CLOSED:
+            self._transition(self.CLOSED)
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        self._probe_in_flight = False
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            self._opened_at = time.monotonic()
+            if self.state != self.OPEN:
+                self._transition(self.OPEN)
+
+    def record_ignored(self) -> None:
+        """결과를 판단할 수 없는 호출 (자체 admission 거절, 클라이언트 취소 등)"""
+        self._probe_in_flight = False
+
+    def _transition(self, state: str) -> None:
+        print(f"🔌 서킷 브레이커 {self.name}: {self.state} → {state}")
+        self.state = state
+        get_metrics_registry().inc("circuit_transitions_total", breaker=self.name, state=state)
+
+    def stats(self) -> dict:
+        return {"state": self.state, "failures": self.failures}
+
+
+class LatencyWindow:
+    """최근 N개 성공 호출의 지연 시간으로 p95 계산"""
+
+    def __init__(self, size: int = 200, min_samples: int = 20):
+        self._samples = deque(maxlen=size)
+        self.min_samples = min_samples
+
+    def add(self, seconds: float) -> None:
+        self._samples.append(seconds)
+
+    def percentile(self, q: float) -> Optional[float]:
+        if len(self._samples) < self.min_samples:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, math.ceil(q * len(ordered)) - 1)]
+
+    def hedge_delay(self) -> float:
+        p95 = self.percentile(0.95)
+        return max(LLM_HEDGE_MIN_DELAY, p95 if p95 is not None else LLM_HEDGE_DEFAULT_DELAY)
+
+
+class EwmaStats:
+    """
+    호출 지연 시간과 오류율의 지수 가중 이동 평균 (최근 호출일수록 가중치가 큼)
+    지연 시간은 성공한 호출만, 오류율은 성공 0 / 실패 1로 반영합니다.
+    """
+
+    def __init__(self, alpha: float = 0.3):
+        self.alpha = alpha
+        self.latency: Optional[float] = None
+        self.error_rate = 0.0
+        self.samples = 0
+        self.last_failure_at = 0.0
+
+    def _update_error(self, value: float) -> None:
+        self.samples += 1
+        self.error_rate += self.alpha * (value - self.error_rate)
+
+    def record_success(self, seconds: float) -> None:
+        self.latency = seconds if self.latency is None else self.latency + self.alpha * (seconds - self.latency)
+        self._update_error(0.0)
+
+    def record_failure(self) -> None:
+        self.last_failure_at = time.monotonic()
+        self._update_error(1.0)
+
+    def stats(self) -> dict:
+        return {
+            "latency_seconds": round(self.latency, 3) if self.latency is not None else None,
+            "error_rate": round(self.error_rate, 3),
+            "samples": self.samples,
+        }
+
+
+async def hedged_call(
+    factory: Callable[[], Awaitable[T]],
+    delay: Optional[float],
+    name: str = "",
+    hedge_factory: Optional[Callable[[], Awaitable[T]]] = None
+) -> T:
+    """
+    factory()를 호출하고, delay 안에 끝나지 않으면 한 번 더 호출하여 먼저 성공한 결과 반환
+
+    Args:
+        factory: 매 시도마다 새 코루틴을 만드는 함수
+        delay: 두 번째 시도까지의 대기(초). None이면 헤지하지 않음
+        name: 메트릭 레이블
+        hedge_factory: 두 번째 시도용 코루틴 함수 (없으면 factory). HedgeSkipped를 던지면 헤지 생략
+    """
+    registry = get_metrics_registry()
+    tasks = [asyncio.ensure_future(factory())]
+    try:
+        if delay is not None:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if not done:
+                registry.inc("llm_hedge_fired_total", target=name)
+                tasks.append(asyncio.ensure_future((hedge_factory or factory)()))
+
+        pending = set(tasks)
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    if len(tasks) > 1:
+                        label = "hedge" if task is tasks[1] else "primary"
+                        registry.inc("llm_hedge_winner_total", target=name, winner=label)
+                    return task.result()
+                if isinstance(task.exception(), HedgeSkipped):
+                    registry.inc("llm_hedge_skipped_total", target=name)
+        # 모든 시도가 실패하면 첫 시도의 오류 전달
+        raise tasks[0].exception()
+    finally:
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_latencies: Dict[str, LatencyWindow] = {}
+_ewma_stats: Dict[str, EwmaStats] = {}
+
+
+def get_circuit_breaker(name: str) -> CircuitBreaker:
+    if name not in _breakers:
+        _breakers[name] = CircuitBreaker(name)
+    return _breakers[name]
+
+
+def get_latency_window(name: str) -> LatencyWindow:
+    if name not in _latencies:
+        _latencies[name] = LatencyWindow()
+    return _latencies[name]
+
+
+def get_ewma_stats(name: str) -> EwmaStats:
+    if name not in _ewma_stats:
+        _ewma_stats[name] = EwmaStats()
+    return _ewma_stats[name]
+
+
+def _collect_stats() -> dict:
+    return {
+        name: {**breaker.stats(), "p95_seconds": get_latency_window(name).percentile(0.95)}
+        for name, breaker in _breakers.items()
+    }
+
+
+get_metrics_registry().register_gauge("circuit_breakers", _collect_stats)
+get_metrics_registry().register_gauge(
+    "ewma_stats",
+    lambda: {name: stats.stats() for name, stats in _ewma_stats.items()}
+)
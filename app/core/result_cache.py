@@ -0,0 +1,175 @@
+"""
+생성 결과 캐시 (메모리 LRU + 로컬 디스크 2단계)
+같은 입력으로 다시 요청하면 LLM을 호출하지 않고 저장된 결과를 바로 반환합니다.
+
+- 메모리 계층: 최근 사용 순(LRU)으로 max_entries개까지 유지
+- 디스크 계층: RESULT_CACHE_DIR/<이름>/<키 앞 2자>/<키>.json, 재시작 후에도 유지
+  max_disk_entries를 넘으면 만료된 항목과 가장 오래된 항목부터 삭제
+- 만료 시각은 벽시계(time.time) 기준으로 저장하여 디스크 항목도 TTL을 지킵니다.
+- 디스크 I/O는 스레드에서 실행하여 이벤트 루프를 막지 않습니다.
+"""
+import asyncio
+import json
+import os
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+from app.core.config import RESULT_CACHE_DIR
+from app.core.metrics import get_metrics_registry
+
+
+class ResultCache:
+
+    _prune_every = 64  # 디스크 쓰기 N회마다 용량 정리
+
+    def __init__(
+        self,
+        name: str,
+        ttl: float,
+        max_entries: int,
+        max_disk_entries: int = 0,
+        directory: Optional[Path] = None,
+    ):
+        self.name = name
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_disk_entries = max_disk_entries
+        # max_disk_entries가 0이면 메모리 계층만 사용
+        self.directory = (directory or RESULT_CACHE_DIR / name) if max_disk_entries > 0 else None
+        self._memory: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._disk_writes = 0
+        self._pruning = False
+
+    def _path(self, key: str) -> Path:
+        return self.directory / key[:2] / f"{key}.json"
+
+    def _remember(self, key: str, expires_at: float, value: Any) -> None:
+        self._memory[key] = (expires_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    async def get(self, key: str) -> Optional[Any]:
+        """
+        저장된 결과 조회 (메모리 → 디스크 순, 디스크에서 찾으면 메모리로 올림)
+
+        Returns:
+            저장된 값, 없거나 만료되었으면 None
+        """
+        registry = get_metrics_registry()
+        now = time.time()
+        entry = self._memory.get(key)
+        if entry is not None:
+            if entry[0] > now:
+                self._memory.move_to_end(key)
+                registry.inc("result_cache_requests_total", cache=self.name, result="hit_memory")
+                return entry[1]
+            del self._memory[key]
+
+        if self.directory is not None:
+            try:
+                entry = await asyncio.to_thread(self._read_disk, key, now)
+            except Exception as e:
+                print(f"⚠️ 결과 캐시 디스크 읽기 실패 ({self.name}): {e}")
+                entry = None
+            if entry is not None:
+                self._remember(key, *entry)
+                registry.inc("result_cache_requests_total", cache=self.name, result="hit_disk")
+                return entry[1]
+
+        registry.inc("result_cache_requests_total", cache=self.name, result="miss")
+        return None
+
+    async def set(self, key: str, value: Any) -> None:
+        """결과 저장 (value는 JSON으로 직렬화 가능해야 함)"""
+        expires_at = time.time() + self.ttl
+        self._remember(key, expires_at, value)
+        if self.directory is None:
+            return
+        try:
+            await asyncio.to_thread(self._write_disk, key, expires_at, value)
+        except Exception as e:
+            # 디스크 계층 실패는 응답에 영향을 주지 않음 (메모리 계층은 유지)
+            print(f"⚠️ 결과 캐시 디스크 저장 실패 ({self.name}): {e}")
+            return
+        self._disk_writes += 1
+        if self._disk_writes % self._prune_every == 0 and not self._pruning:
+            self._pruning = True
+            try:
+                await asyncio.to_thread(self._prune_disk)
+            except Exception as e:
+                print(f"⚠️ 결과 캐시 디스크 정리 실패 ({self.name}): {e}")
+            finally:
+                self._pruning = False
+
+    def invalidate(self, key: str) -> None:
+        self._memory.pop(key, None)
+        if self.directory is not None:
+            self._path(key).unlink(missing_ok=True)
+
+    def _read_disk(self, key: str, now: float) -> Optional[Tuple[float, Any]]:
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return None
+        if data["expires_at"] <= now:
+            path.unlink(missing_ok=True)
+            return None
+        return data["expires_at"], data["value"]
+
+    def _write_disk(self, key: str, expires_at: float, value: Any) -> None:
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"expires_at": expires_at, "value": value}, f, ensure_ascii=False)
+        os.replace(tmp, path)
+
+    def _prune_disk(self) -> None:
+        """만료된 항목을 지우고, 남은 항목이 max_disk_entries를 넘으면 오래된 것부터 삭제"""
+        now = time.time()
+        files = []
+        for path in self.directory.glob("*/*.json"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            # 파일 수정 시각 + TTL이 지났으면 만료 (본문을 읽지 않고 판단)
+            if stat.st_mtime + self.ttl <= now:
+                path.unlink(missing_ok=True)
+            else:
+                files.append((stat.st_mtime, path))
+        excess = len(files) - self.max_disk_entries
+        if excess > 0:
+            files.sort()
+            for _, path in files[:excess]:
+                path.unlink(missing_ok=True)
+
+    def stats(self) -> dict:
+        return {
+            "memory_entries": len(self._memory),
+            "max_entries": self.max_entries,
+            "disk": str(self.directory) if self.directory is not None else None,
+            "ttl": self.ttl,
+        }
+
+
+_caches: Dict[str, ResultCache] = {}
+
+
+def get_result_cache(name: str, **kwargs) -> ResultCache:
+    """
+    이름별 공유 결과 캐시 (처음 호출할 때 kwargs로 생성)
+    """
+    if name not in _caches:
+        _caches[name] = ResultCache(name, **kwargs)
+    return _caches[name]
+
+
+get_metrics_registry().register_gauge(
+    "result_caches",
+    lambda: {name: cache.stats() for name, cache in _caches.items()}
+)
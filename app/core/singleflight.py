@@ -0,0 +1,88 @@
+"""
+동일 요청 단일 실행 (single-flight)
+같은 키의 요청이 동시에 여러 개 들어오면 업스트림 호출은 한 번만 하고
+결과(또는 예외)를 모든 대기자에게 공유합니다.
+
+- 키는 요청 내용을 정규화한 JSON의 SHA-256 해시 (canonical_key)
+- 공유 호출은 별도 태스크에서 실행되므로 먼저 온 요청이 취소되어도 다른 대기자는 영향을 받지 않습니다.
+  모든 대기자가 취소된 경우에만 업스트림 호출을 취소합니다.
+
+적용 범위는 결과를 한 번에 반환하는 호출(generate_text, generate_gemini_simple)뿐입니다.
+스트리밍 경로(generate_gemini_stream, Ollama 채팅 스트림)는 요청마다 admission 슬롯, TTFT 측정(StreamTracker),
+연결 종료 시 업스트림 취소가 묶여 있어 스트림을 여러 클라이언트에 나눠 주면 한 클라이언트의 취소/지연이
+다른 클라이언트에 영향을 주고, 대화 히스토리가 포함된 채팅 요청은 키가 같은 경우가 드물어 적용하지 않았습니다.
+"""
+import asyncio
+import hashlib
+import json
+from typing import Awaitable, Callable, Dict, TypeVar
+from app.core.metrics import get_metrics_registry
+
+T = TypeVar("T")
+
+
+def canonical_key(*parts) -> str:
+    """요청 구성 요소를 순서/공백에 무관한 해시 키로 변환"""
+    payload = json.dumps(parts, sort_keys=True, ensure_ascii=False, separators=(",", ":"), default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class _Flight:
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+
+    def __init__(self, name: str):
+        self.name = name
+        self._flights: Dict[str, _Flight] = {}
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[T]]) -> T:
+        """
+        key에 대해 진행 중인 호출이 있으면 그 결과를 기다리고, 없으면 fn()을 실행
+
+        Args:
+            key: canonical_key로 만든 요청 키
+            fn: 실제 업스트림 호출 코루틴을 만드는 함수
+        """
+        registry = get_metrics_registry()
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = _Flight(asyncio.ensure_future(fn()))
+            self._flights[key] = flight
+            flight.task.add_done_callback(lambda _: self._flights.pop(key, None))
+            registry.inc("singleflight_requests_total", flight=self.name, role="leader")
+        else:
+            registry.inc("singleflight_requests_total", flight=self.name, role="follower")
+
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task)
+        except asyncio.CancelledError:
+            if not flight.task.done() and flight.waiters == 1:
+                flight.task.cancel()
+            raise
+        finally:
+            flight.waiters -= 1
+
+    def stats(self) -> dict:
+        return {"in_flight": len(self._flights), "waiters": sum(f.waiters for f in self._flights.values())}
+
+
+_flights: Dict[str, SingleFlight] = {}
+
+
+def get_single_flight(name: str) -> SingleFlight:
+    if name not in _flights:
+        _flights[name] = SingleFlight(name)
+    return _flights[name]
+
+
+get_metrics_registry().register_gauge(
+    "singleflight",
+    lambda: {name: flight.stats() for name, flight in _flights.items()}
+)
@@ -0,0 +1,365 @@
+"""
+스트리밍 출력 계층 - WebSocket / NDJSON 공용
+업스트림(Ollama, Gemini) 토큰 이벤트를 크기/시간 창 단위로 병합하고,
+연결별 버퍼를 제한하여 느린 클라이언트에 명시적인 백프레셔를 적용합니다.
+
+이벤트는 {"type": ..., "content": ...} 형태의 dict이며,
+같은 type의 연속된 content 이벤트만 하나로 병합합니다.
+(start / end / thinking_start 같은 제어 이벤트는 순서를 유지한 채 그대로 전달)
+"""
+import asyncio
+import json
+import time
+from contextlib import suppress
+from typing import AsyncGenerator, AsyncIterator, Callable, Dict, List, Optional, Tuple
+from starlette.responses import StreamingResponse
+from app.core.metrics import get_metrics_registry
+from app.core.config import (
+    STREAM_COALESCE_MS,
+    STREAM_COALESCE_BYTES,
+    STREAM_BUFFER_EVENTS,
+    STREAM_STALL_TIMEOUT,
+)
+
+
+class SlowConsumerError(Exception):
+    """클라이언트가 버퍼를 비우지 못해 스트림을 중단한 경우"""
+
+
+_END = object()
+
+
+def _is_mergeable(event: dict) -> bool:
+    return set(event) == {"type", "content"} and isinstance(event["content"], str)
+
+
+def _event_size(event: dict) -> int:
+    content = event.get("content")
+    return len(content.encode("utf-8")) if isinstance(content, str) else 0
+
+
+def _append(batch: List[dict], event: dict) -> None:
+    """같은 type의 연속 content 이벤트는 하나로 병합"""
+    if batch and _is_mergeable(event) and _is_mergeable(batch[-1]) and batch[-1]["type"] == event["type"]:
+        batch[-1] = {"type": event["type"], "content": batch[-1]["content"] + event["content"]}
+    else:
+        batch.append(dict(event))
+
+
+class CoalescingStream:
+    """
+    이벤트 스트림을 병합된 배치 단위로 전달하는 비동기 이터레이터
+
+    - 업스트림은 별도 태스크에서 크기가 제한된 큐로 읽어들입니다.
+    - 소비자가 느리면 큐가 가득 차고 업스트림 읽기가 멈춥니다 (백프레셔).
+    - 큐가 stall_timeout 이상 가득 찬 상태면 SlowConsumerError로 스트림을 중단합니다.
+    - 첫 content 배치는 대기 없이 즉시 전달하여 첫 토큰 지연을 늘리지 않습니다.
+    """
+
+    def __init__(
+        self,
+        source: AsyncIterator[dict],
+        max_bytes: int = STREAM_COALESCE_BYTES,
+        max_delay: float = STREAM_COALESCE_MS / 1000,
+        max_buffer: int = STREAM_BUFFER_EVENTS,
+        stall_timeout: float = STREAM_STALL_TIMEOUT,
+    ):
+        self._source = source
+        self.max_bytes = max_bytes
+        self.max_delay = max_delay
+        self.stall_timeout = stall_timeout
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_buffer)
+        self._error = None
+
+    async def _pump(self) -> None:
+        try:
+            async for event in self._source:
+                try:
+                    await asyncio.wait_for(self._queue.put(event), timeout=self.stall_timeout)
+                except asyncio.TimeoutError:
+                    self._error = SlowConsumerError(
+                        f"클라이언트 수신 지연으로 스트림을 중단합니다 ({self.stall_timeout}s)"
+                    )
+                    break
+                # 동기 업스트림 이터레이터가 루프를 점유하지 않도록 양보
+                await asyncio.sleep(0)
+        except Exception as e:
+            self._error = e
+        finally:
+            if hasattr(self._source, "aclose"):
+                with suppress(Exception):
+                    await self._source.aclose()
+            await self._queue.put(_END)
+
+    async def __aiter__(self) -> AsyncGenerator[List[dict], None]:
+        loop = asyncio.get_running_loop()
+        pump = asyncio.create_task(self._pump())
+        first = True
+        try:
+            while True:
+                event = await self._queue.get()
+                if event is _END:
+                    break
+                batch: List[dict] = []
+                _append(batch, event)
+                size = _event_size(event)
+                ended = False
+
+                if not first:
+                    deadline = loop.time() + self.max_delay
+                    while size < self.max_bytes:
+                        # 이미 버퍼에 쌓인 이벤트는 대기 없이 가져옴
+                        if not self._queue.empty():
+                            event = self._queue.get_nowait()
+                        else:
+                            timeout = deadline - loop.time()
+                            if timeout <= 0:
+                                break
+                            try:
+                                event = await asyncio.wait_for(self._queue.get(), timeout)
+                            except asyncio.TimeoutError:
+                                break
+                        if event is _END:
+                            ended = True
+                            break
+                        _append(batch, event)
+                        size += _event_size(event)
+
+                if size:
+                    first = False
+                yield batch
+                if ended:
+                    break
+
+            if self._error is not None:
+                raise self._error
+        finally:
+            pump.cancel()
+            with suppress(asyncio.CancelledError, Exception):
+                await pump
+
+
+async def ndjson_stream(events: AsyncIterator[dict], **options) -> AsyncGenerator[str, None]:
+    """
+    이벤트 스트림을 병합된 NDJSON 청크로 변환 (StreamingResponse용)
+
+    배치 하나가 한 번의 write가 되도록 여러 줄을 하나의 문자열로 합쳐 yield 합니다.
+    """
+    try:
+        async for batch in CoalescingStream(events, **options):
+            yield "".join(json.dumps(event, ensure_ascii=False) + "\n" for event in batch)
+    except SlowConsumerError as e:
+        print(f"⚠️ NDJSON 스트림 중단: {e}")
+        yield json.dumps({"type": "error", "content": str(e)}, ensure_ascii=False) + "\n"
+
+
+async def send_websocket_stream(websocket, events: AsyncIterator[dict], **options) -> None:
+    """
+    이벤트 스트림을 병합하여 WebSocket으로 전송
+
+    Raises:
+        SlowConsumerError: 클라이언트가 stall_timeout 동안 수신하지 못한 경우
+    """
+    async for batch in CoalescingStream(events, **options):
+        for event in batch:
+            await websocket.send_json(event)
+
+
+def _default_token_count(event: dict) -> int:
+    """청크 하나 = 토큰 하나 (Ollama 스트림)"""
+    return 1 if _event_size(event) else 0
+
+
+def estimate_text_tokens(event: dict) -> int:
+    """여러 토큰이 묶여 오는 청크의 토큰 수 추정 (UTF-8 약 4바이트당 1토큰)"""
+    size = _event_size(event)
+    return max(1, size // 4) if size else 0
+
+
+class StreamTracker:
+    """
+    스트림 하나의 지연 시간, 출력 토큰 수, 종료 상태 추적
+
+    (provider, model) 레이블로 다음 값을 메트릭 레지스트리에 기록합니다.
+    - stream_queue_wait_seconds: 요청 수신 → admission 슬롯 확보
+    - stream_connect_seconds: 슬롯 확보 → 업스트림 스트림 연결
+    - stream_ttft_seconds: 요청 수신 → 첫 토큰
+    - stream_inter_token_seconds: 토큰 청크 사이 간격
+    - stream_tokens_per_second: 첫 토큰 이후 출력 속도
+    - stream_duration_seconds: 전체 시간 (status: completed / cancelled / error)
+
+    완료된 스트림의 평균 토큰 수(EWMA)를 (provider, model)별로 유지하여,
+    클라이언트 이탈로 취소된 스트림이 절약한 토큰 수를 추정합니다.
+    """
+
+    _average_tokens: Dict[Tuple[str, str], float] = {}
+    _alpha = 0.2
+
+    def __init__(self, provider: str, model: str, token_counter: Callable[[dict], int] = _default_token_count):
+        self.provider = provider
+        self.model = model
+        self.token_counter = token_counter
+        self.tokens = 0
+        self.cancelled = False
+        self.error = False
+        self.started_at = time.monotonic()
+        self.admitted_at: Optional[float] = None
+        self.connected_at: Optional[float] = None
+        self.first_token_at: Optional[float] = None
+        self.last_token_at: Optional[float] = None
+        self._finished = False
+
+    @property
+    def labels(self) -> dict:
+        return {"provider": self.provider, "model": self.model}
+
+    def mark_admitted(self) -> None:
+        """admission 슬롯 확보 시점 기록 (처음 한 번만)"""
+        if self.admitted_at is None:
+            self.admitted_at = time.monotonic()
+            get_metrics_registry().observe("stream_queue_wait_seconds", self.admitted_at - self.started_at, **self.labels)
+
+    def mark_connected(self) -> None:
+        """업스트림 스트림 연결 시점 기록 (처음 한 번만)"""
+        if self.connected_at is None:
+            self.mark_admitted()
+            self.connected_at = time.monotonic()
+            get_metrics_registry().observe("stream_connect_seconds", self.connected_at - self.admitted_at, **self.labels)
+
+    def add(self, event: dict) -> None:
+        if event.get("type") == "error":
+            self.error = True
+        tokens = self.token_counter(event)
+        if not tokens:
+            return
+        now = time.monotonic()
+        registry = get_metrics_registry()
+        if self.first_token_at is None:
+            self.first_token_at = now
+            registry.observe("stream_ttft_seconds", now - self.started_at, **self.labels)
+        else:
+            registry.observe("stream_inter_token_seconds", now - self.last_token_at, **self.labels)
+        self.last_token_at = now
+        self.tokens += tokens
+
+    def finish(self, cancelled: bool = False) -> None:
+        """스트림 종료 기록 (한 번만 집계)"""
+        if self._finished:
+            return
+        self._finished = True
+        self.cancelled = cancelled
+        registry = get_metrics_registry()
+        labels = self.labels
+        key = (self.provider, self.model)
+        registry.inc("stream_tokens_emitted_total", self.tokens, **labels)
+
+        status = "cancelled" if cancelled else "error" if self.error else "completed"
+        registry.observe("stream_duration_seconds", time.monotonic() - self.started_at, status=status, **labels)
+        if self.first_token_at is not None and self.last_token_at > self.first_token_at:
+            registry.observe(
+                "stream_tokens_per_second",
+                self.tokens / (self.last_token_at - self.first_token_at),
+                **labels
+            )
+
+        if cancelled:
+            average = self._average_tokens.get(key)
+            saved = max(0.0, average - self.tokens) if average is not None else 0.0
+            registry.inc("stream_cancelled_total", **labels)
+            registry.inc("stream_cancelled_tokens_saved_total", round(saved), **labels)
+            print(f"🛑 클라이언트 연결 종료로 스트림 취소 ({self.provider}/{self.model}, 출력 {self.tokens}토큰, 절약 추정 {saved:.0f}토큰)")
+        else:
+            registry.inc("stream_completed_total", **labels)
+            average = self._average_tokens.get(key)
+            self._average_tokens[key] = (
+                float(self.tokens) if average is None
+                else average + self._alpha * (self.tokens - average)
+            )
+
+
+async def count_tokens(events: AsyncIterator[dict], tracker: StreamTracker) -> AsyncGenerator[dict, None]:
+    """이벤트를 그대로 전달하면서 출력 토큰 수를 집계"""
+    async for event in events:
+        tracker.add(event)
+        yield event
+
+
+class GuardedStreamingResponse(StreamingResponse):
+    """
+    응답이 어떻게 끝나든 on_close를 호출하는 StreamingResponse
+
+    StreamingResponse의 background 작업은 정상 완료 시에만 실행되므로 (send 실패 시 ClientDisconnect로
+    중단), 본문이 시작되기 전에 연결이 끊겨도 admission 슬롯이 반환되도록 __call__ 전체를 감쌉니다.
+    """
+
+    def __init__(self, content, *, on_close: Callable[[], None], **kwargs):
+        super().__init__(content, **kwargs)
+        self.on_close = on_close
+
+    async def __call__(self, scope, receive, send) -> None:
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            self.on_close()
+
+
+async def cancel_on_disconnect(
+    request,
+    body: AsyncIterator[str],
+    tracker: Optional[StreamTracker] = None,
+    on_close: Optional[Callable[[], None]] = None,
+) -> AsyncGenerator[str, None]:
+    """
+    클라이언트 연결 종료 시 스트림 생성기를 즉시 취소하는 래퍼 (StreamingResponse용)
+
+    서버는 연결이 끊긴 뒤의 write를 조용히 무시하므로, 감지하지 않으면
+    업스트림(Ollama/Gemini) 생성이 끝날 때까지 토큰을 계속 소비합니다.
+    http.disconnect 수신 시 대기 중인 __anext__를 취소하고 생성기를 닫아
+    업스트림 스트림/HTTP 연결까지 정리합니다.
+    on_close는 스트림이 끝나거나 취소되면 호출됩니다 (admission 슬롯을 응답 완료 전에 반환).
+    서버가 body를 한 번도 읽지 않으면 (본문 시작 전 연결 종료, send 실패) 생성기의 finally가
+    실행되지 않아 호출되지 않으므로, 반드시 반환해야 하는 자원은 GuardedStreamingResponse의
+    on_close에도 함께 넘깁니다 (release는 여러 번 호출해도 안전해야 함).
+    """
+    async def watch_disconnect():
+        while True:
+            message = await request.receive()
+            if message["type"] == "http.disconnect":
+                return
+
+    watcher = asyncio.create_task(watch_disconnect())
+    iterator = body.__aiter__()
+    cancelled = False
+    try:
+        while True:
+            next_chunk = asyncio.ensure_future(iterator.__anext__())
+            done, _ = await asyncio.wait({next_chunk, watcher}, return_when=asyncio.FIRST_COMPLETED)
+            if next_chunk in done:
+                try:
+                    chunk = next_chunk.result()
+                except StopAsyncIteration:
+                    break
+                yield chunk
+                if watcher.done():
+                    cancelled = True
+                    break
+            else:
+                cancelled = True
+                next_chunk.cancel()
+                with suppress(asyncio.CancelledError, Exception):
+                    await next_chunk
+                break
+    except (asyncio.CancelledError, GeneratorExit):
+        cancelled = True
+        raise
+    finally:
+        watcher.cancel()
+        with suppress(asyncio.CancelledError, Exception):
+            await watcher
+        if hasattr(iterator, "aclose"):
+            with suppress(Exception):
+                await iterator.aclose()
+        if tracker is not None:
+            tracker.finish(cancelled=cancelled)
+        if on_close is not None:
+            on_close()
@@ -0,0 +1,137 @@
+"""
+multipart/form-data 이미지 업로드 파싱
+base64 JSON 필드 대신 이미지 파일을 그대로 받아 메모리 사용량(문자열 + 디코딩 복사본)을 줄입니다.
+
+- 요청 본문을 스트리밍으로 읽으며 파일을 SpooledTemporaryFile에 기록 (1MB를 넘으면 디스크로 전환)
+- 파일별 크기 제한과 본문 전체 크기 제한을 읽는 도중에 검사하여, 한도를 넘는 순간 읽기를 중단하고 413
+- 파일 수/필드 수 제한 (python-multipart 파서 기본 기능)
+"""
+from typing import Dict, List, Optional
+from starlette.datastructures import UploadFile
+from starlette.formparsers import MultiPartException, MultiPartParser
+from app.core.config import IMAGE_UPLOAD_MAX_MB, IMAGE_UPLOAD_MAX_FILES
+from app.core.exceptions import bad_request, payload_too_large
+
+_FORM_OVERHEAD = 64 * 1024  # 텍스트 필드와 파트 헤더에 허용하는 여유분
+
+
+class _FileTooLarge(MultiPartException):
+    pass
+
+
+class _LimitedMultiPartParser(MultiPartParser):
+    """
+    파일 파트 데이터를 받을 때마다 누적 크기를 검사하는 파서
+
+    Starlette MultiPartParser의 내부 콜백(on_part_begin/on_part_data)과 _current_part에 의존하므로
+    Starlette 버전을 고정합니다 (requirements.txt, pyproject.toml).
+    내부 구조가 바뀌어 이 검사가 동작하지 않더라도 parse_image_form이 파싱 후 파일 크기를 다시 확인합니다.
+    """
+
+    def __init__(self, headers, stream, max_file_bytes: int, **kwargs):
+        super().__init__(headers, stream, **kwargs)
+        self.max_file_bytes = max_file_bytes
+        self._file_bytes = 0
+
+    def on_part_begin(self) -> None:
+        super().on_part_begin()
+        self._file_bytes = 0
+
+    def on_part_data(self, data: bytes, start: int, end: int) -> None:
+        if self._current_part.file is not None:
+            self._file_bytes += end - start
+            if self._file_bytes > self.max_file_bytes:
+                raise _FileTooLarge(self._current_part.field_name)
+        super().on_part_data(data, start, end)
+
+
+class ImageForm:
+    """파싱된 업로드 폼 (텍스트 필드 + 파일 바이트)"""
+
+    def __init__(self, fields: Dict[str, List[str]], files: Dict[str, List[bytes]]):
+        self.fields = fields
+        self.files = files
+
+    def value(self, name: str, default: Optional[str] = None) -> Optional[str]:
+        values = self.fields.get(name)
+        return values[-1] if values else default
+
+    def file(self, name: str) -> Optional[bytes]:
+        files = self.files.get(name)
+        return files[0] if files else None
+
+    def file_list(self, name: str) -> List[bytes]:
+        return self.files.get(name, [])
+
+    def model_fields(self) -> Dict[str, str]:
+        """마지막 값 기준 텍스트 필드 dict (pydantic 요청 모델 생성용, 빈 값은 제외)"""
+        return {name: values[-1] for name, values in self.fields.items() if values and values[-1] != ""}
+
+
+async def parse_image_form(
+    request,
+    max_file_bytes: int = IMAGE_UPLOAD_MAX_MB * 1024 * 1024,
+    max_files: int = IMAGE_UPLOAD_MAX_FILES,
+) -> ImageForm:
+    """
+    multipart/form-data 요청 파싱
+
+    Args:
+        request: starlette Request
+        max_file_bytes: 파일 하나의 최대 크기
+        max_files: 최대 파일 수
+
+    Raises:
+        APIError: multipart가 아니거나 형식이 잘못된 경우 (400), 크기 제한 초과 (413)
+    """
+    content_type = request.headers.get("content-type", "")
+    if not content_type.startswith("multipart/form-data"):
+        raise bad_request("multipart_required", {"content_type": content_type or None})
+
+    max_body_bytes = max_file_bytes * max_files + _FORM_OVERHEAD
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > max_body_bytes:
+        raise payload_too_large("request_too_large", {"max_bytes": max_body_bytes})
+
+    async def limited_stream():
+        # Content-Length가 없거나(chunked) 거짓이어도 실제로 읽은 양으로 제한
+        received = 0
+        async for chunk in request.stream():
+            received += len(chunk)
+            if received > max_body_bytes:
+                raise MultiPartException("request_too_large")
+            yield chunk
+
+    parser = _LimitedMultiPartParser(
+        request.headers,
+        limited_stream(),
+        max_file_bytes=max_file_bytes,
+        max_files=max_files,
+        max_fields=50,
+    )
+    try:
+        form = await parser.parse()
+    except _FileTooLarge as e:
+        raise payload_too_large("file_too_large", {"field": e.message, "max_bytes": max_file_bytes})
+    except MultiPartException as e:
+        if e.message == "request_too_large":
+            raise payload_too_large("request_too_large", {"max_bytes": max_body_bytes})
+        raise bad_request("invalid_multipart", {"details": e.message})
+
+    fields: Dict[str, List[str]] = {}
+    files: Dict[str, List[bytes]] = {}
+    try:
+        for name, value in form.multi_items():
+            if isinstance(value, UploadFile):
+                # 읽는 도중 검사가 우회된 경우를 위한 최종 확인 (UploadFile.size는 공개 속성)
+                if value.size is not None and value.size > max_file_bytes:
+                    raise payload_too_large("file_too_large", {"field": name, "max_bytes": max_file_bytes})
+                # 파일 이름만 있고 내용이 없는 파트(브라우저가 빈 file input을 보낼 때)는 무시
+                data = await value.read()
+                if data:
+                    files.setdefault(name, []).append(data)
+            else:
+                fields.setdefault(name, []).append(value)
+    finally:
+        await form.close()
+    return ImageForm(fields, files)
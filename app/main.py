@@ -3,36 +3,54 @@ from fastapi.staticfiles import StaticFiles
 from fastapi.responses import FileResponse
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
-from app.routers import predict_routes, sentiment_routes, chat_routes, gemini_routes, invitation_routes, image_generation_routes
+from app.routers import predict_routes, sentiment_routes, chat_routes, gemini_routes, invitation_routes, image_generation_routes, metrics_routes
 from app.core.exceptions import APIError, api_error_handler, RequestValidationError, validation_error_handler, global_exception_handler
 from app.services.model_service import load_ai_model
 from app.services.sentiment_service import get_sentiment_service
+from app.services.ollama_service import get_ollama_pool, close_ollama_pool
+from app.services.ollama_residency_service import get_residency_manager
+from app.core.config import OLLAMA_WARMUP_ON_STARTUP
+from app.core.jobs import close_job_managers
+import asyncio
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # TensorFlow/Keras 모델 로딩 (Python 3.13 호환성 이슈로 선택적 로딩)
     import sys
     if sys.version_info < (3, 13):
-    # Load image classification model on startup
-    try:
-        load_ai_model()
-        print("✅ Image classification model loaded")
-    except Exception as e:
-        print(f"⚠️  WARNING: Failed to load image classification model: {e}")
-    
-    # Load sentiment analysis model on startup
-    try:
-        get_sentiment_service()
-        print("✅ Sentiment analysis model loaded")
-    except Exception as e:
-        print(f"⚠️  WARNING: Failed to load sentiment analysis model: {e}")
+        # Load image classification model on startup
+        try:
+            load_ai_model()
+            print("✅ Image classification model loaded")
+        except Exception as e:
+            print(f"⚠️  WARNING: Failed to load image classification model: {e}")
+        
+        # Load sentiment analysis model on startup
+        try:
+            get_sentiment_service()
+            print("✅ Sentiment analysis model loaded")
+        except Exception as e:
+            print(f"⚠️  WARNING: Failed to load sentiment analysis model: {e}")
     else:
         print("⚠️ Python 3.13 감지: TensorFlow 호환성 문제로 모델 로딩 건너뜀")
         print("   이미지 분류/감성 분석 기능은 비활성화됩니다.")
         print("   청첩장 이미지 생성(Gemini/FLUX) 기능은 정상 작동합니다.")
     
+    # Ollama 호스트 헬스 체크 (로드된 모델 목록도 함께 갱신)
+    get_ollama_pool().start_health_checks()
+    
+    # 핫 Ollama 모델 미리 로드/워밍업 (서버 시작을 막지 않도록 백그라운드 실행)
+    warmup_task = None
+    if OLLAMA_WARMUP_ON_STARTUP:
+        warmup_task = asyncio.create_task(get_residency_manager().warmup())
+    
     yield
-    # Clean up if needed
+    if warmup_task is not None:
+        warmup_task.cancel()
+    # 헬스 체크 중단 및 Ollama 연결 풀 정리
+    await close_ollama_pool()
+    # 이미지 생성 작업 워커 중단 (실행 중인 작업은 failed로 기록)
+    await close_job_managers()
 
 app = FastAPI(
     title="AI Model Serving API",
@@ -57,6 +75,7 @@ app.include_router(chat_routes.router, prefix="/api", tags=["Chat"])
 app.include_router(gemini_routes.router, prefix="/api", tags=["Gemini Chat"])
 app.include_router(invitation_routes.router, prefix="/api", tags=["Invitation"])
 app.include_router(image_generation_routes.router, prefix="/api", tags=["Image Generation"])
+app.include_router(metrics_routes.router, prefix="/api", tags=["System"])
 
 app.mount("/static", StaticFiles(directory="app/static"), name="static")
 
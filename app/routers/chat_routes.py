@@ -1,13 +1,39 @@
-from fastapi import APIRouter
-from fastapi.responses import StreamingResponse
+from fastapi import APIRouter, Request
 from app.schemas.chat_schema import ChatRequest
 from app.services.chat_service import generate_chat_response
+from app.core.streaming import GuardedStreamingResponse, StreamTracker, cancel_on_disconnect
+from app.core.admission import get_admission_controller
+from app.services.ollama_residency_service import get_residency_manager
 
 router = APIRouter()
 
 @router.post("/chat")
-async def chat_endpoint(request: ChatRequest):
-    return StreamingResponse(
-        generate_chat_response(request.message, request.model),
-        media_type="application/x-ndjson"
+async def chat_endpoint(request: ChatRequest, http_request: Request):
+    # 허용 목록에 없는 모델은 Ollama에 로드하지 않고 400 응답
+    get_residency_manager().check(request.model)
+    # 클라이언트가 연결을 끊으면 Ollama 생성도 즉시 중단 (TTFT/처리량은 tracker가 기록)
+    tracker = StreamTracker("ollama", request.model)
+    # 스트림 시작 전에 슬롯을 확보하여 과부하 시 503/429로 바로 응답
+    permit = await get_admission_controller().acquire("ollama", request.model)
+    tracker.mark_admitted()
+    return GuardedStreamingResponse(
+        cancel_on_disconnect(
+            http_request,
+            generate_chat_response(request.message, request.model, tracker, permit),
+            tracker,
+            on_close=permit.release
+        ),
+        media_type="application/x-ndjson",
+        on_close=permit.release
     )
+
+
+@router.get("/chat/models")
+async def list_chat_models():
+    """
+    사용 가능한 Ollama 채팅 모델과 현재 메모리에 상주 중인 모델 조회
+    """
+    return {
+        "message": "chat_models_listed",
+        "data": await get_residency_manager().status()
+    }
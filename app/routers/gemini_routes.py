@@ -1,16 +1,134 @@
 """
 Gemini 2.5 Flash WebSocket 및 HTTP 라우터
 """
-from fastapi import APIRouter, WebSocket, WebSocketDisconnect
-from fastapi.responses import StreamingResponse
+from fastapi import APIRouter, Request, WebSocket, WebSocketDisconnect
 from app.services.gemini_service import generate_gemini_stream, generate_gemini_simple
 from app.schemas.chat_schema import ChatRequest
+from app.core.streaming import (
+    GuardedStreamingResponse,
+    ndjson_stream,
+    send_websocket_stream,
+    SlowConsumerError,
+    StreamTracker,
+    count_tokens,
+    cancel_on_disconnect,
+    estimate_text_tokens,
+)
+from app.core.config import GEMINI_WS_MAX_CONCURRENT
+from app.core.admission import get_admission_controller
+import asyncio
 import json
-from typing import Optional
+from typing import Dict, Optional
 
 router = APIRouter(tags=["Gemini Chat"])
 
 
+async def _gemini_ws_events(message: str, chat_history: list, model: str, collected: list, tracker: StreamTracker):
+    """Gemini 청크를 WebSocket 이벤트로 변환 (수신한 텍스트는 collected에 누적)"""
+    async for chunk in generate_gemini_stream(message, chat_history, model, tracker=tracker):
+        if chunk.startswith("Error:"):
+            yield {"type": "error", "content": chunk}
+            return
+        collected.append(chunk)
+        yield {"type": "chunk", "content": chunk}
+
+
+class _GeminiSocketSession:
+    """WebSocket 연결 단위 상태 (대화 히스토리, 진행 중인 요청, 전송 잠금)"""
+
+    def __init__(self, websocket: WebSocket):
+        self.websocket = websocket
+        self.chat_history: list = []
+        self.tasks: Dict[str, asyncio.Task] = {}
+        self._send_lock = asyncio.Lock()
+
+    async def send_json(self, data: dict, request_id: Optional[str] = None):
+        # 여러 요청의 청크가 섞여 전송되므로 프레임 단위로 직렬화
+        if request_id is not None:
+            data = {**data, "request_id": request_id}
+        async with self._send_lock:
+            await self.websocket.send_json(data)
+
+    def sender(self, request_id: Optional[str]) -> "_TaggedSender":
+        return _TaggedSender(self, request_id)
+
+    async def cancel_all(self):
+        for task in list(self.tasks.values()):
+            task.cancel()
+        if self.tasks:
+            await asyncio.gather(*self.tasks.values(), return_exceptions=True)
+
+
+class _TaggedSender:
+    """request_id를 붙여 전송하는 WebSocket 대리 객체"""
+
+    def __init__(self, session: _GeminiSocketSession, request_id: Optional[str]):
+        self.session = session
+        self.request_id = request_id
+
+    async def send_json(self, data: dict):
+        await self.session.send_json(data, self.request_id)
+
+
+async def _run_generation(session: _GeminiSocketSession, sender: _TaggedSender, message: str, model: str):
+    """
+    메시지 하나에 대한 스트리밍 응답 (start → chunk... → end)
+    
+    동시에 진행되는 요청끼리 히스토리가 섞이지 않도록 시작 시점의 히스토리를 복사해 사용하고,
+    생성이 끝나면 사용자/응답 턴을 한 쌍으로 기록합니다 (취소/실패 시 기록하지 않음).
+    """
+    user_turn = {"role": "user", "content": message}
+    history = [*session.chat_history, user_turn]
+    
+    # 스트리밍 시작 신호
+    await sender.send_json({"type": "start"})
+    
+    # 스트리밍 응답 생성 (청크 병합 + 백프레셔, TTFT/처리량 기록)
+    collected = []
+    tracker = StreamTracker("gemini", model, token_counter=estimate_text_tokens)
+    cancelled = False
+    try:
+        await send_websocket_stream(
+            sender,
+            count_tokens(_gemini_ws_events(message, history, model, collected, tracker), tracker)
+        )
+    except (asyncio.CancelledError, WebSocketDisconnect):
+        cancelled = True
+        raise
+    finally:
+        tracker.finish(cancelled=cancelled)
+    full_response = "".join(collected)
+    
+    # 사용자 메시지와 응답을 완료 순서대로 한 쌍씩 히스토리에 추가
+    if full_response and not full_response.startswith("Error:"):
+        session.chat_history.extend([user_turn, {"role": "assistant", "content": full_response}])
+    
+    # 스트리밍 완료 신호
+    await sender.send_json({"type": "end"})
+
+
+async def _run_tagged_generation(session: _GeminiSocketSession, request_id: str, message: str, model: str):
+    """request_id가 지정된 요청을 별도 태스크로 실행"""
+    sender = session.sender(request_id)
+    try:
+        await _run_generation(session, sender, message, model)
+    except asyncio.CancelledError:
+        raise
+    except SlowConsumerError as e:
+        print(f"⚠️ WebSocket 수신 지연으로 연결 종료: {e}")
+        await session.websocket.close(code=1013)
+    except WebSocketDisconnect:
+        pass
+    except Exception as e:
+        print(f"WebSocket 요청 오류 ({request_id}): {e}")
+        try:
+            await sender.send_json({"type": "error", "content": f"서버 오류: {str(e)}"})
+        except Exception:
+            pass
+    finally:
+        session.tasks.pop(request_id, None)
+
+
 @router.websocket("/gemini/ws")
 async def gemini_websocket(websocket: WebSocket):
     """
@@ -21,82 +139,104 @@ async def gemini_websocket(websocket: WebSocket):
         "type": "message",
         "content": "사용자 메시지",
         "model": "gemini-2.5-flash" (선택적),
-        "chat_history": [...] (선택적)
+        "chat_history": [...] (선택적),
+        "request_id": "클라이언트 지정 요청 ID" (선택적)
     }
     
+    request_id를 지정하면 여러 요청이 동시에 처리되며, 해당 요청에 대한
+    모든 응답에 같은 request_id가 붙습니다. (연결당 최대 GEMINI_WS_MAX_CONCURRENT개)
+    진행 중인 요청은 {"type": "cancel", "request_id": "..."}로 즉시 중단할 수 있습니다.
+    request_id가 없으면 기존처럼 한 번에 하나씩 순차 처리합니다.
+    
     서버는 다음 형식으로 응답합니다:
     - {"type": "start"} - 스트리밍 시작
     - {"type": "chunk", "content": "텍스트 청크"} - 스트리밍 데이터
     - {"type": "end"} - 스트리밍 완료
+    - {"type": "cancelled"} - 요청 취소 완료
     - {"type": "error", "content": "에러 메시지"} - 에러 발생
     """
     await websocket.accept()
     
-    chat_history = []
+    session = _GeminiSocketSession(websocket)
     
     try:
         while True:
             # 클라이언트로부터 메시지 수신
             raw_text = await websocket.receive_text()
             data = json.loads(raw_text)
+            request_id = data.get('request_id')
+            if request_id is not None:
+                request_id = str(request_id)
             
             if data.get('type') == 'message':
                 message = data.get('content', '')
                 model = data.get('model', 'gemini-2.5-flash')
-                chat_history = data.get('chat_history', chat_history)
+                if 'chat_history' in data:
+                    session.chat_history = data['chat_history']
                 
                 if not message:
-                    await websocket.send_json({
+                    await session.send_json({
                         "type": "error",
                         "content": "메시지가 비어있습니다."
-                    })
+                    }, request_id)
                     continue
                 
-                # 사용자 메시지를 히스토리에 추가
-                chat_history.append({"role": "user", "content": message})
+                if request_id is None:
+                    # 기존 프로토콜: 순차 처리
+                    await _run_generation(session, session.sender(None), message, model)
+                    continue
                 
-                # 스트리밍 시작 신호
-                await websocket.send_json({"type": "start"})
+                if request_id in session.tasks:
+                    await session.send_json({
+                        "type": "error",
+                        "content": f"이미 진행 중인 request_id입니다: {request_id}"
+                    }, request_id)
+                    continue
                 
-                # 스트리밍 응답 생성
-                full_response = ""
-                async for chunk in generate_gemini_stream(message, chat_history, model):
-                    if chunk.startswith("Error:"):
-                        await websocket.send_json({
-                            "type": "error",
-                            "content": chunk
-                        })
-                        break
-                    
-                    full_response += chunk
-                    await websocket.send_json({
-                        "type": "chunk",
-                        "content": chunk
-                    })
+                if len(session.tasks) >= GEMINI_WS_MAX_CONCURRENT:
+                    await session.send_json({
+                        "type": "error",
+                        "content": f"동시 요청 한도({GEMINI_WS_MAX_CONCURRENT}개)를 초과했습니다."
+                    }, request_id)
+                    continue
                 
-                # 응답을 히스토리에 추가
-                if full_response and not full_response.startswith("Error:"):
-                    chat_history.append({"role": "assistant", "content": full_response})
+                session.tasks[request_id] = asyncio.create_task(
+                    _run_tagged_generation(session, request_id, message, model)
+                )
+            
+            elif data.get('type') == 'cancel':
+                task = session.tasks.get(request_id)
+                if task is None:
+                    await session.send_json({
+                        "type": "error",
+                        "content": f"진행 중인 요청이 없습니다: {request_id}"
+                    }, request_id)
+                    continue
                 
-                # 스트리밍 완료 신호
-                await websocket.send_json({"type": "end"})
+                # 업스트림 스트림까지 즉시 중단
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+                await session.send_json({"type": "cancelled"}, request_id)
             
             elif data.get('type') == 'clear_history':
                 # 대화 히스토리 초기화
-                chat_history = []
-                await websocket.send_json({
+                session.chat_history = []
+                await session.send_json({
                     "type": "info",
                     "content": "대화 히스토리가 초기화되었습니다."
                 })
             
             else:
-                await websocket.send_json({
+                await session.send_json({
                     "type": "error",
                     "content": f"알 수 없는 메시지 타입: {data.get('type')}"
-                })
+                }, request_id)
                 
     except WebSocketDisconnect:
         print("WebSocket 연결이 종료되었습니다.")
+    except SlowConsumerError as e:
+        print(f"⚠️ WebSocket 수신 지연으로 연결 종료: {e}")
+        await websocket.close(code=1013)
     except Exception as e:
         print(f"WebSocket 오류: {e}")
         try:
@@ -107,29 +247,49 @@ async def gemini_websocket(websocket: WebSocket):
         except:
             pass
         await websocket.close()
+    finally:
+        # 연결 종료 시 진행 중인 모든 생성 중단
+        await session.cancel_all()
 
 
 @router.post("/gemini/chat")
-async def gemini_chat_endpoint(request: ChatRequest):
+async def gemini_chat_endpoint(request: ChatRequest, http_request: Request):
     """
     Gemini 2.5 Flash HTTP 스트리밍 엔드포인트
     
     NDJSON 형식으로 스트리밍 응답 반환
+    클라이언트가 연결을 끊으면 Gemini 스트림도 즉시 중단합니다.
     """
-    async def generate_ndjson():
+    model = getattr(request, 'model', 'gemini-2.5-flash')
+    tracker = StreamTracker("gemini", model, token_counter=estimate_text_tokens)
+    
+    # 스트림 시작 전에 슬롯을 확보하여 과부하 시 503/429로 바로 응답
+    permit = await get_admission_controller().acquire("gemini", model)
+    tracker.mark_admitted()
+    
+    async def generate_events():
         async for chunk in generate_gemini_stream(
             request.message,
-            model=getattr(request, 'model', 'gemini-2.5-flash')
+            model=model,
+            permit=permit,
+            tracker=tracker
         ):
-            data = {
+            if chunk.startswith("Error:"):
+                tracker.error = True
+            yield {
                 "type": "content",
                 "content": chunk
             }
-            yield json.dumps(data) + "\n"
     
-    return StreamingResponse(
-        generate_ndjson(),
-        media_type="application/x-ndjson"
+    return GuardedStreamingResponse(
+        cancel_on_disconnect(
+            http_request,
+            ndjson_stream(count_tokens(generate_events(), tracker)),
+            tracker,
+            on_close=permit.release
+        ),
+        media_type="application/x-ndjson",
+        on_close=permit.release
     )
 
 
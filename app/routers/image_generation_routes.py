@@ -1,40 +1,73 @@
 """
 청첩장 이미지 생성 라우터
 """
-from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel
-from typing import Optional
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import FileResponse, Response, StreamingResponse
+from pydantic import BaseModel, ValidationError
+from typing import List, Optional
+import asyncio
 import base64
+import binascii
+import json
+import time
 
-from app.services.huggingface_service import (
-    generate_image_sdxl, 
-    generate_image_flux,
-    generate_image_flux_schnell,
-    generate_image_playground_v25,
-    generate_image_sd15,
-    generate_image_realistic_vision,
-    generate_image_dreamshaper,
-    generate_image_flux_image_to_image
+from app.services.image_model_registry import (
+    IMAGE_TO_IMAGE,
+    REFERENCE_IMAGES,
+    TEXT_TO_IMAGE,
+    ImageModelSpec,
+    get_image_model,
+    list_image_models,
 )
-from app.services.gemini_image_service import generate_image_gemini3, modify_image_gemini3
+from app.core.config import IMAGE_JOB_SSE_HEARTBEAT, IMAGE_COMPARE_MAX_MODELS, IMAGE_COMPARE_TIMEOUT_MS
+from app.core.exceptions import APIError, bad_request, not_found, unprocessable
+from app.core.images import GeneratedImage, image_response
+from app.core.image_store import get_image_store
+from app.core.jobs import get_image_job_manager
+from app.core.streaming import ndjson_stream, cancel_on_disconnect
+from app.core.uploads import parse_image_form
+from app.services.image_cache_service import generate_images_cached
+from app.services.image_routing_service import AUTO_MODEL, describe_auto, eligible_auto_models, generate_images_auto
 
 router = APIRouter(tags=["Image Generation"])
 
 
-class ImageGenerateRequest(BaseModel):
+class ImageGenerateOptions(BaseModel):
+    """이미지 생성 옵션 (JSON 요청과 multipart 업로드 폼 공통)"""
     prompt: str  # 영어 프롬프트
-    model: str = "sdxl"  # sdxl, flux, flux-schnell, playground, sd15, realistic-vision, dreamshaper, gemini
+    model: str = "sdxl"  # image_model_registry.IMAGE_MODELS의 ID (GET /image/models 참고) 또는 "auto"
+    number_of_images: Optional[int] = None  # 생성할 이미지 수 (multi-image 모델만, 예: imagen)
+    response_format: str = "url"  # url: JSON + 이미지 URL, base64: JSON + data URI, binary: 이미지 바이트 (여러 장이면 multipart/mixed)
+    fresh: bool = False  # True면 결과 캐시를 건너뛰고 새로 생성
+
+
+class ImageGenerateRequest(ImageGenerateOptions):
     base_image_b64: Optional[str] = None  # base64 인코딩된 이미지 (flux, gemini용)
 
 
-class ImageModifyRequest(BaseModel):
-    base_image_b64: str
+class ImageModifyOptions(BaseModel):
+    """이미지 수정 옵션 (JSON 요청과 multipart 업로드 폼 공통)"""
     modification_prompt: str  # 수정 요청 (영어)
-    model: str = "flux"  # flux 또는 gemini
+    model: str = "flux"  # image-to-image 지원 모델 (flux, gemini) 또는 "auto"
+    response_format: str = "url"  # url, base64, binary (/image/generate와 동일)
+    fresh: bool = False  # True면 결과 캐시를 건너뛰고 새로 생성
+
+
+class ImageModifyRequest(ImageModifyOptions):
+    base_image_b64: str
     person_image_b64: Optional[str] = None  # 인물 사진 (base64)
     style_images_b64: Optional[list[str]] = None  # 스타일 참고 사진 (base64 리스트)
 
 
+class ImageCompareRequest(BaseModel):
+    prompt: str  # 영어 프롬프트
+    models: List[str]  # 비교할 모델 ID 목록 (최대 IMAGE_COMPARE_MAX_MODELS개)
+    base_image_b64: Optional[str] = None  # 지정하면 image-to-image 지원 모델만 가능
+    timeout_ms: Optional[int] = None  # 모델별 제한 시간 (기본값 IMAGE_COMPARE_TIMEOUT_MS)
+    response_format: str = "url"  # url, base64
+    fresh: bool = False
+
+
 @router.post("/image/generate")
 async def generate_invitation_image(request: ImageGenerateRequest):
     """
@@ -44,6 +77,7 @@ async def generate_invitation_image(request: ImageGenerateRequest):
     - sdxl: Stable Diffusion XL (무료, 텍스트만, nscale provider)
     - flux: FLUX.2-dev (무료, 텍스트 또는 이미지+텍스트, fal-ai provider)
     - flux-schnell: FLUX.1-schnell (무료, 빠른 생성, 텍스트만, fal-ai provider)
+    - flux-dev: FLUX.1-dev (무료, 텍스트만, nebius provider)
     - playground: Playground v2.5 (무료, 고품질, 텍스트만)
     - sd15: Stable Diffusion 1.5 (무료, 텍스트만)
     - realistic-vision: Realistic Vision V5.1 (무료, 사실적인 이미지, 텍스트만)
@@ -51,106 +85,63 @@ async def generate_invitation_image(request: ImageGenerateRequest):
     - gemini: gemini-3-pro-image-preview (유료, 텍스트 기반 이미지 생성)
     
     Image-to-Image 지원 모델:
-    - flux: FLUX.2-dev만 지원
+    - flux: FLUX.2-dev
+    - gemini: gemini-3-pro-image-preview
+    
+    전체 목록과 지원 기능은 GET /image/models 참고
+    
+    생성된 이미지는 모두 이미지 저장소에 저장되고 GET /api/image/{digest}로 다시 받을 수 있습니다.
+    
+    response_format:
+    - url (기본값): {"message": "image_generated", "data": {"digest": "...", "image_url": "/api/image/...", ...}}
+    - base64: 위 응답에 "image_b64": "data:image/png;base64,..." 추가
+    - binary: 이미지 바이트 그대로 (Content-Type: image/png, image/jpeg, image/webp),
+      여러 장이면 multipart/mixed. 모델/생성 시간/digest는 X-Model, X-Provider, X-Generation-Ms, X-Image-Digest 헤더로 전달
+    
+    같은 모델 + 프롬프트 + 기본 이미지 + 파라미터의 결과는 캐시되어 바로 반환됩니다 ("cached": true, X-Cache: HIT).
+    새로 생성하려면 "fresh": true
+    
+    model="auto": IMAGE_AUTO_MODELS 후보 중 최근 지연 시간/오류율이 가장 좋은 모델로 생성하고,
+    실패하거나 시간이 초과되면 다음 후보로 전환합니다. 실제 사용한 모델은 data.model, 시도 기록은 data.attempts
+    
+    오래 걸리는 모델은 POST /image/jobs/generate로 비동기 작업을 만들 수 있습니다.
+    이미지를 base64 대신 파일로 보내려면 POST /image/generate/upload (multipart/form-data)
+    """
+    base_image = _decode_b64(request.base_image_b64) if request.base_image_b64 else None
+    return await _generate(request, base_image)
+
+
+@router.post("/image/generate/upload")
+async def generate_invitation_image_upload(http_request: Request):
     """
+    청첩장 이미지 생성 (multipart/form-data 업로드)
+    
+    /image/generate와 같지만 기본 이미지를 base64 문자열 대신 파일로 받습니다.
+    파일은 스트리밍으로 읽어 임시 파일에 저장하고, 크기 제한(IMAGE_UPLOAD_MAX_MB)을 넘으면 읽는 도중 413으로 중단합니다.
+    
+    폼 필드:
+    - prompt, model, number_of_images, response_format, fresh: /image/generate와 동일
+    - base_image: 기본 이미지 파일 (선택)
+    """
+    form = await parse_image_form(http_request)
+    options = _form_options(ImageGenerateOptions, form.model_fields())
+    return await _generate(options, form.file("base_image"))
+
+
+async def _generate(request: ImageGenerateOptions, base_image: Optional[bytes]):
+    _check_response_format(request.response_format)
+    if request.model == AUTO_MODEL:
+        return await _generate_auto("image_generated", request.prompt, base_image, request)
+    spec = get_image_model(request.model)
+    params = {}
+    if request.number_of_images is not None:
+        params["number_of_images"] = request.number_of_images
     try:
-        base_image = None
-        if request.base_image_b64:
-            # base64 디코딩
-            image_data = request.base_image_b64.split(",")[1] if "," in request.base_image_b64 else request.base_image_b64
-            base_image = base64.b64decode(image_data)
-        
-        if request.model == "sdxl":
-            # Stable Diffusion XL (텍스트만)
-            if base_image:
-                raise HTTPException(
-                    status_code=400,
-                    detail="SDXL model does not support image-to-image"
-                )
-            image_b64 = await generate_image_sdxl(request.prompt)
-            
-        elif request.model == "flux":
-            # FLUX.2-dev (텍스트 또는 이미지+텍스트)
-            image_b64 = await generate_image_flux(request.prompt, base_image)
-            
-        elif request.model == "flux-schnell":
-            # FLUX.1-schnell (텍스트만, 빠른 생성)
-            if base_image:
-                raise HTTPException(
-                    status_code=400,
-                    detail="FLUX Schnell model does not support image-to-image. Use 'flux' model instead."
-                )
-            image_b64 = await generate_image_flux_schnell(request.prompt)
-            
-        elif request.model == "playground":
-            # Playground v2.5 (텍스트만)
-            if base_image:
-                raise HTTPException(
-                    status_code=400,
-                    detail="Playground v2.5 model does not support image-to-image"
-                )
-            image_b64 = await generate_image_playground_v25(request.prompt)
-            
-        elif request.model == "sd15":
-            # Stable Diffusion 1.5 (텍스트만)
-            if base_image:
-                raise HTTPException(
-                    status_code=400,
-                    detail="SD 1.5 model does not support image-to-image"
-                )
-            image_b64 = await generate_image_sd15(request.prompt)
-            
-        elif request.model == "realistic-vision":
-            # Realistic Vision (텍스트만)
-            if base_image:
-                raise HTTPException(
-                    status_code=400,
-                    detail="Realistic Vision model does not support image-to-image"
-                )
-            image_b64 = await generate_image_realistic_vision(request.prompt)
-            
-        elif request.model == "dreamshaper":
-            # DreamShaper (텍스트만)
-            if base_image:
-                raise HTTPException(
-                    status_code=400,
-                    detail="DreamShaper model does not support image-to-image"
-                )
-            image_b64 = await generate_image_dreamshaper(request.prompt)
-            
-        elif request.model == "gemini":
-            # gemini-3-pro-image-preview (유료, text-to-image 지원)
-            try:
-                image_b64 = await generate_image_gemini3(request.prompt, base_image)
-            except ValueError as e:
-                # API 키 등 설정 오류
-                raise HTTPException(
-                    status_code=400,
-                    detail=f"Gemini 이미지 생성 설정 오류: {str(e)}"
-                )
-            except Exception as e:
-                # 기타 오류
-                error_msg = str(e)
-                print(f"❌ Gemini 이미지 생성 실패: {type(e).__name__}: {error_msg}")
-                raise HTTPException(
-                    status_code=500,
-                    detail=f"Gemini 이미지 생성 실패: {error_msg}"
-                )
-        else:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Unknown model: {request.model}. Available models: sdxl, flux, flux-schnell, playground, sd15, realistic-vision, dreamshaper, gemini"
-            )
-        
-        return {
-            "message": "image_generated",
-            "data": {
-                "image_b64": image_b64,
-                "model": request.model
-            }
-        }
+        started = time.monotonic()
+        images, cached = await generate_images_cached(spec, request.prompt, base_image, fresh=request.fresh, **params)
+        return await _image_result("image_generated", spec, images, request.response_format, started, cached)
         
-    except HTTPException:
+    except (HTTPException, APIError):
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -164,120 +155,455 @@ async def modify_invitation_image(request: ImageModifyRequest):
     Models:
     - flux: FLUX.2-dev (무료, fal-ai provider)
     - gemini: gemini-3-pro-image-preview (유료, 텍스트 기반 이미지 생성)
+    
+    person_image_b64 / style_images_b64: 인물 사진과 스타일 참고 사진을 함께 전달 (gemini만 사용, 다른 모델은 무시)
+    같은 사진은 Gemini Files API에 한 번만 업로드하고 만료 전까지 재사용합니다.
+    
+    같은 기본 이미지 + 참고 사진 + 수정 프롬프트의 결과는 캐시됩니다 ("fresh": true로 우회)
+    
+    비동기 작업: POST /image/jobs/modify
+    파일 업로드: POST /image/modify/upload (multipart/form-data)
+    """
+    return await _modify(request, *_decode_modify_images(request))
+
+
+@router.post("/image/modify/upload")
+async def modify_invitation_image_upload(http_request: Request):
     """
+    청첩장 이미지 수정 (multipart/form-data 업로드)
+    
+    /image/modify와 같지만 이미지를 base64 문자열 대신 파일로 받습니다.
+    파일은 스트리밍으로 읽어 임시 파일에 저장하고, 크기 제한(IMAGE_UPLOAD_MAX_MB)을 넘으면 읽는 도중 413으로 중단합니다.
+    
+    폼 필드:
+    - modification_prompt, model, response_format, fresh: /image/modify와 동일
+    - base_image: 수정할 이미지 파일 (필수)
+    - person_image: 인물 사진 파일 (선택)
+    - style_images: 스타일 참고 사진 파일 (선택, 같은 필드 이름으로 여러 개)
+    """
+    form = await parse_image_form(http_request)
+    options = _form_options(ImageModifyOptions, form.model_fields())
+    base_image = form.file("base_image")
+    if base_image is None:
+        raise bad_request("base_image_required")
+    return await _modify(options, base_image, form.file("person_image"), form.file_list("style_images"))
+
+
+def _decode_modify_images(request: ImageModifyRequest):
+    return (
+        _decode_b64(request.base_image_b64),
+        _decode_b64(request.person_image_b64) if request.person_image_b64 else None,
+        [_decode_b64(image) for image in request.style_images_b64 or []],
+    )
+
+
+async def _modify(
+    request: ImageModifyOptions,
+    base_image: bytes,
+    person_image: Optional[bytes] = None,
+    style_images: Optional[List[bytes]] = None
+):
+    _check_response_format(request.response_format)
+    references = {"person_image": person_image, "style_images": style_images} if person_image or style_images else {}
+    if request.model == AUTO_MODEL:
+        if references and not eligible_auto_models(base_image=True, references=True):
+            print("⚠️ auto 후보 중 참고 사진을 지원하는 모델이 없어 인물/스타일 사진은 제외합니다.")
+            references = {}
+        return await _generate_auto("image_modified", request.modification_prompt, base_image, request, **references)
+    spec = get_image_model(request.model)
+    if not spec.supports(IMAGE_TO_IMAGE):
+        raise bad_request("image_to_image_not_supported", {
+            "model": request.model,
+            "supported_models": [m.id for m in list_image_models(IMAGE_TO_IMAGE)],
+        })
+    if references and not spec.supports(REFERENCE_IMAGES):
+        # 참고 사진 입력이 없는 모델은 기본 이미지만으로 수정 (기존 동작 유지)
+        print(f"⚠️ {spec.id} 모델은 참고 사진을 지원하지 않아 인물/스타일 사진은 제외합니다.")
+        references = {}
     try:
-        # base64 디코딩
-        image_data = request.base_image_b64.split(",")[1] if "," in request.base_image_b64 else request.base_image_b64
-        base_image = base64.b64decode(image_data)
-        
-        if request.model == "flux":
-            # FLUX.2-dev를 사용한 이미지 수정
-            image_b64 = await generate_image_flux_image_to_image(base_image, request.modification_prompt)
-        elif request.model == "gemini":
-            # gemini-3-pro-image-preview (유료, image-to-image는 프롬프트 기반으로 대체)
-            try:
-                # gemini-3-pro-image-preview는 image-to-image를 직접 지원하지 않으므로 프롬프트 기반 생성
-                image_b64 = await modify_image_gemini3(base_image, request.modification_prompt)
-            except Exception as e:
-                raise HTTPException(
-                    status_code=500,
-                    detail=f"Gemini 이미지 수정 실패: {str(e)}"
-                )
-        else:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Unknown model: {request.model}. Available models for modification: flux, gemini"
-            )
-        
-        return {
-            "message": "image_modified",
-            "data": {
-                "image_b64": image_b64,
-                "model": request.model
-            }
-        }
+        # 참조 이미지(+ 인물/스타일 참고 사진)와 수정 프롬프트를 함께 전달 (Image-to-Image)
+        started = time.monotonic()
+        images, cached = await generate_images_cached(
+            spec, request.modification_prompt, base_image, fresh=request.fresh, **references
+        )
+        return await _image_result("image_modified", spec, images, request.response_format, started, cached)
         
-    except HTTPException:
+    except (HTTPException, APIError):
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.post("/image/jobs/generate", status_code=202)
+async def submit_generate_job(request: ImageGenerateRequest):
+    """
+    청첩장 이미지 생성 작업 제출 (비동기)
+    
+    요청 본문은 POST /image/generate와 같고, 생성을 기다리지 않고 작업 ID를 바로 반환합니다.
+    - 상태/결과 조회: GET /api/image/jobs/{job_id}
+    - 진행 상황 구독 (SSE): GET /api/image/jobs/{job_id}/events
+    클라이언트가 연결을 끊어도 작업은 계속 진행됩니다.
+    response_format은 url, base64만 지원합니다.
+    """
+    _check_job_format(request.response_format)
+    _check_model(request.model)
+    base_image = _decode_b64(request.base_image_b64) if request.base_image_b64 else None
+    return await _submit_job("generate", request.model, lambda: _generate(request, base_image))
+
+
+@router.post("/image/jobs/modify", status_code=202)
+async def submit_modify_job(request: ImageModifyRequest):
+    """
+    청첩장 이미지 수정 작업 제출 (비동기, 요청 본문은 POST /image/modify와 동일)
+    """
+    _check_job_format(request.response_format)
+    _check_model(request.model)
+    images = _decode_modify_images(request)
+    return await _submit_job("modify", request.model, lambda: _modify(request, *images))
+
+
+@router.get("/image/jobs/{job_id}")
+async def get_image_job(job_id: str):
+    """
+    이미지 생성 작업 상태 조회
+    
+    status: queued, running, succeeded (result에 /image/generate와 같은 응답), failed (error)
+    """
+    snapshot = await get_image_job_manager().snapshot(job_id)
+    if snapshot is None:
+        raise not_found("job_not_found")
+    return {
+        "message": f"job_{snapshot['status']}",
+        "data": snapshot
+    }
+
+
+@router.get("/image/jobs/{job_id}/events")
+async def stream_image_job_events(job_id: str):
+    """
+    이미지 생성 작업 진행 상황 (Server-Sent Events)
+    
+    event 종류:
+    - status: {"status": "queued" | "running" | "succeeded" | "failed"}
+    - text: Gemini가 이미지와 함께 생성한 중간 텍스트 {"content": "..."}
+    - image_received: 업스트림에서 이미지 수신 {"size": ..., "mime_type": ...}
+    - result: 최종 결과 (/image/generate 응답과 동일)
+    - error: 실패 사유
+    지난 이벤트부터 전달하고, 작업이 끝나면 스트림을 닫습니다.
+    연결이 끊겨도 작업은 취소되지 않습니다.
+    """
+    manager = get_image_job_manager()
+    if await manager.snapshot(job_id) is None:
+        raise not_found("job_not_found")
+    return StreamingResponse(
+        _sse_events(manager.subscribe(job_id)),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+async def _generate_auto(message: str, prompt: str, base_image: Optional[bytes], request, **references):
+    """model="auto" 요청 처리 (image_routing_service)"""
+    started = time.monotonic()
+    images, cached, spec, attempts = await generate_images_auto(prompt, base_image, fresh=request.fresh, **references)
+    return await _image_result(message, spec, images, request.response_format, started, cached, routing={
+        "routed_from": AUTO_MODEL,
+        "attempts": attempts
+    })
+
+
+def _check_model(model: str) -> None:
+    if model != AUTO_MODEL:
+        get_image_model(model)
+
+
+def _check_job_format(response_format: str) -> None:
+    _check_response_format(response_format)
+    if response_format == "binary":
+        raise bad_request("unsupported_response_format", {"response_format": response_format, "supported": ["url", "base64"]})
+
+
+async def _submit_job(kind: str, model: str, fn) -> dict:
+    job = await get_image_job_manager().submit(kind, fn, meta={"model": model})
+    return {
+        "message": "job_queued",
+        "data": {
+            "job_id": job.id,
+            "status": job.status,
+            "status_url": f"{IMAGE_URL_PREFIX}/jobs/{job.id}",
+            "events_url": f"{IMAGE_URL_PREFIX}/jobs/{job.id}/events"
+        }
+    }
+
+
+async def _sse_events(events):
+    """작업 이벤트를 SSE 형식으로 변환 (이벤트가 없는 동안 주기적으로 주석을 보내 연결 유지)"""
+    iterator = events.__aiter__()
+    next_event = None
+    try:
+        while True:
+            if next_event is None:
+                next_event = asyncio.ensure_future(iterator.__anext__())
+            done, _ = await asyncio.wait({next_event}, timeout=IMAGE_JOB_SSE_HEARTBEAT)
+            if not done:
+                yield ": ping\n\n"
+                continue
+            try:
+                event = next_event.result()
+            except StopAsyncIteration:
+                break
+            next_event = None
+            yield f"event: {event['type']}\ndata: {json.dumps(event, ensure_ascii=False)}\n\n"
+    finally:
+        # 클라이언트 연결이 끊기면 구독만 해제 (작업은 계속 실행)
+        if next_event is not None:
+            next_event.cancel()
+            await asyncio.wait({next_event})
+        await iterator.aclose()
+
+
+@router.post("/image/compare")
+async def compare_image_models(request: ImageCompareRequest, http_request: Request):
+    """
+    같은 프롬프트로 여러 모델을 동시에 생성하여 완료되는 순서대로 NDJSON 스트리밍
+    
+    전체 소요 시간은 모델별 시간의 합이 아니라 가장 느린 모델(또는 timeout_ms) 기준입니다.
+    각 모델 결과는 결과 캐시와 이미지 저장소를 거치므로 /image/generate로 다시 요청하면 바로 반환됩니다.
+    
+    각 줄 형식:
+        {"type": "model", "index": 0, "model": "sdxl", "status": "succeeded", "latency_ms": 8450,
+         "cached": false, "data": {"digest": "...", "image_url": "/api/image/...", ...}}
+        {"type": "model", "index": 1, "model": "flux", "status": "failed" | "timeout", "latency_ms": 90000,
+         "error": {"message": "...", "data": ...}}
+        ...
+        {"type": "done", "count": 2, "succeeded": 1, "elapsed_ms": 90010}
+    
+    index는 요청의 models 순서와 같습니다.
+    """
+    _check_job_format(request.response_format)
+    specs = _compare_specs(request)
+    base_image = _decode_b64(request.base_image_b64) if request.base_image_b64 else None
+    timeout_ms = request.timeout_ms if request.timeout_ms is not None else IMAGE_COMPARE_TIMEOUT_MS
+    return StreamingResponse(
+        cancel_on_disconnect(http_request, ndjson_stream(_compare_events(request, specs, base_image, timeout_ms / 1000))),
+        media_type="application/x-ndjson"
+    )
+
+
+def _compare_specs(request: ImageCompareRequest) -> List[ImageModelSpec]:
+    """비교 대상 모델 검증 (중복 제거, 개수 제한, image-to-image 지원 여부)"""
+    model_ids = list(dict.fromkeys(request.models))
+    if not model_ids:
+        raise bad_request("no_models", {"available": [m.id for m in list_image_models()]})
+    if len(model_ids) > IMAGE_COMPARE_MAX_MODELS:
+        raise bad_request("too_many_models", {"models": len(model_ids), "max_models": IMAGE_COMPARE_MAX_MODELS})
+    specs = [get_image_model(model_id) for model_id in model_ids]
+    if request.base_image_b64:
+        unsupported = [spec.id for spec in specs if not spec.supports(IMAGE_TO_IMAGE)]
+        if unsupported:
+            raise bad_request("image_to_image_not_supported", {
+                "models": unsupported,
+                "supported_models": [m.id for m in list_image_models(IMAGE_TO_IMAGE)],
+            })
+    return specs
+
+
+async def _compare_one(index: int, spec: ImageModelSpec, request: ImageCompareRequest, base_image: Optional[bytes], timeout: float) -> dict:
+    event = {"type": "model", "index": index, "model": spec.id}
+    started = time.monotonic()
+    try:
+        images, cached = await asyncio.wait_for(
+            generate_images_cached(spec, request.prompt, base_image, fresh=request.fresh),
+            timeout
+        )
+        result = await _image_result("image_generated", spec, images, request.response_format, started, cached)
+        event.update({"status": "succeeded", "cached": cached, "data": result["data"]})
+    except asyncio.TimeoutError:
+        event.update({"status": "timeout", "error": {"message": "model_timeout", "data": {"timeout_ms": int(timeout * 1000)}}})
+    except APIError as e:
+        event.update({"status": "failed", "error": {"message": e.message, "data": e.data}})
+    except Exception as e:
+        print(f"❌ 모델 비교 생성 실패 ({spec.id}): {type(e).__name__}: {e}")
+        event.update({"status": "failed", "error": {"message": "generation_failed", "data": {"details": str(e)}}})
+    event["latency_ms"] = int((time.monotonic() - started) * 1000)
+    return event
+
+
+async def _compare_events(request: ImageCompareRequest, specs: List[ImageModelSpec], base_image: Optional[bytes], timeout: float):
+    """모델별 생성을 동시에 시작하고 완료되는 순서대로 이벤트 전달"""
+    started = time.monotonic()
+    tasks = [
+        asyncio.create_task(_compare_one(index, spec, request, base_image, timeout))
+        for index, spec in enumerate(specs)
+    ]
+    succeeded = 0
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            event = await next_done
+            succeeded += event["status"] == "succeeded"
+            yield event
+        yield {
+            "type": "done",
+            "count": len(tasks),
+            "succeeded": succeeded,
+            "elapsed_ms": int((time.monotonic() - started) * 1000)
+        }
+    finally:
+        # 클라이언트가 연결을 끊으면 남은 모델 생성도 중단
+        for task in tasks:
+            task.cancel()
+
+
+def _decode_b64(value: str) -> bytes:
+    """
+    base64 문자열 또는 data URI 디코딩
+    
+    Raises:
+        APIError: base64 형식이 아닌 경우 (400)
+    """
+    image_data = value.split(",")[1] if "," in value else value
+    try:
+        return base64.b64decode(image_data)
+    except (binascii.Error, ValueError):
+        raise bad_request("invalid_base64")
+
+
+def _form_options(model, fields: dict):
+    """업로드 폼의 텍스트 필드를 요청 옵션 모델로 변환 (JSON 요청과 같은 검증)"""
+    try:
+        return model(**fields)
+    except ValidationError as e:
+        raise unprocessable("validation_error", {"details": str(e)})
+
+
+RESPONSE_FORMATS = ("url", "base64", "binary")
+IMAGE_URL_PREFIX = "/api/image"
+IMAGE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+def _check_response_format(response_format: str) -> None:
+    if response_format not in RESPONSE_FORMATS:
+        raise bad_request("unsupported_response_format", {"response_format": response_format, "supported": list(RESPONSE_FORMATS)})
+
+
+async def _store_image(image: GeneratedImage) -> Optional[str]:
+    """이미지 저장소에 저장하고 digest 반환 (저장 실패는 생성 응답에 영향을 주지 않음)"""
+    if "X-Image-Digest" in image.metadata:
+        # 결과 캐시를 거치며 이미 저장된 이미지
+        return image.metadata["X-Image-Digest"]
+    try:
+        digest = await get_image_store().put(image)
+    except Exception as e:
+        print(f"⚠️ 이미지 저장 실패: {e}")
+        return None
+    image.metadata["X-Image-Digest"] = digest
+    return digest
+
+
+def _image_info(image: GeneratedImage, digest: Optional[str], include_b64: bool) -> dict:
+    info = {
+        "digest": digest,
+        "image_url": f"{IMAGE_URL_PREFIX}/{digest}" if digest else None,
+        "mime_type": image.mime_type,
+        "size": len(image.data)
+    }
+    # 저장에 실패하면 URL로 받을 수 없으므로 base64로 포함
+    if include_b64 or digest is None:
+        info["image_b64"] = image.to_data_uri()
+    return info
+
+
+async def _image_result(
+    message: str,
+    spec: ImageModelSpec,
+    images: List[GeneratedImage],
+    response_format: str,
+    started: float,
+    cached: bool = False,
+    routing: Optional[dict] = None
+):
+    """
+    생성 결과를 저장소에 저장하고 요청한 형식으로 변환 (binary는 업스트림 바이트를 그대로 전송)
+    
+    Args:
+        routing: model="auto"일 때 라우팅 정보 (routed_from, attempts)
+    """
+    elapsed_ms = int((time.monotonic() - started) * 1000)
+    digests = [await _store_image(image) for image in images]
+    if response_format == "binary":
+        return image_response(images, {
+            "X-Model": spec.id,
+            "X-Provider": spec.provider,
+            "X-Generation-Ms": elapsed_ms,
+            "X-Cache": "HIT" if cached else "MISS",
+            **({"X-Routed-From": routing["routed_from"], "X-Route-Attempts": len(routing["attempts"])} if routing else {}),
+        })
+    
+    infos = [
+        _image_info(image, digest, response_format == "base64")
+        for image, digest in zip(images, digests)
+    ]
+    data = {**infos[0], "model": spec.id, "cached": cached, **(routing or {})}
+    if len(images) > 1:
+        data["images"] = infos
+    return {
+        "message": message,
+        "data": data
+    }
+
+
 @router.get("/image/models")
 async def get_available_models():
     """
-    사용 가능한 이미지 생성 모델 목록 조회
+    사용 가능한 이미지 생성 모델 목록 조회 (image_model_registry에서 생성)
     """
     return {
         "message": "models_listed",
         "data": {
             "text_to_image": [
-                {
-                    "id": "sdxl",
-                    "name": "Stable Diffusion XL",
-                    "provider": "nscale",
-                    "supports_image_to_image": False,
-                    "description": "고품질 텍스트→이미지 생성"
-                },
-                {
-                    "id": "flux",
-                    "name": "FLUX.2-dev",
-                    "provider": "fal-ai",
-                    "supports_image_to_image": True,
-                    "description": "최신 FLUX 모델, 텍스트 및 이미지→이미지 지원"
-                },
-                {
-                    "id": "flux-schnell",
-                    "name": "FLUX.1-schnell",
-                    "provider": "fal-ai",
-                    "supports_image_to_image": False,
-                    "description": "빠른 생성 속도의 FLUX 모델"
-                },
-                {
-                    "id": "playground",
-                    "name": "Playground v2.5",
-                    "provider": "default",
-                    "supports_image_to_image": False,
-                    "description": "고품질 미학적 이미지 생성"
-                },
-                {
-                    "id": "sd15",
-                    "name": "Stable Diffusion 1.5",
-                    "provider": "default",
-                    "supports_image_to_image": False,
-                    "description": "기본 SD 모델, 빠른 생성"
-                },
-                {
-                    "id": "realistic-vision",
-                    "name": "Realistic Vision V5.1",
-                    "provider": "default",
-                    "supports_image_to_image": False,
-                    "description": "사실적인 이미지 생성에 특화"
-                },
-                {
-                    "id": "dreamshaper",
-                    "name": "DreamShaper",
-                    "provider": "default",
-                    "supports_image_to_image": False,
-                    "description": "다양한 스타일의 이미지 생성"
-                }
+                _model_summary(spec) for spec in list_image_models(TEXT_TO_IMAGE, cost_tier="free")
             ],
             "image_to_image": [
-                {
-                    "id": "flux",
-                    "name": "FLUX.2-dev",
-                    "provider": "fal-ai",
-                    "description": "이미지→이미지 변환 지원"
-                }
+                {key: value for key, value in _model_summary(spec).items() if key != "supports_image_to_image"}
+                for spec in list_image_models(IMAGE_TO_IMAGE, cost_tier="free")
             ],
             "premium": [
-                {
-                    "id": "gemini",
-                    "name": "Gemini 3 Pro Image Preview",
-                    "provider": "google",
-                    "supports_image_to_image": False,
-                    "description": "유료 서비스, gemini-3-pro-image-preview 모델 사용"
-                }
-            ]
+                _model_summary(spec) for spec in list_image_models(cost_tier="premium")
+            ],
+            "models": [spec.describe() for spec in list_image_models()],
+            "auto": describe_auto()
         }
     }
+
+
+def _model_summary(spec) -> dict:
+    return {
+        "id": spec.id,
+        "name": spec.name,
+        "provider": spec.provider,
+        "supports_image_to_image": spec.supports(IMAGE_TO_IMAGE),
+        "description": spec.description
+    }
+
+
+@router.api_route("/image/{digest}", methods=["GET", "HEAD"])
+async def get_stored_image(digest: str, request: Request):
+    """
+    저장된 생성 이미지 다운로드 (digest = 이미지 바이트의 SHA-256)
+    
+    - 내용이 digest로 고정되므로 강한 ETag와 Cache-Control: immutable로 응답
+    - If-None-Match가 일치하면 304
+    - Range 요청 지원 (부분 다운로드, 206)
+    """
+    stored = await get_image_store().get(digest)
+    if stored is None:
+        raise not_found("image_not_found")
+    
+    etag = f'"{stored.digest}"'
+    headers = {"ETag": etag, "Cache-Control": IMAGE_CACHE_CONTROL}
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and (if_none_match.strip() == "*" or etag in [t.strip() for t in if_none_match.split(",")]):
+        return Response(status_code=304, headers=headers)
+    
+    # FileResponse: 파일을 청크 단위로 전송하고 Range/If-Range를 처리 (서버가 지원하면 pathsend로 전송)
+    return FileResponse(stored.path, media_type=stored.mime_type, headers=headers)
@@ -1,69 +1,41 @@
 """
-청첩장 문구 추천 라우터 - Gemini 2.5 Flash 사용
+청첩장 문구 추천 라우터 - Gemini 2.5 Flash 사용 (장애 시 로컬 Ollama 폴백)
 """
-from fastapi import APIRouter
+from fastapi import APIRouter, Request
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from typing import Optional
-from app.services.gemini_service import generate_gemini_simple
+from typing import Dict, Optional, Tuple
+from app.services.text_generation_service import generate_text
+from app.services.gemini_service import generate_gemini_stream
+from app.services.gemini_cache_service import register_prompt_prefix
+from app.services.invitation_template_service import generate_local_options, generate_local_tones, style_description
+from app.core.streaming import ndjson_stream, cancel_on_disconnect, StreamTracker, estimate_text_tokens
+from app.core.json_stream import JsonArrayStreamParser
+from app.core.result_cache import get_result_cache
+from app.core.singleflight import canonical_key
+from app.core.metrics import get_metrics_registry
+from app.core.exceptions import not_found
+from app.core.config import (
+    INVITATION_TONE_RETRIES,
+    INVITATION_CACHE_ENABLED,
+    INVITATION_CACHE_TTL,
+    INVITATION_CACHE_MEMORY_ENTRIES,
+    INVITATION_CACHE_DISK_ENTRIES,
+    INVITATION_DEADLINE_MS,
+    INVITATION_UPGRADE_TTL,
+)
+import asyncio
 import json
 import re
+import time
+import uuid
+from contextlib import aclosing
 
 router = APIRouter(tags=["Invitation"])
 
 
-class InvitationTextRecommendReq(BaseModel):
-    groom_name: str
-    bride_name: str
-    groom_father_name: Optional[str] = None  # 신랑 부 성함
-    groom_mother_name: Optional[str] = None  # 신랑 모 성함
-    bride_father_name: Optional[str] = None  # 신부 부 성함
-    bride_mother_name: Optional[str] = None  # 신부 모 성함
-    wedding_date: str  # YYYY-MM-DD
-    wedding_time: Optional[str] = None  # HH:MM
-    wedding_location: Optional[str] = None
-    style: Optional[str] = None  # CLASSIC, MODERN, VINTAGE 등
-    additional_info: Optional[str] = None  # 추가 정보
-    additional_message: Optional[str] = None  # 추가 멘트
-    requirements: Optional[str] = None  # 청첩장 만들 때 요구사항 (멘트 만들 때)
-
-
-@router.post("/invitation/text-recommend")
-async def recommend_invitation_text(request: InvitationTextRecommendReq):
-    """
-    Gemini 2.5 Flash를 사용한 청첩장 문구 추천
-    
-    Args:
-        request: 청첩장 문구 추천 요청 (신랑/신부 이름, 예식 정보, 스타일 등)
-    
-    Returns:
-        구조화된 JSON (main_text, groom_parents, bride_parents 등)
-    """
-    style_map = {
-        "CLASSIC": "전통적이고 우아한",
-        "MODERN": "현대적이고 세련된",
-        "VINTAGE": "빈티지하고 로맨틱한",
-        "MINIMAL": "미니멀하고 깔끔한",
-        "LUXURY": "고급스럽고 화려한",
-        "NATURE": "자연스럽고 따뜻한",
-        "ROMANTIC": "로맨틱하고 감성적인"
-    }
-    
-    style_desc = style_map.get(request.style, "따뜻하고 정중한") if request.style else "따뜻하고 정중한"
-    
-    prompt = f"""다음 정보를 바탕으로 {style_desc} 톤의 청첩장 문구를 5가지 다른 스타일로 작성해주세요.
-
-신랑: {request.groom_name}
-신부: {request.bride_name}
-예식일: {request.wedding_date}"""
-    
-    if request.wedding_time:
-        prompt += f"\n예식 시간: {request.wedding_time}"
-    if request.wedding_location:
-        prompt += f"\n예식 장소: {request.wedding_location}"
-    if request.additional_info:
-        prompt += f"\n추가 정보: {request.additional_info}"
-    
-    prompt += """
+# 문구 추천 고정 지시문 (요청마다 바뀌지 않는 부분, 프리픽스 캐시에 등록)
+TEXT_RECOMMEND_INSTRUCTION = """당신은 한국 웨딩 청첩장 문구 작가입니다. 사용자가 제공하는 예식 정보와 톤을 바탕으로 청첩장 문구를 5가지 다른 스타일로 작성해주세요.
 
 각 옵션은 서로 다른 톤과 스타일을 가져야 합니다:
 - 옵션 1: 전통적이고 정중한 톤
@@ -99,168 +71,9 @@ async def recommend_invitation_text(request: InvitationTextRecommendReq):
 - 옵션은 반드시 5개를 제공해야 합니다.
 
 JSON만 응답해주세요. 다른 설명 없이 JSON만 반환해주세요."""
-    
-    try:
-        # Gemini 2.5 Flash를 사용하여 문구 생성
-        response = await generate_gemini_simple(
-            prompt,
-            model="gemini-2.5-flash"
-        )
-        
-        # JSON 추출
-        json_match = re.search(r'\{.*\}', response, re.DOTALL)
-        if json_match:
-            try:
-                recommended_data = json.loads(json_match.group())
-                
-                # options 배열이 있는 경우 (새 형식)
-                if "options" in recommended_data and isinstance(recommended_data["options"], list) and len(recommended_data["options"]) > 0:
-                    print(f"✅ {len(recommended_data['options'])}개의 문구 옵션 생성 완료")
-                    return {
-                        "message": "text_recommended",
-                        "data": {
-                            "options": recommended_data["options"]
-                        }
-                    }
-                # 기존 단일 옵션 형식인 경우 (하위 호환성)
-                elif "main_text" in recommended_data:
-                    # 단일 옵션을 배열로 변환
-                    print("⚠️ 단일 옵션 형식으로 받음. 배열로 변환합니다.")
-                    return {
-                        "message": "text_recommended",
-                        "data": {
-                            "options": [recommended_data]
-                        }
-                    }
-                else:
-                    raise ValueError("올바른 형식이 아닙니다")
-                    
-            except (json.JSONDecodeError, ValueError) as e:
-                print(f"⚠️ JSON 파싱 실패: {e}")
-                print(f"응답 내용: {response[:500]}")
-        
-        # JSON 파싱 실패 시 기본 문구 반환 (options 배열 형식)
-        default_options = [
-            {
-                "main_text": f"{request.groom_name} · {request.bride_name} 두 사람이 하나가 되어\n새로운 인생을 시작합니다.",
-                "groom_father": "",
-                "groom_mother": "",
-                "bride_father": "",
-                "bride_mother": "",
-                "wedding_info": f"{request.wedding_date}\n{request.wedding_time or ''}\n{request.wedding_location or ''}",
-                "reception_info": request.wedding_location or "",
-                "closing_text": "바쁘시겠지만 참석해 주시면 감사하겠습니다."
-            },
-            {
-                "main_text": f"{request.groom_name}님과 {request.bride_name}님이\n사랑으로 하나가 되어\n새로운 가정을 이룹니다.",
-                "groom_father": "",
-                "groom_mother": "",
-                "bride_father": "",
-                "bride_mother": "",
-                "wedding_info": f"{request.wedding_date}\n{request.wedding_time or ''}\n{request.wedding_location or ''}",
-                "reception_info": request.wedding_location or "",
-                "closing_text": "소중한 분들을 모시고 싶어\n이렇게 초대의 말씀을 드립니다."
-            },
-            {
-                "main_text": f"{request.groom_name} · {request.bride_name}\n두 사람이 만나\n하나의 가정을 이루려 합니다.",
-                "groom_father": "",
-                "groom_mother": "",
-                "bride_father": "",
-                "bride_mother": "",
-                "wedding_info": f"{request.wedding_date}\n{request.wedding_time or ''}\n{request.wedding_location or ''}",
-                "reception_info": request.wedding_location or "",
-                "closing_text": "바쁘시겠지만 참석해 주시면 감사하겠습니다."
-            }
-        ]
-        return {
-            "message": "text_recommended",
-            "data": {
-                "options": default_options
-            }
-        }
-        
-    except Exception as e:
-        print(f"⚠️ AI 문구 추천 실패: {e}")
-        # 에러 발생 시 기본 문구 옵션들 반환
-        default_options = [
-            {
-                "main_text": f"{request.groom_name} · {request.bride_name} 두 사람이 하나가 되어\n새로운 인생을 시작합니다.",
-                "groom_father": "",
-                "groom_mother": "",
-                "bride_father": "",
-                "bride_mother": "",
-                "wedding_info": f"{request.wedding_date}\n{request.wedding_time or ''}\n{request.wedding_location or ''}",
-                "reception_info": "",
-                "closing_text": "바쁘시겠지만 참석해 주시면 감사하겠습니다."
-            },
-            {
-                "main_text": f"{request.groom_name}님과 {request.bride_name}님이\n사랑으로 하나가 되어\n새로운 시작을 합니다.",
-                "groom_father": "",
-                "groom_mother": "",
-                "bride_father": "",
-                "bride_mother": "",
-                "wedding_info": f"{request.wedding_date}\n{request.wedding_time or ''}\n{request.wedding_location or ''}",
-                "reception_info": "",
-                "closing_text": "소중한 시간 함께해 주시면 더욱 기쁘겠습니다."
-            }
-        ]
-        return {
-            "message": "text_recommended",
-            "data": {
-                "options": default_options
-            }
-        }
 
-
-@router.post("/invitation/tone-recommend")
-async def recommend_invitation_tones(request: InvitationTextRecommendReq):
-    """
-    Gemini 2.5 Flash를 사용하여 5가지 톤의 청첩장 문구 생성
-    
-    Returns:
-        {
-            "message": "tones_recommended",
-            "data": {
-                "tones": [
-                    {
-                        "tone": "affectionate",
-                        "description": "다정한",
-                        "main_text": "...",
-                        "parents_greeting": "...",
-                        "wedding_info": "...",
-                        "closing": "..."
-                    },
-                    ... (5 items total)
-                ]
-            }
-        }
-    """
-    # 부모님 성함 정보
-    parents_info = ""
-    if request.groom_father_name or request.groom_mother_name:
-        parents_info += f"\n신랑 부: {request.groom_father_name or '미지정'}"
-        parents_info += f"\n신랑 모: {request.groom_mother_name or '미지정'}"
-    if request.bride_father_name or request.bride_mother_name:
-        parents_info += f"\n신부 부: {request.bride_father_name or '미지정'}"
-        parents_info += f"\n신부 모: {request.bride_mother_name or '미지정'}"
-    
-    # 요구사항 정보 추가
-    requirements_text = ""
-    if request.requirements:
-        requirements_text = f"\n**User Requirements:** {request.requirements}"
-    
-    # Enhanced English prompt for better tone generation
-    prompt = f"""You are a professional wedding invitation writer. Generate 5 different Korean wedding invitation texts with distinct tones based on the following information:
-
-**Wedding Information:**
-- Groom's Name: {request.groom_name}
-- Bride's Name: {request.bride_name}
-- Wedding Date: {request.wedding_date}
-- Wedding Time: {request.wedding_time or 'Not specified'}
-- Wedding Location: {request.wedding_location or 'Not specified'}
-{parents_info}
-- Additional Message: {request.additional_message or 'None'}
-{requirements_text}
+# 톤 추천 고정 지시문 (요청별 예식 정보는 사용자 메시지로 전달)
+TONE_RECOMMEND_INSTRUCTION = """You are a professional wedding invitation writer. Generate 5 different Korean wedding invitation texts with distinct tones based on the wedding information given by the user.
 
 **Required Tones (5 different styles):**
 1. **Affectionate (다정한)** - Create a warm, tender, and loving tone. Use gentle and caring language that expresses deep affection between the couple. Make it feel intimate and heartfelt.
@@ -275,50 +88,50 @@ async def recommend_invitation_tones(request: InvitationTextRecommendReq):
 
 **Output Format:**
 Return ONLY a valid JSON object in this exact structure (no additional text, no markdown, just pure JSON):
-{{
+{
   "tones": [
-    {{
+    {
       "tone": "affectionate",
       "description": "다정한",
       "main_text": "Main invitation text in Korean (2-4 lines, expressing the couple's love and invitation)",
       "parents_greeting": "Greeting from parents in Korean (1-2 lines, expressing gratitude and invitation)",
-      "wedding_info": "{request.wedding_date}\\n{request.wedding_time or ''}\\n{request.wedding_location or ''}",
+      "wedding_info": "<the exact wedding_info value given by the user>",
       "closing": "Closing message in Korean (1-2 lines, final invitation and gratitude)"
-    }},
-    {{
+    },
+    {
       "tone": "cheerful",
       "description": "밝고 명랑한",
       "main_text": "...",
       "parents_greeting": "...",
-      "wedding_info": "{request.wedding_date}\\n{request.wedding_time or ''}\\n{request.wedding_location or ''}",
+      "wedding_info": "<the exact wedding_info value given by the user>",
       "closing": "..."
-    }},
-    {{
+    },
+    {
       "tone": "polite",
       "description": "예의 있는",
       "main_text": "...",
       "parents_greeting": "...",
-      "wedding_info": "{request.wedding_date}\\n{request.wedding_time or ''}\\n{request.wedding_location or ''}",
+      "wedding_info": "<the exact wedding_info value given by the user>",
       "closing": "..."
-    }},
-    {{
+    },
+    {
       "tone": "formal",
       "description": "격식 있는",
       "main_text": "...",
       "parents_greeting": "...",
-      "wedding_info": "{request.wedding_date}\\n{request.wedding_time or ''}\\n{request.wedding_location or ''}",
+      "wedding_info": "<the exact wedding_info value given by the user>",
       "closing": "..."
-    }},
-    {{
+    },
+    {
       "tone": "emotional",
       "description": "감성적인",
       "main_text": "...",
       "parents_greeting": "...",
-      "wedding_info": "{request.wedding_date}\\n{request.wedding_time or ''}\\n{request.wedding_location or ''}",
+      "wedding_info": "<the exact wedding_info value given by the user>",
       "closing": "..."
-    }}
+    }
   ]
-}}
+}
 
 **Important Guidelines:**
 - Each tone must be distinctly different in style, vocabulary, and emotional impact
@@ -327,77 +140,572 @@ Return ONLY a valid JSON object in this exact structure (no additional text, no
 - Ensure all 5 tones are complete and ready to use
 - wedding_info must follow the exact format: date on first line, time on second line, location on third line
 - Return ONLY the JSON object, no explanations or additional text"""
+
+# 톤별 병렬 생성용 (톤 하나만 짧게 생성, 톤 지침은 사용자 메시지로 전달)
+SINGLE_TONE_INSTRUCTION = """You are a professional wedding invitation writer. Write ONE Korean wedding invitation text in the tone requested by the user, based on the wedding information given by the user.
+
+**Output Format:**
+Return ONLY a valid JSON object in this exact structure (no additional text, no markdown, just pure JSON):
+{
+  "main_text": "Main invitation text in Korean (2-4 lines, expressing the couple's love and invitation)",
+  "parents_greeting": "Greeting from parents in Korean (1-2 lines, expressing gratitude and invitation)",
+  "closing": "Closing message in Korean (1-2 lines, final invitation and gratitude)"
+}
+
+**Important Guidelines:**
+- Follow the requested tone closely in style, vocabulary, and emotional impact
+- Use appropriate Korean honorifics and formal language for polite and formal tones
+- Make the text natural, authentic, and culturally appropriate for Korean weddings
+- Return ONLY the JSON object, no explanations or additional text"""
+
+# 톤 정의 (tone, description, 지침) - TONE_RECOMMEND_INSTRUCTION의 5가지 톤과 동일
+TONE_SPECS = [
+    ("affectionate", "다정한", "Create a warm, tender, and loving tone. Use gentle and caring language that expresses deep affection between the couple. Make it feel intimate and heartfelt."),
+    ("cheerful", "밝고 명랑한", "Create a bright, joyful, and energetic tone. Use upbeat and positive language that conveys happiness and excitement. Make it feel lively and celebratory."),
+    ("polite", "예의 있는", "Create a respectful, courteous, and traditional tone. Use formal Korean honorifics and respectful expressions. Make it feel dignified and proper, following Korean wedding invitation conventions."),
+    ("formal", "격식 있는", "Create a dignified, elegant, and ceremonial tone. Use very formal language with traditional Korean wedding expressions. Make it feel prestigious and ceremonial."),
+    ("emotional", "감성적인", "Create a touching, heartfelt, and sentimental tone. Use poetic and emotional language that moves the heart. Make it feel deeply meaningful and touching."),
+]
+
+# 프롬프트 버전 (지시문이나 프롬프트 형식을 바꾸면 올려서 이전 결과 캐시를 무효화)
+TEXT_RECOMMEND_VERSION = "text-v1"
+TONE_RECOMMEND_VERSION = "tone-v1"
+
+TEXT_RECOMMEND_PREFIX = register_prompt_prefix("invitation_text_recommend", TEXT_RECOMMEND_INSTRUCTION)
+TONE_RECOMMEND_PREFIX = register_prompt_prefix("invitation_tone_recommend", TONE_RECOMMEND_INSTRUCTION)
+SINGLE_TONE_PREFIX = register_prompt_prefix("invitation_single_tone", SINGLE_TONE_INSTRUCTION)
+
+
+class InvitationTextRecommendReq(BaseModel):
+    groom_name: str
+    bride_name: str
+    groom_father_name: Optional[str] = None  # 신랑 부 성함
+    groom_mother_name: Optional[str] = None  # 신랑 모 성함
+    bride_father_name: Optional[str] = None  # 신부 부 성함
+    bride_mother_name: Optional[str] = None  # 신부 모 성함
+    wedding_date: str  # YYYY-MM-DD
+    wedding_time: Optional[str] = None  # HH:MM
+    wedding_location: Optional[str] = None
+    style: Optional[str] = None  # CLASSIC, MODERN, VINTAGE 등
+    additional_info: Optional[str] = None  # 추가 정보
+    additional_message: Optional[str] = None  # 추가 멘트
+    requirements: Optional[str] = None  # 청첩장 만들 때 요구사항 (멘트 만들 때)
+    regenerate: bool = False  # True면 캐시된 결과를 무시하고 새로 생성
+    deadline_ms: Optional[int] = None  # 응답 기한(ms), 넘기면 로컬 문구 반환 (None = 기본값, 0 = 기한 없음)
+
+
+@router.post("/invitation/text-recommend")
+async def recommend_invitation_text(request: InvitationTextRecommendReq):
+    """
+    Gemini 2.5 Flash를 사용한 청첩장 문구 추천
+    
+    deadline_ms 안에 Gemini가 응답하지 않으면 로컬 템플릿 문구를 바로 반환하고
+    (data.source = "local", data.upgrade_id), 생성은 백그라운드에서 계속합니다.
+    완성된 결과는 GET /invitation/upgrade/{upgrade_id}로 받을 수 있습니다.
+    
+    Args:
+        request: 청첩장 문구 추천 요청 (신랑/신부 이름, 예식 정보, 스타일 등)
+    
+    Returns:
+        구조화된 JSON (main_text, groom_parents, bride_parents 등)
+    """
+    model = "gemini-2.5-flash"
+    cache_key = _cache_key("text", request, TEXT_RECOMMEND_VERSION, model)
+    cached = await _cached_result(cache_key, request)
+    if cached is not None:
+        return cached
+    
+    result, upgrade_id = await _generate_within_deadline(
+        "text", cache_key, request, lambda: _generate_text_options(request, model, cache_key)
+    )
+    if result is not None:
+        return result
+    
+    # 생성 실패 또는 기한 초과 시 로컬 템플릿 문구 반환 (options 배열 형식)
+    return {
+        "message": "text_recommended",
+        "data": {
+            "options": generate_default_options(request),
+            **_local_fields(upgrade_id)
+        }
+    }
+
+
+async def _generate_text_options(request, model: str, cache_key: str) -> Optional[dict]:
+    """Gemini로 문구 옵션 생성 (파싱까지 실패하면 None)"""
+    prompt = _text_recommend_prompt(request)
+    
+    try:
+        # Gemini 2.5 Flash를 사용하여 문구 생성 (서킷 브레이커/헤지/폴백 적용)
+        response = await generate_text(
+            prompt,
+            model=model,
+            prefix_key=TEXT_RECOMMEND_PREFIX
+        )
+    except Exception as e:
+        print(f"⚠️ AI 문구 추천 실패: {e}")
+        return None
+    
+    # JSON 추출
+    json_match = re.search(r'\{.*\}', response, re.DOTALL)
+    if json_match:
+        try:
+            recommended_data = json.loads(json_match.group())
+            
+            # options 배열이 있는 경우 (새 형식)
+            if "options" in recommended_data and isinstance(recommended_data["options"], list) and len(recommended_data["options"]) > 0:
+                print(f"✅ {len(recommended_data['options'])}개의 문구 옵션 생성 완료")
+                return await _store_result(cache_key, {
+                    "message": "text_recommended",
+                    "data": {
+                        "options": recommended_data["options"]
+                    }
+                })
+            # 기존 단일 옵션 형식인 경우 (하위 호환성)
+            elif "main_text" in recommended_data:
+                # 단일 옵션을 배열로 변환
+                print("⚠️ 단일 옵션 형식으로 받음. 배열로 변환합니다.")
+                return await _store_result(cache_key, {
+                    "message": "text_recommended",
+                    "data": {
+                        "options": [recommended_data]
+                    }
+                })
+            else:
+                raise ValueError("올바른 형식이 아닙니다")
+                
+        except (json.JSONDecodeError, ValueError) as e:
+            print(f"⚠️ JSON 파싱 실패: {e}")
+            print(f"응답 내용: {response[:500]}")
+    return None
+
+
+@router.post("/invitation/text-recommend/stream")
+async def stream_invitation_text(request: InvitationTextRecommendReq, http_request: Request):
+    """
+    청첩장 문구 추천 스트리밍 - Gemini 응답을 받는 동안 완성된 옵션부터 NDJSON으로 전달
+    
+    각 줄 형식:
+        {"type": "option", "index": 0, "source": "gemini", "data": {"main_text": "...", ...}}
+        ...
+        {"type": "done", "count": 5}
+    
+    Gemini가 옵션을 하나도 만들지 못하면 기본 문구 옵션을 source "default"로 전달합니다.
+    """
+    model = "gemini-2.5-flash"
+    tracker = StreamTracker("gemini", model, token_counter=estimate_text_tokens)
+    
+    async def generate_events():
+        parser = JsonArrayStreamParser("options")
+        # break로 빠져나와도 업스트림 생성기를 바로 닫아 Gemini 스트림/HTTP 연결을 정리 (GC 대기 없음)
+        async with aclosing(generate_gemini_stream(
+            _text_recommend_prompt(request),
+            model=model,
+            prefix_key=TEXT_RECOMMEND_PREFIX,
+            tracker=tracker
+        )) as chunks:
+            async for chunk in chunks:
+                if chunk.startswith("Error:"):
+                    tracker.error = True
+                    print(f"⚠️ AI 문구 추천 스트리밍 실패: {chunk}")
+                    break
+                tracker.add({"type": "content", "content": chunk})
+                for option in parser.feed(chunk):
+                    yield {"type": "option", "index": parser.emitted - 1, "source": "gemini", "data": option}
+                if parser.done:
+                    # 루트 JSON이 닫힌 뒤의 설명/펜스는 필요 없으므로 업스트림 스트림 종료
+                    break
+        
+        count = parser.emitted
+        if count == 0:
+            # 기존 단일 옵션 형식(하위 호환) 또는 실패 시 기본 문구
+            result = parser.result()
+            if isinstance(result, dict) and "main_text" in result:
+                options, source = [result], "gemini"
+            else:
+                options, source = generate_default_options(request), "default"
+            for index, option in enumerate(options):
+                yield {"type": "option", "index": index, "source": source, "data": option}
+            count = len(options)
+        yield {"type": "done", "count": count}
+    
+    return StreamingResponse(
+        cancel_on_disconnect(http_request, ndjson_stream(generate_events()), tracker),
+        media_type="application/x-ndjson"
+    )
+
+
+@router.post("/invitation/tone-recommend")
+async def recommend_invitation_tones(request: InvitationTextRecommendReq):
+    """
+    Gemini 2.5 Flash를 사용하여 5가지 톤의 청첩장 문구 생성
+    
+    deadline_ms 안에 응답하지 않으면 로컬 템플릿 톤을 바로 반환합니다. (/invitation/text-recommend와 동일)
+    
+    Returns:
+        {
+            "message": "tones_recommended",
+            "data": {
+                "tones": [
+                    {
+                        "tone": "affectionate",
+                        "description": "다정한",
+                        "main_text": "...",
+                        "parents_greeting": "...",
+                        "wedding_info": "...",
+                        "closing": "..."
+                    },
+                    ... (5 items total)
+                ]
+            }
+        }
+    """
+    model = "gemini-2.5-flash"
+    cache_key = _cache_key("tone", request, TONE_RECOMMEND_VERSION, model)
+    cached = await _cached_result(cache_key, request)
+    if cached is not None:
+        return cached
+    
+    result, upgrade_id = await _generate_within_deadline(
+        "tone", cache_key, request, lambda: _generate_tones(request, model, cache_key)
+    )
+    if result is not None:
+        return result
+    
+    # 실패 또는 기한 초과 시 로컬 템플릿 톤 5개 반환
+    response = generate_default_tones(request)
+    response["data"].update(_local_fields(upgrade_id))
+    return response
+
+
+async def _generate_tones(request, model: str, cache_key: str) -> Optional[dict]:
+    """Gemini로 5가지 톤 생성 (파싱까지 실패하면 None)"""
+    # 요청별 가변 부분만 전송 (고정 지시문은 TONE_RECOMMEND_PREFIX)
+    wedding_info = _wedding_info(request)
+    prompt = f"""{_tone_wedding_prompt(request)}
+
+**wedding_info value (use exactly for every tone):** {json.dumps(wedding_info, ensure_ascii=False)}"""
     
     try:
-        response = await generate_gemini_simple(prompt, model="gemini-2.5-flash")
+        response = await generate_text(
+            prompt,
+            model=model,
+            prefix_key=TONE_RECOMMEND_PREFIX
+        )
         
         # JSON 파싱
         json_match = re.search(r'\{.*\}', response, re.DOTALL)
         if json_match:
             result = json.loads(json_match.group())
             if "tones" in result and len(result["tones"]) >= 5:
-                return {
+                return await _store_result(cache_key, {
                     "message": "tones_recommended",
                     "data": result
-                }
-        
-        # 실패 시 기본 톤 5개 반환
-        return generate_default_tones(request)
+                })
+        return None
         
     except Exception as e:
         print(f"⚠️ 톤 제안 실패: {e}")
-        return generate_default_tones(request)
+        return None
 
 
-def generate_default_tones(request):
-    """기본 5가지 톤 생성"""
-    base_info = f"{request.wedding_date}\n{request.wedding_time or ''}\n{request.wedding_location or ''}"
+@router.get("/invitation/upgrade/{upgrade_id}")
+async def get_invitation_upgrade(upgrade_id: str):
+    """
+    기한 초과로 로컬 문구를 받은 요청의 Gemini 생성 결과 조회
+    
+    Returns:
+        생성 중: {"message": "upgrade_pending", "data": {"upgrade_id": "...", "status": "pending"}}
+        완료: {"message": "upgrade_ready", "data": {"upgrade_id": "...", "status": "ready", "options" 또는 "tones": [...]}}
+        실패: {"message": "upgrade_failed", "data": {"upgrade_id": "...", "status": "failed"}}
+    """
+    task = _pending_upgrades.get(upgrade_id)
+    if task is not None and not task.done():
+        return {"message": "upgrade_pending", "data": {"upgrade_id": upgrade_id, "status": "pending"}}
     
+    entry = await _upgrade_store().get(upgrade_id)
+    if entry is None:
+        raise not_found("upgrade_not_found")
+    if entry["result"] is None:
+        return {"message": "upgrade_failed", "data": {"upgrade_id": upgrade_id, "status": "failed"}}
+    return {
+        "message": "upgrade_ready",
+        "data": {"upgrade_id": upgrade_id, "status": "ready", **entry["result"]["data"]}
+    }
+
+
+# 진행 중인 Gemini 생성 (캐시 키 → 태스크). 기한을 넘긴 요청도 여기서 계속 실행됨
+_pending_generations: Dict[str, asyncio.Task] = {}
+# 기한을 넘긴 요청별 결과 대기 (upgrade_id → 태스크)
+_pending_upgrades: Dict[str, asyncio.Task] = {}
+
+
+def _upgrade_store():
+    """기한 초과 요청의 나중 결과 보관 (upgrade_id 기준, 메모리 전용)"""
+    return get_result_cache(
+        "invitation_upgrade",
+        ttl=INVITATION_UPGRADE_TTL,
+        max_entries=INVITATION_CACHE_MEMORY_ENTRIES,
+    )
+
+
+async def _store_upgrade(upgrade_id: str, task: asyncio.Task) -> None:
+    """생성이 끝나면 결과를 upgrade_id로 보관 (실패하면 result None)"""
+    try:
+        result = await asyncio.shield(task)
+    except Exception:
+        result = None
+    await _upgrade_store().set(upgrade_id, {"result": result})
+
+
+def _start_upgrade(task: asyncio.Task) -> str:
+    """
+    기한을 넘긴 요청에 나중 결과 조회용 upgrade_id 발급
+    
+    내부 캐시 키를 노출하면 같은 키를 계산할 수 있는 누구나 캐시 상태를 확인할 수 있으므로
+    요청마다 임의의 ID를 발급합니다.
+    """
+    upgrade_id = uuid.uuid4().hex
+    upgrade = asyncio.create_task(_store_upgrade(upgrade_id, task))
+    _pending_upgrades[upgrade_id] = upgrade
+    upgrade.add_done_callback(lambda _: _pending_upgrades.pop(upgrade_id, None))
+    return upgrade_id
+
+
+async def _generate_within_deadline(
+    kind: str,
+    cache_key: str,
+    request: InvitationTextRecommendReq,
+    factory
+) -> Tuple[Optional[dict], Optional[str]]:
+    """
+    Gemini 생성을 기한까지만 기다림 (같은 요청이 이미 생성 중이면 그 결과를 함께 기다림)
+    
+    생성은 별도 태스크에서 실행되므로 기한을 넘기거나 클라이언트가 끊겨도 계속 진행되고,
+    완료되면 결과 캐시와 업그레이드 보관소에 저장됩니다.
+    regenerate 요청은 진행 중인 생성에 합류하지 않고 항상 새로 생성합니다.
+    
+    Returns:
+        (생성 결과 또는 None, 기한 초과 시 upgrade_id 또는 None)
+    """
+    task = None if request.regenerate else _pending_generations.get(cache_key)
+    if task is None:
+        task = asyncio.create_task(factory())
+        if not request.regenerate:
+            _pending_generations[cache_key] = task
+            task.add_done_callback(lambda _: _pending_generations.pop(cache_key, None))
+    
+    deadline_ms = request.deadline_ms if request.deadline_ms is not None else INVITATION_DEADLINE_MS
+    await asyncio.wait({task}, timeout=deadline_ms / 1000 if deadline_ms > 0 else None)
+    
+    registry = get_metrics_registry()
+    if not task.done():
+        registry.inc("invitation_deadline_total", kind=kind, outcome="local")
+        print(f"⏱️ 청첩장 {kind} 생성이 {deadline_ms}ms 안에 끝나지 않아 로컬 문구 반환")
+        return None, _start_upgrade(task)
+    registry.inc("invitation_deadline_total", kind=kind, outcome="in_time")
+    return task.result(), None
+
+
+def _local_fields(upgrade_id: Optional[str]) -> dict:
+    """로컬 문구 응답에 붙이는 필드 (기한 초과면 나중 결과 조회용 upgrade_id 포함)"""
+    if upgrade_id:
+        return {"source": "local", "upgrade_id": upgrade_id}
+    return {"source": "local"}
+
+
+def _result_cache():
+    return get_result_cache(
+        "invitation",
+        ttl=INVITATION_CACHE_TTL,
+        max_entries=INVITATION_CACHE_MEMORY_ENTRIES,
+        max_disk_entries=INVITATION_CACHE_DISK_ENTRIES,
+    )
+
+
+def _normalize_field(value):
+    """앞뒤 공백 제거 + 연속 공백 정리 (빈 문자열은 None과 동일하게 취급)"""
+    if not isinstance(value, str):
+        return value
+    value = " ".join(value.split())
+    return value or None
+
+
+def _cache_key(kind: str, request: InvitationTextRecommendReq, version: str, model: str) -> str:
+    """결과 캐시 키: 추천 종류 + 프롬프트 버전 + 모델 + 정규화된 요청 필드"""
+    fields = {
+        name: _normalize_field(value)
+        for name, value in request.model_dump(exclude={"regenerate", "deadline_ms"}).items()
+    }
+    return canonical_key(kind, version, model, fields)
+
+
+async def _cached_result(cache_key: str, request: InvitationTextRecommendReq) -> Optional[dict]:
+    if not INVITATION_CACHE_ENABLED:
+        return None
+    if request.regenerate:
+        get_metrics_registry().inc("result_cache_requests_total", cache="invitation", result="bypass")
+        return None
+    return await _result_cache().get(cache_key)
+
+
+async def _store_result(cache_key: str, result: dict) -> dict:
+    """생성에 성공한 결과만 저장 (기본 문구 응답은 저장하지 않음)"""
+    if INVITATION_CACHE_ENABLED:
+        await _result_cache().set(cache_key, result)
+    return result
+
+
+def _text_recommend_prompt(request) -> str:
+    """문구 추천 프롬프트 - 요청별 가변 부분만 (고정 지시문은 TEXT_RECOMMEND_PREFIX)"""
+    style_desc = style_description(request.style)
+    
+    prompt = f"""톤: {style_desc}
+
+신랑: {request.groom_name}
+신부: {request.bride_name}
+예식일: {request.wedding_date}"""
+    
+    if request.wedding_time:
+        prompt += f"\n예식 시간: {request.wedding_time}"
+    if request.wedding_location:
+        prompt += f"\n예식 장소: {request.wedding_location}"
+    if request.additional_info:
+        prompt += f"\n추가 정보: {request.additional_info}"
+    return prompt
+
+
+def generate_default_options(request):
+    """기본 문구 옵션 5가지 생성 (로컬 템플릿)"""
+    return generate_local_options(request)
+
+
+def _wedding_info(request) -> str:
+    return f"{request.wedding_date}\n{request.wedding_time or ''}\n{request.wedding_location or ''}"
+
+
+def _tone_wedding_prompt(request) -> str:
+    """톤 추천 프롬프트의 예식 정보 부분"""
+    # 부모님 성함 정보
+    parents_info = ""
+    if request.groom_father_name or request.groom_mother_name:
+        parents_info += f"\n신랑 부: {request.groom_father_name or '미지정'}"
+        parents_info += f"\n신랑 모: {request.groom_mother_name or '미지정'}"
+    if request.bride_father_name or request.bride_mother_name:
+        parents_info += f"\n신부 부: {request.bride_father_name or '미지정'}"
+        parents_info += f"\n신부 모: {request.bride_mother_name or '미지정'}"
+    
+    # 요구사항 정보 추가
+    requirements_text = ""
+    if request.requirements:
+        requirements_text = f"\n**User Requirements:** {request.requirements}"
+    
+    return f"""**Wedding Information:**
+- Groom's Name: {request.groom_name}
+- Bride's Name: {request.bride_name}
+- Wedding Date: {request.wedding_date}
+- Wedding Time: {request.wedding_time or 'Not specified'}
+- Wedding Location: {request.wedding_location or 'Not specified'}
+{parents_info}
+- Additional Message: {request.additional_message or 'None'}
+{requirements_text}"""
+
+
+async def _generate_single_tone(request, index: int, wedding_prompt: str) -> dict:
+    """
+    톤 하나를 생성 (실패 시 INVITATION_TONE_RETRIES회 재시도 후 기본 문구 사용)
+    
+    Returns:
+        스트림 이벤트 {"type": "tone", "index", "source", "attempts", "latency_ms", "data"}
+    """
+    tone, description, guidance = TONE_SPECS[index]
+    prompt = f"""**Requested Tone:** {tone} ({description}) - {guidance}
+
+{wedding_prompt}"""
+    started = time.monotonic()
+    
+    for attempt in range(1, INVITATION_TONE_RETRIES + 2):
+        try:
+            response = await generate_text(
+                prompt,
+                model="gemini-2.5-flash",
+                prefix_key=SINGLE_TONE_PREFIX
+            )
+            json_match = re.search(r'\{.*\}', response, re.DOTALL)
+            if not json_match:
+                raise ValueError("JSON을 찾을 수 없습니다")
+            result = json.loads(json_match.group())
+            if not all(result.get(field) for field in ("main_text", "parents_greeting", "closing")):
+                raise ValueError("필수 항목 누락")
+            data = {
+                "tone": tone,
+                "description": description,
+                "main_text": result["main_text"],
+                "parents_greeting": result["parents_greeting"],
+                "wedding_info": _wedding_info(request),
+                "closing": result["closing"]
+            }
+            source = "gemini"
+            break
+        except Exception as e:
+            print(f"⚠️ 톤 생성 실패 ({tone}, {attempt}회차): {e}")
+    else:
+        # 재시도까지 실패한 톤만 기본 문구로 대체
+        data = generate_default_tones(request)["data"]["tones"][index]
+        source = "default"
+    
+    return {
+        "type": "tone",
+        "index": index,
+        "source": source,
+        "attempts": attempt,
+        "latency_ms": round((time.monotonic() - started) * 1000),
+        "data": data
+    }
+
+
+async def _tone_events(request):
+    """톤별 요청을 동시에 보내고 완료되는 순서대로 이벤트 전달"""
+    wedding_prompt = _tone_wedding_prompt(request)
+    tasks = [
+        asyncio.create_task(_generate_single_tone(request, index, wedding_prompt))
+        for index in range(len(TONE_SPECS))
+    ]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+        yield {"type": "done", "count": len(tasks)}
+    finally:
+        # 클라이언트가 연결을 끊으면 남은 톤 생성도 중단
+        for task in tasks:
+            task.cancel()
+
+
+@router.post("/invitation/tone-recommend/stream")
+async def stream_invitation_tones(request: InvitationTextRecommendReq, http_request: Request):
+    """
+    5가지 톤을 톤별로 동시에 생성하여 완료되는 순서대로 NDJSON 스트리밍
+    
+    각 줄 형식:
+        {"type": "tone", "index": 0, "source": "gemini" | "default", "attempts": 1, "latency_ms": 850,
+         "data": {"tone": "affectionate", "description": "다정한", "main_text": "...",
+                  "parents_greeting": "...", "wedding_info": "...", "closing": "..."}}
+        ...
+        {"type": "done", "count": 5}
+    
+    index는 /invitation/tone-recommend 응답의 tones 배열 순서와 같습니다.
+    """
+    return StreamingResponse(
+        cancel_on_disconnect(http_request, ndjson_stream(_tone_events(request))),
+        media_type="application/x-ndjson"
+    )
+
+
+def generate_default_tones(request):
+    """기본 5가지 톤 생성 (로컬 템플릿)"""
     return {
         "message": "tones_recommended",
         "data": {
-            "tones": [
-                {
-                    "tone": "affectionate",
-                    "description": "다정한",
-                    "main_text": f"{request.groom_name}과 {request.bride_name}이\n서로를 향한 마음을 담아\n평생의 동반자가 되려 합니다.",
-                    "parents_greeting": "두 사람의 시작을 축복해주세요.",
-                    "wedding_info": base_info,
-                    "closing": "소중한 분들을 모시고 싶어\n이렇게 초대합니다."
-                },
-                {
-                    "tone": "cheerful",
-                    "description": "밝고 명랑한",
-                    "main_text": f"{request.groom_name} ♥ {request.bride_name}\n우리 결혼해요!",
-                    "parents_greeting": "함께 축하해주세요!",
-                    "wedding_info": base_info,
-                    "closing": "행복한 출발을 함께해요!"
-                },
-                {
-                    "tone": "polite",
-                    "description": "예의 있는",
-                    "main_text": f"{request.groom_name} · {request.bride_name}\n두 사람이 혼인하오니\n귀한 걸음 하시어\n자리를 빛내주시면 감사하겠습니다.",
-                    "parents_greeting": "두 집안의 경사를 함께하시길 청합니다.",
-                    "wedding_info": base_info,
-                    "closing": "부디 참석하시어 축복해주시기 바랍니다."
-                },
-                {
-                    "tone": "formal",
-                    "description": "격식 있는",
-                    "main_text": f"{request.groom_name} · {request.bride_name}\n두 사람의 결혼을 알리오니\n부디 참석하시어\n축복해 주시기 바랍니다.",
-                    "parents_greeting": "삼가 청첩드립니다.",
-                    "wedding_info": base_info,
-                    "closing": "귀한 시간 내어 주시면\n더없는 영광이겠습니다."
-                },
-                {
-                    "tone": "emotional",
-                    "description": "감성적인",
-                    "main_text": f"서로를 향한 마음이 모여\n하나의 사랑이 되었습니다.\n{request.groom_name}과 {request.bride_name}의 시작을\n함께 지켜봐 주세요.",
-                    "parents_greeting": "두 사람이 만들어갈 아름다운 이야기에\n소중한 한 페이지가 되어주세요.",
-                    "wedding_info": base_info,
-                    "closing": "여러분의 축복이\n두 사람에게 큰 힘이 되겠습니다."
-                }
-            ]
+            "tones": generate_local_tones(request)
         }
     }
-
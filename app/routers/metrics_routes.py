@@ -0,0 +1,18 @@
+"""
+메트릭 조회 라우터
+"""
+from fastapi import APIRouter
+from app.core.metrics import get_metrics_registry
+
+router = APIRouter(tags=["System"])
+
+
+@router.get("/metrics")
+async def get_metrics():
+    """
+    워커 프로세스 단위 메트릭 조회 (스트림 TTFT/처리량, 취소, 절약된 토큰, admission 대기열 등)
+    """
+    return {
+        "message": "metrics_listed",
+        "data": get_metrics_registry().snapshot()
+    }
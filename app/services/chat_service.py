@@ -1,45 +1,140 @@
-from ollama import chat
-import json
-from typing import AsyncGenerator
-
-async def generate_chat_response(message: str, model: str = "gemma3:4b") -> AsyncGenerator[str, None]:
-    stream = chat(
-        model=model,
-        messages=[{'role': 'user', 'content': message}],
-        stream=True,
-    )
-    
+from typing import AsyncGenerator, Optional
+from app.core.streaming import ndjson_stream, count_tokens, StreamTracker
+from app.core.admission import get_admission_controller, Permit
+from app.core.metrics import get_metrics_registry
+from app.services.ollama_service import get_ollama_pool, is_backend_failure
+from app.services.ollama_residency_service import get_residency_manager
+
+
+async def _chat_chunks(model: str, messages: list) -> AsyncGenerator:
+    """
+    Ollama 호스트 풀에서 호스트를 골라 채팅 스트림 청크를 전달
+
+    첫 청크를 받기 전에 호스트 연결이 실패하면 다른 호스트로 넘어갑니다.
+    """
+    pool = get_ollama_pool()
+    residency = get_residency_manager()
+    tried = []
+    while True:
+        lease = pool.acquire(model, exclude=tried)
+        received = False
+        try:
+            # 상주 모델 수를 넘으면 LRU 모델을 먼저 언로드, 핫 모델은 keep_alive=-1로 고정
+            keep_alive = await residency.acquire(model, lease.backend)
+            # 공유 비동기 클라이언트: 토큰 대기 중에도 이벤트 루프를 점유하지 않음
+            stream = await lease.client.chat(
+                model=model,
+                messages=messages,
+                stream=True,
+                keep_alive=keep_alive,
+            )
+            try:
+                async for chunk in stream:
+                    received = True
+                    yield chunk
+            finally:
+                # 스트림이 중간에 닫히면 Ollama HTTP 응답도 즉시 종료
+                await stream.aclose()
+            lease.release()
+            return
+        except Exception as e:
+            failed = is_backend_failure(e)
+            lease.release(failed=failed)
+            if not failed or received or len(tried) + 1 >= len(pool.backends):
+                raise
+            tried.append(lease.backend)
+            get_metrics_registry().inc("ollama_backend_failover_total", host=lease.backend.host)
+            print(f"⚠️ Ollama 호스트 연결 실패, 다른 호스트로 재시도 ({lease.backend.host}): {e}")
+        except BaseException:
+            lease.release()
+            raise
+        finally:
+            residency.release(model, lease.backend)
+
+
+async def generate_chat_events(
+    message: str,
+    model: str = "gemma3:4b",
+    permit: Optional[Permit] = None,
+    tracker: Optional[StreamTracker] = None
+) -> AsyncGenerator[dict, None]:
+    get_residency_manager().check(model)
+    if permit is None:
+        permit = await get_admission_controller().acquire("ollama", model)
+    if tracker is not None:
+        tracker.mark_admitted()
+
+    chunks = _chat_chunks(model, [{'role': 'user', 'content': message}])
     in_thinking = False
     thinking = ''
     content = ''
 
-    for chunk in stream:
-        data = {}
-        
-        # Handle thinking
-        if chunk.message.thinking:
-            if not in_thinking:
-                in_thinking = True
-                data['type'] = 'thinking_start'
-                yield json.dumps(data) + "\n"
-            
-            data = {
-                'type': 'thinking',
-                'content': chunk.message.thinking
-            }
-            thinking += chunk.message.thinking
-            yield json.dumps(data) + "\n"
-        
-        # Handle content
-        elif chunk.message.content:
-            if in_thinking:
-                in_thinking = False
-                data = {'type': 'thinking_end'}
-                yield json.dumps(data) + "\n"
-            
-            data = {
-                'type': 'content',
-                'content': chunk.message.content
-            }
-            content += chunk.message.content
-            yield json.dumps(data) + "\n"
+    try:
+        async for chunk in chunks:
+            # Ollama는 첫 청크를 읽을 때 요청을 보내므로 첫 청크 수신을 연결 완료로 기록
+            if tracker is not None:
+                tracker.mark_connected()
+
+            # Handle thinking
+            if chunk.message.thinking:
+                if not in_thinking:
+                    in_thinking = True
+                    yield {'type': 'thinking_start'}
+
+                thinking += chunk.message.thinking
+                yield {
+                    'type': 'thinking',
+                    'content': chunk.message.thinking
+                }
+
+            # Handle content
+            elif chunk.message.content:
+                if in_thinking:
+                    in_thinking = False
+                    yield {'type': 'thinking_end'}
+
+                content += chunk.message.content
+                yield {
+                    'type': 'content',
+                    'content': chunk.message.content
+                }
+    finally:
+        await chunks.aclose()
+        permit.release()
+
+
+async def generate_chat_response(
+    message: str,
+    model: str = "gemma3:4b",
+    tracker: Optional[StreamTracker] = None,
+    permit: Optional[Permit] = None
+) -> AsyncGenerator[str, None]:
+    """토큰 이벤트를 병합된 NDJSON 줄로 변환"""
+    events = generate_chat_events(message, model, permit, tracker)
+    if tracker is not None:
+        events = count_tokens(events, tracker)
+    async for lines in ndjson_stream(events):
+        yield lines
+
+
+async def generate_chat_text(
+    message: str,
+    model: str = "gemma3:4b",
+    system: Optional[str] = None
+) -> str:
+    """
+    비스트리밍 단일 응답 생성 (Gemini 장애 시 텍스트 폴백용)
+
+    Args:
+        message: 사용자 메시지
+        model: Ollama 모델명
+        system: 시스템 지시문 (선택적)
+    """
+    messages = [{'role': 'user', 'content': message}]
+    if system:
+        messages.insert(0, {'role': 'system', 'content': system})
+    content = ''
+    async with get_admission_controller().slot("ollama", model):
+        async for chunk in _chat_chunks(model, messages):
+            content += chunk.message.content or ''
+    return content
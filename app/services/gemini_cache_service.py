@@ -0,0 +1,243 @@
+"""
+Gemini 프롬프트 프리픽스 캐시 서비스
+청첩장/리뷰 요약 프롬프트의 고정 지시문을 Gemini cached content로 한 번만 등록하고,
+요청마다 가변 부분만 전송합니다.
+
+- 고정 지시문은 register_prompt_prefix()로 모듈 로딩 시 등록합니다.
+- 첫 요청 시 (프리픽스, 모델) 단위로 cached content를 생성하고, 만료 전에 TTL을 갱신합니다.
+- cached content 생성이 불가능하면 (최소 토큰 수 미달 등) system_instruction으로 대체합니다.
+  system_instruction도 매 요청 동일한 프리픽스이므로 Gemini의 암시적 캐시 적중 대상이 됩니다.
+- cached content 생성/갱신도 업스트림 호출이므로 "gemini" admission 슬롯 안에서 실행합니다.
+"""
+import asyncio
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Optional, Tuple
+from google.genai import errors as genai_errors
+from google.genai import types
+from app.core.admission import get_admission_controller
+from app.core.config import (
+    GEMINI_PREFIX_CACHE_ENABLED,
+    GEMINI_PREFIX_CACHE_TTL,
+    GEMINI_PREFIX_CACHE_REFRESH_MARGIN,
+    GEMINI_PREFIX_CACHE_RETRY_AFTER,
+)
+
+
+class GenaiCacheBackend:
+    """google-genai caches API를 사용하는 백엔드"""
+
+    def __init__(self, client_factory):
+        self._client_factory = client_factory
+
+    async def create(self, model: str, system_instruction: str, ttl: int, display_name: str) -> str:
+        client = self._client_factory()
+        async with get_admission_controller().slot("gemini", model):
+            cache = await client.aio.caches.create(
+                model=model,
+                config=types.CreateCachedContentConfig(
+                    display_name=display_name,
+                    system_instruction=system_instruction,
+                    ttl=f"{ttl}s",
+                ),
+            )
+        return cache.name
+
+    async def refresh(self, name: str, ttl: int) -> None:
+        client = self._client_factory()
+        async with get_admission_controller().slot("gemini"):
+            await client.aio.caches.update(
+                name=name,
+                config=types.UpdateCachedContentConfig(ttl=f"{ttl}s"),
+            )
+
+    async def delete(self, name: str) -> None:
+        client = self._client_factory()
+        await client.aio.caches.delete(name=name)
+
+
+class LocalCacheBackend:
+    """
+    caches API의 로컬 대체 구현 (테스트/오프라인용)
+
+    실제 API와 동일하게 (모델, 지시문) 쌍을 이름으로 보관하고 만료 시간을 관리합니다.
+    """
+
+    def __init__(self, min_chars: int = 0):
+        self.min_chars = min_chars
+        self.entries: Dict[str, Tuple[str, str, float]] = {}
+        self.create_calls = 0
+        self.refresh_calls = 0
+        self._seq = 0
+
+    async def create(self, model: str, system_instruction: str, ttl: int, display_name: str) -> str:
+        self.create_calls += 1
+        if len(system_instruction) < self.min_chars:
+            raise ValueError("Cached content is too small")
+        self._seq += 1
+        name = f"cachedContents/local-{display_name}-{self._seq}"
+        self.entries[name] = (model, system_instruction, time.time() + ttl)
+        return name
+
+    async def refresh(self, name: str, ttl: int) -> None:
+        self.refresh_calls += 1
+        if name not in self.entries or self.entries[name][2] < time.time():
+            raise KeyError(f"{name} not found")
+        model, system_instruction, _ = self.entries[name]
+        self.entries[name] = (model, system_instruction, time.time() + ttl)
+
+    async def delete(self, name: str) -> None:
+        self.entries.pop(name, None)
+
+    def resolve(self, name: str) -> Optional[str]:
+        """cached content 이름으로 등록된 지시문 조회 (만료 시 None)"""
+        entry = self.entries.get(name)
+        if entry is None or entry[2] < time.time():
+            return None
+        return entry[1]
+
+
+def is_cache_unusable_error(error: Exception) -> bool:
+    """
+    cached content를 더 이상 사용할 수 없다는 오류인지 (만료/삭제로 404, 캐시 권한 403, 잘못된 캐시 400)
+
+    429/503/타임아웃/안전 필터 차단 등은 캐시와 무관하므로 False
+    """
+    if not isinstance(error, genai_errors.ClientError):
+        return False
+    if error.code == 404:
+        return True
+    return error.code in (400, 403) and "cache" in (error.message or "").lower()
+
+
+@dataclass
+class _CacheEntry:
+    name: Optional[str] = None
+    expires_at: float = 0.0
+    retry_at: float = 0.0
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+
+
+class PromptPrefixCache:
+    """고정 프롬프트 프리픽스를 cached content로 관리하는 캐시"""
+
+    def __init__(
+        self,
+        backend=None,
+        ttl: int = GEMINI_PREFIX_CACHE_TTL,
+        refresh_margin: int = GEMINI_PREFIX_CACHE_REFRESH_MARGIN,
+        retry_after: int = GEMINI_PREFIX_CACHE_RETRY_AFTER,
+        enabled: bool = GEMINI_PREFIX_CACHE_ENABLED,
+    ):
+        self.backend = backend
+        self.ttl = ttl
+        self.refresh_margin = refresh_margin
+        self.retry_after = retry_after
+        self.enabled = enabled
+        self._prefixes: Dict[str, str] = {}
+        self._entries: Dict[Tuple[str, str], _CacheEntry] = {}
+        self.stats = {"hits": 0, "created": 0, "refreshed": 0, "fallbacks": 0, "invalidated": 0}
+
+    def register(self, key: str, system_instruction: str) -> str:
+        """고정 지시문 등록 (같은 key로 다시 등록하면 기존 캐시는 무효화)"""
+        if self._prefixes.get(key) != system_instruction:
+            self._prefixes[key] = system_instruction
+            for entry_key in [k for k in self._entries if k[0] == key]:
+                self._entries.pop(entry_key, None)
+        return key
+
+    def get_instruction(self, key: str) -> str:
+        return self._prefixes[key]
+
+    def fallback_config(self, key: str) -> types.GenerateContentConfig:
+        """cached content 없이 system_instruction으로 프리픽스를 전달하는 설정"""
+        return types.GenerateContentConfig(system_instruction=self._prefixes[key])
+
+    async def build_config(self, key: str, model: str) -> types.GenerateContentConfig:
+        """
+        요청에 사용할 GenerateContentConfig 생성
+
+        Args:
+            key: register()로 등록한 프리픽스 키
+            model: 사용할 모델명 (cached content는 모델별로 생성)
+
+        Returns:
+            cached_content 또는 system_instruction이 설정된 GenerateContentConfig
+        """
+        if key not in self._prefixes:
+            raise KeyError(f"등록되지 않은 프롬프트 프리픽스: {key}")
+
+        if not self.enabled or self.backend is None:
+            return self.fallback_config(key)
+
+        entry = self._entries.setdefault((key, model), _CacheEntry())
+        now = time.time()
+
+        # 유효 기간이 충분히 남은 경우 잠금 없이 바로 사용
+        if entry.name and entry.expires_at - now > self.refresh_margin:
+            self.stats["hits"] += 1
+            return types.GenerateContentConfig(cached_content=entry.name)
+
+        if entry.retry_at > now:
+            self.stats["fallbacks"] += 1
+            return self.fallback_config(key)
+
+        async with entry.lock:
+            now = time.time()
+            if entry.name and entry.expires_at - now > self.refresh_margin:
+                self.stats["hits"] += 1
+                return types.GenerateContentConfig(cached_content=entry.name)
+
+            # 만료 임박: TTL 갱신 시도
+            if entry.name and entry.expires_at > now:
+                try:
+                    await self.backend.refresh(entry.name, self.ttl)
+                    entry.expires_at = time.time() + self.ttl
+                    self.stats["refreshed"] += 1
+                    return types.GenerateContentConfig(cached_content=entry.name)
+                except Exception as e:
+                    print(f"⚠️ 프롬프트 캐시 갱신 실패 ({key}, {model}): {e}")
+
+            # 신규 생성 (또는 갱신 실패 후 재생성)
+            try:
+                entry.name = await self.backend.create(
+                    model, self._prefixes[key], self.ttl, display_name=key.replace("_", "-")
+                )
+                entry.expires_at = time.time() + self.ttl
+                self.stats["created"] += 1
+                print(f"✅ 프롬프트 캐시 등록: {key} ({model}) -> {entry.name}")
+                return types.GenerateContentConfig(cached_content=entry.name)
+            except Exception as e:
+                # 최소 토큰 수 미달 등으로 생성 불가 → 일정 시간 동안 system_instruction 사용
+                print(f"⚠️ 프롬프트 캐시 등록 실패, system_instruction으로 대체 ({key}, {model}): {e}")
+                entry.name = None
+                entry.expires_at = 0.0
+                entry.retry_at = time.time() + self.retry_after
+                self.stats["fallbacks"] += 1
+                return self.fallback_config(key)
+
+    def invalidate(self, key: str, model: str) -> None:
+        """서버 측에서 캐시가 사라진 경우 (만료/삭제) 로컬 핸들 무효화"""
+        entry = self._entries.get((key, model))
+        if entry is not None and entry.name:
+            entry.name = None
+            entry.expires_at = 0.0
+            self.stats["invalidated"] += 1
+
+
+_prefix_cache: Optional[PromptPrefixCache] = None
+
+
+def get_prefix_cache() -> PromptPrefixCache:
+    """애플리케이션 전역 프롬프트 프리픽스 캐시"""
+    global _prefix_cache
+    if _prefix_cache is None:
+        # 순환 import 방지를 위해 지연 import
+        from app.services.gemini_service import get_gemini_client
+        _prefix_cache = PromptPrefixCache(backend=GenaiCacheBackend(get_gemini_client))
+    return _prefix_cache
+
+
+def register_prompt_prefix(key: str, system_instruction: str) -> str:
+    """고정 지시문을 전역 캐시에 등록하고 key를 반환"""
+    return get_prefix_cache().register(key, system_instruction)
@@ -0,0 +1,204 @@
+"""
+Gemini 참조 이미지 업로드 캐시 (Files API)
+이미지 수정 요청마다 같은 원본/인물/스타일 사진을 inline으로 다시 보내지 않도록,
+이미지를 내용 해시(SHA-256) 기준으로 Files API에 한 번만 업로드하고 만료 전까지 파일 URI를 재사용합니다.
+
+- 업로드된 파일은 Gemini 서버에서 48시간 보관되므로 만료 GEMINI_FILE_CACHE_REFRESH_MARGIN초 전에 다시 업로드합니다.
+- GEMINI_FILE_CACHE_MIN_BYTES보다 작은 이미지는 업로드 왕복이 더 비싸므로 inline으로 전송합니다.
+- 업로드에 실패하면 해당 요청은 inline으로 전송합니다 (생성은 계속 진행).
+- 핸들은 워커 프로세스 메모리에 보관합니다 (프롬프트 프리픽스 캐시와 동일).
+  만료되었거나 재업로드 시점이 지난 핸들은 GEMINI_FILE_CACHE_PRUNE_INTERVAL마다 정리합니다.
+"""
+import asyncio
+import hashlib
+import time
+from dataclasses import dataclass, field
+from io import BytesIO
+from typing import Dict, Optional, Tuple
+from google.genai import types
+from app.core.config import (
+    GEMINI_FILE_CACHE_ENABLED,
+    GEMINI_FILE_CACHE_BACKEND,
+    GEMINI_FILE_CACHE_TTL,
+    GEMINI_FILE_CACHE_REFRESH_MARGIN,
+    GEMINI_FILE_CACHE_MIN_BYTES,
+    GEMINI_FILE_CACHE_PRUNE_INTERVAL,
+)
+from app.core.metrics import get_metrics_registry
+
+
+class GenaiFileBackend:
+    """google-genai Files API를 사용하는 백엔드"""
+
+    def __init__(self, client_factory):
+        self._client_factory = client_factory
+
+    async def upload(self, data: bytes, mime_type: str, display_name: str) -> Tuple[str, str, Optional[float]]:
+        """
+        Returns:
+            (파일 이름, 파일 URI, 만료 시각(epoch 초) 또는 None)
+        """
+        client = self._client_factory()
+        uploaded = await client.aio.files.upload(
+            file=BytesIO(data),
+            config=types.UploadFileConfig(mime_type=mime_type, display_name=display_name),
+        )
+        expires_at = uploaded.expiration_time.timestamp() if uploaded.expiration_time else None
+        return uploaded.name, uploaded.uri, expires_at
+
+    def part(self, uri: str, mime_type: str) -> types.Part:
+        return types.Part.from_uri(file_uri=uri, mime_type=mime_type)
+
+
+class LocalFileBackend:
+    """
+    Files API의 로컬 대체 구현 (테스트/오프라인용)
+
+    업로드한 바이트를 메모리에 이름/URI로 보관하고 만료 시간을 관리하며,
+    요청에는 보관한 바이트를 inline으로 넣습니다.
+    """
+
+    def __init__(self, ttl: int = GEMINI_FILE_CACHE_TTL):
+        self.ttl = ttl
+        self.files: Dict[str, Tuple[bytes, str, float]] = {}
+        self.upload_calls = 0
+        self._seq = 0
+
+    async def upload(self, data: bytes, mime_type: str, display_name: str) -> Tuple[str, str, Optional[float]]:
+        self.upload_calls += 1
+        # 실제 API처럼 만료된 파일은 삭제
+        now = time.time()
+        for name in [name for name, entry in self.files.items() if entry[2] < now]:
+            del self.files[name]
+        self._seq += 1
+        name = f"files/local-{self._seq}"
+        expires_at = time.time() + self.ttl
+        self.files[name] = (data, mime_type, expires_at)
+        return name, f"local://{name}", expires_at
+
+    def part(self, uri: str, mime_type: str) -> types.Part:
+        name = uri[len("local://"):]
+        entry = self.files.get(name)
+        if entry is None or entry[2] < time.time():
+            raise KeyError(f"{name} not found")
+        return types.Part.from_bytes(data=entry[0], mime_type=entry[1])
+
+
+@dataclass
+class _FileEntry:
+    name: Optional[str] = None
+    uri: Optional[str] = None
+    mime_type: Optional[str] = None
+    expires_at: float = 0.0
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+
+
+class ReferenceUploadCache:
+    """참조 이미지 내용 해시 → 업로드된 파일 핸들"""
+
+    def __init__(
+        self,
+        backend=None,
+        ttl: int = GEMINI_FILE_CACHE_TTL,
+        refresh_margin: int = GEMINI_FILE_CACHE_REFRESH_MARGIN,
+        min_bytes: int = GEMINI_FILE_CACHE_MIN_BYTES,
+        enabled: bool = GEMINI_FILE_CACHE_ENABLED,
+        prune_interval: float = GEMINI_FILE_CACHE_PRUNE_INTERVAL,
+    ):
+        self.backend = backend
+        self.ttl = ttl
+        self.refresh_margin = refresh_margin
+        self.min_bytes = min_bytes
+        self.enabled = enabled
+        self.prune_interval = prune_interval
+        self._entries: Dict[str, _FileEntry] = {}
+        self._pruned_at = time.monotonic()
+        self.stats = {"hits": 0, "uploaded": 0, "inline": 0, "fallbacks": 0, "invalidated": 0, "pruned": 0}
+
+    def _valid(self, entry: _FileEntry) -> bool:
+        return bool(entry.uri) and entry.expires_at - time.time() > self.refresh_margin
+
+    def _hit(self, entry: _FileEntry) -> types.Part:
+        self.stats["hits"] += 1
+        get_metrics_registry().inc("gemini_file_cache_requests_total", result="hit")
+        return self.backend.part(entry.uri, entry.mime_type)
+
+    def _inline(self, data: bytes, mime_type: str, reason: str) -> types.Part:
+        self.stats[reason] += 1
+        get_metrics_registry().inc("gemini_file_cache_requests_total", result=reason)
+        return types.Part.from_bytes(data=data, mime_type=mime_type)
+
+    async def part(self, data: bytes, mime_type: str) -> Tuple[types.Part, Optional[str]]:
+        """
+        요청에 넣을 이미지 Part (업로드된 파일 URI 또는 inline 바이트)
+
+        Returns:
+            (Part, 사용한 캐시 키(digest) 또는 None) - 요청이 실패하면 digest로 invalidate
+        """
+        if not self.enabled or self.backend is None or len(data) < self.min_bytes:
+            return self._inline(data, mime_type, "inline"), None
+
+        if time.monotonic() - self._pruned_at >= self.prune_interval:
+            self.prune()
+        digest = hashlib.sha256(data).hexdigest()
+        entry = self._entries.setdefault(digest, _FileEntry())
+        if self._valid(entry):
+            return self._hit(entry), digest
+
+        async with entry.lock:
+            # 같은 이미지를 동시에 요청하면 한 번만 업로드
+            if self._valid(entry):
+                return self._hit(entry), digest
+            try:
+                entry.name, entry.uri, expires_at = await self.backend.upload(data, mime_type, display_name=f"ref-{digest[:16]}")
+                entry.mime_type = mime_type
+                entry.expires_at = min(expires_at or float("inf"), time.time() + self.ttl)
+            except Exception as e:
+                print(f"⚠️ 참조 이미지 업로드 실패, inline으로 전송: {type(e).__name__}: {e}")
+                self.invalidate(digest)
+                return self._inline(data, mime_type, "fallbacks"), None
+            self.stats["uploaded"] += 1
+            get_metrics_registry().inc("gemini_file_cache_requests_total", result="uploaded")
+            print(f"✅ 참조 이미지 업로드: {entry.name} ({len(data)} bytes)")
+            return self.backend.part(entry.uri, entry.mime_type), digest
+
+    def prune(self) -> int:
+        """
+        만료되었거나 재업로드 시점이 지난 핸들 삭제 (업로드 진행 중인 항목은 유지)
+
+        Returns:
+            삭제한 항목 수
+        """
+        self._pruned_at = time.monotonic()
+        stale = [
+            digest for digest, entry in self._entries.items()
+            if not entry.lock.locked() and not self._valid(entry)
+        ]
+        for digest in stale:
+            del self._entries[digest]
+        self.stats["pruned"] += len(stale)
+        return len(stale)
+
+    def invalidate(self, digest: str) -> None:
+        """서버 측에서 파일이 사라진 경우 (만료/삭제) 핸들 무효화"""
+        entry = self._entries.pop(digest, None)
+        if entry is not None and entry.uri:
+            self.stats["invalidated"] += 1
+
+
+_reference_cache: Optional[ReferenceUploadCache] = None
+
+
+def get_reference_upload_cache() -> ReferenceUploadCache:
+    """애플리케이션 전역 참조 이미지 업로드 캐시 (GEMINI_FILE_CACHE_BACKEND: genai | local)"""
+    global _reference_cache
+    if _reference_cache is None:
+        if GEMINI_FILE_CACHE_BACKEND == "local":
+            backend = LocalFileBackend()
+        else:
+            # 순환 import 방지를 위해 지연 import
+            from app.services.gemini_image_service import get_gemini_client
+            backend = GenaiFileBackend(get_gemini_client)
+        _reference_cache = ReferenceUploadCache(backend=backend)
+        get_metrics_registry().register_gauge("gemini_file_cache", lambda: dict(_reference_cache.stats))
+    return _reference_cache
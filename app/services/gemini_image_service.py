@@ -4,12 +4,16 @@ google-genai SDK를 사용하여 Text-to-Image 지원
 공식 문서 예제 코드 패턴을 따름 (AI Studio)
 """
 import os
-import base64
-import mimetypes
 from pathlib import Path
+from typing import List, Optional
 from dotenv import load_dotenv
 from google import genai
 from google.genai import types
+from app.core.admission import get_admission_controller
+from app.core.exceptions import APIError
+from app.core.images import GeneratedImage, sniff_mime_type
+from app.core.jobs import report_progress
+from app.services.gemini_file_service import get_reference_upload_cache
 
 # .env 파일 로드
 BASE_DIR = Path(__file__).resolve().parent.parent.parent
@@ -23,21 +27,33 @@ def get_gemini_api_key():
     if not api_key:
         print("⚠️ GEMINI_API_KEY가 .env에 설정되지 않았습니다.")
         raise ValueError("GEMINI_API_KEY가 .env에 설정되지 않았습니다.")
-    print(f"✅ Gemini API 키 로드됨 (길이: {len(api_key)} 문자)")
     return api_key
 
 
+_client = None
+
+
 def get_gemini_client():
-    """Gemini Client 생성 (공식 문서 예제 패턴)"""
-    api_key = get_gemini_api_key()
-    return genai.Client(api_key=api_key)
+    """공유 Gemini Client (공식 문서 예제 패턴, 요청마다 새로 생성하지 않음)"""
+    global _client
+    if _client is None:
+        api_key = get_gemini_api_key()
+        _client = genai.Client(api_key=api_key)
+        print(f"✅ Gemini 이미지 클라이언트 생성 (API 키 길이: {len(api_key)} 문자)")
+    return _client
 
 
 # 사용할 모델
 GEMINI_IMAGE_MODEL = "gemini-3-pro-image-preview"
 
 
-async def generate_image_gemini3(prompt: str, base_image: bytes = None, model: str = None) -> str:
+async def generate_image_gemini3(
+    prompt: str,
+    base_image: bytes = None,
+    model: str = None,
+    person_image: Optional[bytes] = None,
+    style_images: Optional[List[bytes]] = None
+) -> GeneratedImage:
     """
     gemini-3-pro-image-preview를 사용한 이미지 생성
     공식 문서 예제 패턴: AI Studio 코드 기반
@@ -46,19 +62,23 @@ async def generate_image_gemini3(prompt: str, base_image: bytes = None, model: s
         prompt: 이미지 생성 프롬프트 (한국어 또는 영어)
         base_image: 기본 이미지 바이트 (image-to-image용, multimodal input)
         model: 모델 타입 (무시됨, 항상 gemini-3-pro-image-preview 사용)
+        person_image: 인물 사진 바이트 (base_image와 함께 전달, 선택)
+        style_images: 스타일 참고 사진 바이트 목록 (base_image와 함께 전달, 선택)
     
     Returns:
-        base64 인코딩된 이미지 문자열 (data:image/jpeg;base64,... 형식)
+        Gemini가 반환한 이미지 바이트와 MIME 타입 그대로 (GeneratedImage)
     """
     try:
         if base_image:
             # Image-to-Image: 이미지와 프롬프트를 함께 전달 (multimodal input)
             print("🖼️ Image-to-Image 모드: 참조 이미지와 함께 생성합니다.")
-            return await _generate_image_with_reference(prompt, base_image)
+            return await _generate_image_with_reference(prompt, base_image, person_image, style_images)
         else:
             # Text-to-Image
             return await _generate_image_gemini(prompt)
         
+    except APIError:
+        raise
     except Exception as e:
         print(f"❌ Gemini 이미지 생성 실패: {type(e).__name__}: {e}")
         import traceback
@@ -66,7 +86,7 @@ async def generate_image_gemini3(prompt: str, base_image: bytes = None, model: s
         raise Exception(f"Gemini 이미지 생성 실패: {e}")
 
 
-async def _generate_image_gemini(prompt: str) -> str:
+async def _generate_image_gemini(prompt: str) -> GeneratedImage:
     """
     gemini-3-pro-image-preview를 사용한 이미지 생성
     공식 문서 예제 패턴 (AI Studio 코드 기반)
@@ -75,7 +95,7 @@ async def _generate_image_gemini(prompt: str) -> str:
         prompt: 이미지 생성 프롬프트
     
     Returns:
-        base64 인코딩된 이미지 문자열
+        생성된 이미지 (GeneratedImage)
     """
     client = get_gemini_client()
     model = GEMINI_IMAGE_MODEL
@@ -108,110 +128,101 @@ async def _generate_image_gemini(prompt: str) -> str:
     
     # 스트리밍 방식으로 이미지 받기
     image_data = None
+    mime_type = None
     text_parts = []
     
-    for chunk in client.models.generate_content_stream(
-        model=model,
-        contents=contents,
-        config=generate_content_config,
-    ):
-        if (
-            chunk.candidates is None
-            or chunk.candidates[0].content is None
-            or chunk.candidates[0].content.parts is None
+    async with get_admission_controller().slot("gemini-image", model):
+        async for chunk in await client.aio.models.generate_content_stream(
+            model=model,
+            contents=contents,
+            config=generate_content_config,
         ):
-            continue
-        
-        part = chunk.candidates[0].content.parts[0]
-        
-        # 이미지 데이터 처리
-        if part.inline_data and part.inline_data.data:
-            image_data = part.inline_data.data
-            mime_type = part.inline_data.mime_type
-            print(f"✅ 이미지 데이터 수신 (크기: {len(image_data)} bytes, 타입: {mime_type})")
-        
-        # 텍스트 처리
-        if hasattr(part, 'text') and part.text:
-            text_parts.append(part.text)
+            if (
+                chunk.candidates is None
+                or chunk.candidates[0].content is None
+                or chunk.candidates[0].content.parts is None
+            ):
+                continue
+            
+            part = chunk.candidates[0].content.parts[0]
+            
+            # 이미지 데이터 처리
+            if part.inline_data and part.inline_data.data:
+                image_data = part.inline_data.data
+                mime_type = part.inline_data.mime_type
+                print(f"✅ 이미지 데이터 수신 (크기: {len(image_data)} bytes, 타입: {mime_type})")
+                report_progress("image_received", size=len(image_data), mime_type=mime_type)
+            
+            # 텍스트 처리 (비동기 작업이면 중간 텍스트를 진행 이벤트로 전달)
+            if hasattr(part, 'text') and part.text:
+                text_parts.append(part.text)
+                report_progress("text", content=part.text)
     
     if not image_data:
         raise ValueError("이미지가 생성되지 않았습니다.")
     
-    # base64로 인코딩
-    img_b64 = base64.b64encode(image_data).decode('utf-8')
-    
-    # mime_type 결정 (기본값: image/jpeg)
-    mime_type = mimetypes.guess_type("image.jpg")[0] or "image/jpeg"
-    if image_data:
-        # 실제로는 inline_data에서 mime_type을 가져와야 하지만, 
-        # 여기서는 기본값 사용
-        mime_type = "image/jpeg"
-    
-    result_uri = f"data:{mime_type};base64,{img_b64}"
-    
     if text_parts:
         print(f"📝 생성된 텍스트: {''.join(text_parts)[:100]}...")
     
     print(f"✅ Gemini 이미지 생성 완료 (크기: {len(image_data)} bytes)")
-    return result_uri
+    # 재인코딩 없이 inline_data 바이트와 MIME 타입을 그대로 사용
+    return GeneratedImage.from_bytes(image_data, mime_type)
 
 
-async def _generate_image_with_reference(prompt: str, reference_image: bytes) -> str:
+async def _generate_image_with_reference(
+    prompt: str,
+    reference_image: bytes,
+    person_image: Optional[bytes] = None,
+    style_images: Optional[List[bytes]] = None
+) -> GeneratedImage:
     """
     참조 이미지를 사용한 이미지 생성 (Multimodal Input)
     Google AI Studio 공식 패턴 기반
     
+    이미지는 참조 이미지 업로드 캐시(gemini_file_service)를 거쳐 전달하므로,
+    같은 사진으로 여러 번 수정하면 처음 한 번만 업로드하고 이후에는 파일 URI만 보냅니다.
+    
     Args:
         prompt: 이미지 생성/수정 프롬프트
         reference_image: 참조할 이미지 바이트
+        person_image: 인물 사진 바이트 (선택)
+        style_images: 스타일 참고 사진 바이트 목록 (선택)
     
     Returns:
-        base64 인코딩된 이미지 문자열
+        생성된 이미지 (GeneratedImage)
     """
     client = get_gemini_client()
     model = GEMINI_IMAGE_MODEL
+    style_images = [image for image in style_images or [] if image]
     
     print(f"🔍 Gemini Image-to-Image 요청:")
     print(f"   모델: {model}")
     print(f"   프롬프트: {prompt[:100]}...")
     print(f"   참조 이미지 크기: {len(reference_image)} bytes")
-    
-    # 이미지 MIME 타입 감지
-    mime_type = "image/jpeg"
-    if len(reference_image) > 8 and reference_image[:8].startswith(b'\x89PNG'):
-        mime_type = "image/png"
-    elif len(reference_image) > 3 and reference_image[:3] == b'GIF':
-        mime_type = "image/gif"
-    elif len(reference_image) > 4 and reference_image[:4] == b'RIFF':
-        mime_type = "image/webp"
-    
-    # 참조 이미지를 base64로 인코딩하여 프롬프트에 포함
-    ref_image_b64 = base64.b64encode(reference_image).decode('utf-8')
+    if person_image or style_images:
+        print(f"   인물 사진: {'있음' if person_image else '없음'}, 스타일 참고 사진: {len(style_images)}장")
     
     # 공식 문서 패턴: 이미지와 텍스트를 함께 전달
-    # gemini-3-pro-image-preview는 이미지 입력을 지원하므로 Part.from_bytes 사용
-    try:
-        contents = [
-            types.Content(
-                role="user",
-                parts=[
-                    # 참조 이미지 (inline_data 형식)
-                    types.Part.from_bytes(
-                        data=reference_image,
-                        mime_type=mime_type
-                    ),
-                    # 프롬프트 (이미지 수정 요청)
-                    types.Part.from_text(
-                        text=f"이 참조 이미지를 기반으로 다음과 같이 수정해주세요: {prompt}. 원본 이미지의 전체적인 스타일과 구도를 유지하면서 요청된 변경사항을 적용해주세요. 웨딩 청첩장 스타일로 고급스럽고 우아하게 생성해주세요."
-                    ),
-                ],
-            ),
-        ]
-    except Exception as e:
-        print(f"⚠️ Multimodal input 실패, 텍스트 기반으로 대체: {e}")
-        # 이미지 입력이 지원되지 않으면 텍스트 기반으로 대체
-        enhanced_prompt = f"{prompt}. 웨딩 청첩장 스타일로 고급스럽고 우아하게 생성해주세요. 꽃과 자연 요소를 포함해주세요."
-        return await _generate_image_gemini(enhanced_prompt)
+    # 이미지 순서: 원본 → 인물 사진 → 스타일 참고 사진 (프롬프트에서 순서로 역할을 설명)
+    # 실패 시 텍스트 기반 생성으로 대체하지 않음: 입력 이미지를 무시한 결과가 이미지 결과 캐시에
+    # 참조 이미지 키로 저장되어 이후 같은 수정 요청마다 엉뚱한 이미지를 반환하게 되므로 오류로 처리
+    uploads = get_reference_upload_cache()
+    digests = []
+    parts = []
+    for image in [reference_image, person_image, *style_images]:
+        if not image:
+            continue
+        part, digest = await uploads.part(image, sniff_mime_type(image, default="image/jpeg"))
+        parts.append(part)
+        if digest:
+            digests.append(digest)
+    parts.append(types.Part.from_text(text=_reference_instructions(prompt, bool(person_image), len(style_images))))
+    contents = [
+        types.Content(
+            role="user",
+            parts=parts,
+        ),
+    ]
     
     tools = [
         types.Tool(googleSearch=types.GoogleSearch()),
@@ -227,56 +238,79 @@ async def _generate_image_with_reference(prompt: str, reference_image: bytes) ->
     
     # 스트리밍 방식으로 이미지 받기
     image_data = None
+    result_mime_type = None
     text_parts = []
     
     try:
-        for chunk in client.models.generate_content_stream(
-            model=model,
-            contents=contents,
-            config=generate_content_config,
-        ):
-            if (
-                chunk.candidates is None
-                or chunk.candidates[0].content is None
-                or chunk.candidates[0].content.parts is None
+        async with get_admission_controller().slot("gemini-image", model):
+            async for chunk in await client.aio.models.generate_content_stream(
+                model=model,
+                contents=contents,
+                config=generate_content_config,
             ):
-                continue
-            
-            # 모든 parts를 순회
-            for part in chunk.candidates[0].content.parts:
-                # 이미지 데이터 처리
-                if part.inline_data and part.inline_data.data:
-                    image_data = part.inline_data.data
-                    result_mime_type = part.inline_data.mime_type
-                    print(f"✅ 이미지 데이터 수신 (크기: {len(image_data)} bytes, 타입: {result_mime_type})")
+                if (
+                    chunk.candidates is None
+                    or chunk.candidates[0].content is None
+                    or chunk.candidates[0].content.parts is None
+                ):
+                    continue
                 
-                # 텍스트 처리
-                if hasattr(part, 'text') and part.text:
-                    text_parts.append(part.text)
+                # 모든 parts를 순회
+                for part in chunk.candidates[0].content.parts:
+                    # 이미지 데이터 처리
+                    if part.inline_data and part.inline_data.data:
+                        image_data = part.inline_data.data
+                        result_mime_type = part.inline_data.mime_type
+                        print(f"✅ 이미지 데이터 수신 (크기: {len(image_data)} bytes, 타입: {result_mime_type})")
+                        report_progress("image_received", size=len(image_data), mime_type=result_mime_type)
+                    
+                    # 텍스트 처리 (비동기 작업이면 중간 텍스트를 진행 이벤트로 전달)
+                    if hasattr(part, 'text') and part.text:
+                        text_parts.append(part.text)
+                        report_progress("text", content=part.text)
+    except APIError:
+        # admission 거절은 그대로 전달
+        raise
     except Exception as e:
         print(f"⚠️ Image-to-Image 스트리밍 실패: {e}")
-        # 실패 시 텍스트 기반으로 대체
-        enhanced_prompt = f"{prompt}. 웨딩 청첩장 스타일로 고급스럽고 우아하게 생성해주세요. 참조 이미지와 유사한 스타일로 만들어주세요."
-        return await _generate_image_gemini(enhanced_prompt)
+        # 업로드한 파일이 서버에서 만료/삭제되었을 수 있으므로 다음 요청은 다시 업로드
+        for digest in digests:
+            uploads.invalidate(digest)
+        raise
     
     if not image_data:
-        print("⚠️ 이미지 생성 실패, 텍스트 기반으로 대체")
-        # 이미지가 생성되지 않으면 텍스트 기반으로 대체
-        enhanced_prompt = f"{prompt}. 웨딩 청첩장 스타일로 고급스럽고 우아하게 생성해주세요."
-        return await _generate_image_gemini(enhanced_prompt)
-    
-    # base64로 인코딩
-    img_b64 = base64.b64encode(image_data).decode('utf-8')
-    result_uri = f"data:image/jpeg;base64,{img_b64}"
+        raise ValueError("참조 이미지 기반 이미지가 생성되지 않았습니다.")
     
     if text_parts:
         print(f"📝 생성된 텍스트: {''.join(text_parts)[:100]}...")
     
     print(f"✅ Gemini Image-to-Image 완료 (크기: {len(image_data)} bytes)")
-    return result_uri
+    return GeneratedImage.from_bytes(image_data, result_mime_type)
+
+
+def _reference_instructions(prompt: str, has_person: bool, style_count: int) -> str:
+    """이미지 순서에 맞춘 수정 지시문"""
+    text = f"이 참조 이미지를 기반으로 다음과 같이 수정해주세요: {prompt}. 원본 이미지의 전체적인 스타일과 구도를 유지하면서 요청된 변경사항을 적용해주세요. 웨딩 청첩장 스타일로 고급스럽고 우아하게 생성해주세요."
+    if not has_person and not style_count:
+        return text
+    roles = ["첫 번째 이미지는 수정할 원본 이미지입니다."]
+    index = 2
+    if has_person:
+        roles.append(f"{index}번째 이미지는 인물 사진입니다. 인물의 얼굴과 특징을 그대로 유지해서 반영해주세요.")
+        index += 1
+    if style_count:
+        last = index + style_count - 1
+        position = f"{index}번째 이미지는" if style_count == 1 else f"{index}번째부터 {last}번째 이미지는"
+        roles.append(f"{position} 스타일 참고 사진입니다. 색감, 분위기, 장식 스타일을 참고해주세요.")
+    return " ".join(roles) + " " + text
 
 
-async def modify_image_gemini3(base_image: bytes, modification_prompt: str) -> str:
+async def modify_image_gemini3(
+    base_image: bytes,
+    modification_prompt: str,
+    person_image: Optional[bytes] = None,
+    style_images: Optional[List[bytes]] = None
+) -> GeneratedImage:
     """
     gemini-3-pro-image-preview를 사용한 이미지 수정
     Multimodal input으로 참조 이미지와 수정 프롬프트를 함께 전달
@@ -284,9 +318,11 @@ async def modify_image_gemini3(base_image: bytes, modification_prompt: str) -> s
     Args:
         base_image: 수정할 기본 이미지 바이트
         modification_prompt: 수정 요청 프롬프트
+        person_image: 인물 사진 바이트 (선택)
+        style_images: 스타일 참고 사진 바이트 목록 (선택)
     
     Returns:
-        base64 인코딩된 이미지 문자열
+        생성된 이미지 (GeneratedImage)
     """
     # Image-to-Image: 참조 이미지와 함께 생성
-    return await _generate_image_with_reference(modification_prompt, base_image)
+    return await _generate_image_with_reference(modification_prompt, base_image, person_image, style_images)
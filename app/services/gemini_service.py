@@ -1,16 +1,74 @@
 """
 Gemini 2.5 Flash 서비스 - WebSocket 스트리밍 지원
 """
-import asyncio
-from typing import AsyncGenerator
+from typing import AsyncGenerator, Optional
 from google import genai
 from app.core.config import GEMINI_API_KEY, GEMINI_MODEL
+from app.core.admission import get_admission_controller, Permit
+from app.core.exceptions import APIError
+from app.core.streaming import StreamTracker
+from app.core.singleflight import canonical_key, get_single_flight
+from app.services.gemini_cache_service import get_prefix_cache, is_cache_unusable_error
+
+_client = None
+
+
+def get_gemini_client() -> genai.Client:
+    """공유 Gemini 클라이언트 (요청마다 새로 생성하지 않음)"""
+    global _client
+    if _client is None:
+        _client = genai.Client(api_key=GEMINI_API_KEY)
+    return _client
+
+
+async def _build_prefix_config(prefix_key: str, model: str):
+    """프리픽스 키가 있으면 캐시된 고정 지시문을 사용하는 설정 반환"""
+    if not prefix_key:
+        return None
+    return await get_prefix_cache().build_config(prefix_key, model)
+
+
+async def generate_content_with_prefix(contents, model: str, prefix_key: str = None, permit: Permit = None):
+    """
+    고정 지시문 프리픽스를 적용한 generate_content 호출
+    
+    캐시된 프리픽스가 서버 측에서 만료/삭제된 경우에만 system_instruction으로 한 번 재시도합니다.
+    과부하(429/503), 타임아웃, 안전 필터 등 다른 오류는 재시도 없이 그대로 전달하고 캐시도 유지합니다.
+    
+    Args:
+        permit: 호출 측에서 미리 확보한 admission 슬롯 (없으면 내부에서 확보, 종료 시 반환)
+    
+    Raises:
+        APIError: admission 대기열 초과(503) 또는 QPS 초과(429)
+    """
+    client = get_gemini_client()
+    config = await _build_prefix_config(prefix_key, model)
+    async with permit or get_admission_controller().slot("gemini", model):
+        try:
+            return await client.aio.models.generate_content(
+                model=model,
+                contents=contents,
+                config=config
+            )
+        except Exception as e:
+            if config is None or not config.cached_content or not is_cache_unusable_error(e):
+                raise
+            print(f"⚠️ 캐시된 프리픽스 사용 실패, system_instruction으로 재시도: {e}")
+            get_prefix_cache().invalidate(prefix_key, model)
+            return await client.aio.models.generate_content(
+                model=model,
+                contents=contents,
+                config=get_prefix_cache().fallback_config(prefix_key)
+            )
 
 
 async def generate_gemini_stream(
     message: str,
     chat_history: list = None,
-    model: str = "gemini-2.5-flash"
+    model: str = "gemini-2.5-flash",
+    prefix_key: str = None,
+    permit: Permit = None,
+    tracker: Optional[StreamTracker] = None
 ) -> AsyncGenerator[str, None]:
     """
     Gemini 2.5 Flash를 사용한 스트리밍 응답 생성 (공식 문서 방식)
@@ -19,17 +77,28 @@ async def generate_gemini_stream(
         message: 사용자 메시지
         chat_history: 이전 대화 기록 (선택적)
         model: 사용할 모델명 (기본값: gemini-2.5-flash)
+        prefix_key: 등록된 고정 지시문 키 (선택적, gemini_cache_service 참고)
+        permit: 호출 측에서 미리 확보한 admission 슬롯 (없으면 내부에서 확보, 종료 시 반환)
+        tracker: 대기/연결 시간을 기록할 StreamTracker (선택적)
     
     Yields:
         str: 스트리밍된 텍스트 청크
     """
     if not GEMINI_API_KEY:
+        if permit is not None:
+            permit.release()
         yield "Error: GEMINI_API_KEY가 설정되지 않았습니다. .env 파일을 확인해주세요."
         return
     
     try:
-        # Gemini 클라이언트 초기화 (공식 문서 방식)
-        client = genai.Client(api_key=GEMINI_API_KEY)
+        client = get_gemini_client()
+        model = model or GEMINI_MODEL
+        # cached content 생성은 자체 admission 슬롯을 사용하므로 슬롯을 잡기 전에 설정을 준비
+        config = await _build_prefix_config(prefix_key, model)
+        if permit is None:
+            permit = await get_admission_controller().acquire("gemini", model)
+        if tracker is not None:
+            tracker.mark_admitted()
         
         # 채팅 히스토리가 있으면 메시지 구성
         contents = message
@@ -46,27 +115,41 @@ async def generate_gemini_stream(
                 contents = "\n".join(history_messages) + "\n" + message
         
         # 공식 문서 방식: generate_content_stream 사용
-        response = client.models.generate_content_stream(
-            model=model or GEMINI_MODEL,
-            contents=contents
+        # 비동기 클라이언트 사용: 청크 대기 중에도 이벤트 루프를 점유하지 않음
+        response = await client.aio.models.generate_content_stream(
+            model=model,
+            contents=contents,
+            config=config
         )
+        if tracker is not None:
+            tracker.mark_connected()
         
         # 스트리밍 응답 처리
-        for chunk in response:
-            if hasattr(chunk, 'text') and chunk.text:
-                yield chunk.text
-                await asyncio.sleep(0.01)
+        try:
+            async for chunk in response:
+                if hasattr(chunk, 'text') and chunk.text:
+                    yield chunk.text
+        finally:
+            # 소비자가 중간에 스트림을 닫으면 업스트림 연결도 즉시 종료
+            if hasattr(response, 'aclose'):
+                await response.aclose()
         
+    except APIError as e:
+        yield f"Error: {e.message} ({(e.data or {}).get('reason', '')})"
     except Exception as e:
         error_msg = f"Error: {str(e)}"
         print(f"❌ Gemini API 오류: {e}")
         yield error_msg
+    finally:
+        if permit is not None:
+            permit.release()
 
 
 async def generate_gemini_simple(
     message: str,
     chat_history: list = None,
-    model: str = "gemini-2.5-flash"
+    model: str = "gemini-2.5-flash",
+    prefix_key: str = None
 ) -> str:
     """
     Gemini 2.5 Flash를 사용한 단순 응답 생성 (비스트리밍, 공식 문서 방식)
@@ -75,6 +158,7 @@ async def generate_gemini_simple(
         message: 사용자 메시지
         chat_history: 이전 대화 기록 (선택적)
         model: 사용할 모델명 (기본값: gemini-2.5-flash)
+        prefix_key: 등록된 고정 지시문 키 (선택적, gemini_cache_service 참고)
     
     Returns:
         str: 완전한 응답 텍스트
@@ -84,7 +168,7 @@ async def generate_gemini_simple(
     
     try:
         # 공식 문서 방식: generate_content
-        client = genai.Client(api_key=GEMINI_API_KEY)
+        model = model or GEMINI_MODEL
         
         # 채팅 히스토리가 있으면 메시지 구성
         contents = message
@@ -98,13 +182,17 @@ async def generate_gemini_simple(
             if history_messages:
                 contents = "\n".join(history_messages) + "\n" + message
         
-        response = client.models.generate_content(
-            model=model or GEMINI_MODEL,
-            contents=contents
+        # 동일한 요청이 동시에 들어오면 Gemini 호출은 한 번만 하고 결과 공유
+        response = await get_single_flight("gemini_chat_simple").do(
+            canonical_key(model, prefix_key, contents),
+            lambda: generate_content_with_prefix(contents, model, prefix_key)
         )
         
         return response.text if hasattr(response, 'text') else str(response)
         
+    except APIError:
+        # admission 거절은 호출 측에서 503/429로 응답하도록 그대로 전달
+        raise
     except Exception as e:
         error_msg = f"Error: {str(e)}"
         print(f"❌ Gemini API 오류: {e}")
@@ -1,14 +1,25 @@
 """
 HuggingFace Inference API를 사용한 이미지 생성 서비스
 공식 문서 예제 코드 패턴을 따름
+모델별 설정(provider, 저장소, 기본 파라미터)은 image_model_registry에서 관리합니다.
+
+블로킹 InferenceClient 호출은 provider별 전용 스레드 풀에서 실행합니다.
+auto 라우팅/모델 비교의 제한 시간(asyncio.wait_for)으로 호출 측이 먼저 포기해도 스레드는 취소되지 않으므로,
+admission 슬롯은 스레드가 끝날 때 반환하고 클라이언트에는 HF_REQUEST_TIMEOUT을 설정합니다.
 """
 import os
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from dotenv import load_dotenv
 from huggingface_hub import InferenceClient
 from PIL import Image
 from io import BytesIO
-import base64
+from typing import Dict
+from app.core.admission import get_admission_controller
+from app.core.config import ADMISSION_DEFAULT_CONCURRENCY, ADMISSION_LIMITS, HF_REQUEST_TIMEOUT
+from app.core.exceptions import APIError
+from app.core.images import GeneratedImage
 
 # .env 파일 로드
 BASE_DIR = Path(__file__).resolve().parent.parent.parent
@@ -22,342 +33,127 @@ def get_hf_api_key():
     if not api_key:
         print("⚠️ HF_TOKEN 또는 HUGGINGFACE_API_KEY가 .env에 설정되지 않았습니다.")
         raise ValueError("HF_TOKEN 또는 HUGGINGFACE_API_KEY가 .env에 설정되지 않았습니다.")
-    print(f"✅ HuggingFace API 키 로드됨 (길이: {len(api_key)} 문자)")
     return api_key
 
 
-def get_hf_client_nscale():
-    """HuggingFace InferenceClient 생성 (nscale provider - SDXL용)"""
-    api_key = get_hf_api_key()
-    return InferenceClient(
-        provider="nscale",
-        api_key=api_key
-    )
-
-
-def get_hf_client_fal():
-    """HuggingFace InferenceClient 생성 (fal-ai provider - FLUX.2-dev용)"""
-    api_key = get_hf_api_key()
-    return InferenceClient(
-        provider="fal-ai",
-        api_key=api_key
-    )
-
-
-def get_hf_client_nebius():
-    """HuggingFace InferenceClient 생성 (nebius provider - FLUX.1-dev용)"""
-    api_key = get_hf_api_key()
-    return InferenceClient(
-        provider="nebius",
-        api_key=api_key
-    )
-
-
-def get_hf_client_default():
-    """HuggingFace InferenceClient (기본 provider)"""
-    api_key = get_hf_api_key()
-    return InferenceClient(
-        token=api_key
-    )
-
-
-async def generate_image_sdxl(prompt: str) -> str:
-    """
-    Stable Diffusion XL Base를 사용한 텍스트→이미지 생성
-    공식 문서 예제 패턴: nscale provider 사용
-    
-    Args:
-        prompt: 이미지 생성 프롬프트 (영어)
-    
-    Returns:
-        base64 인코딩된 이미지 문자열 (data:image/png;base64,...)
-    """
-    try:
-        client = get_hf_client_nscale()
-        
-        # output is a PIL.Image object (공식 문서 예제와 동일)
-        image = client.text_to_image(
-            prompt,
-            model="stabilityai/stable-diffusion-xl-base-1.0"
-        )
-        
-        # base64로 인코딩
-        buffered = BytesIO()
-        image.save(buffered, format="PNG")
-        img_str = base64.b64encode(buffered.getvalue()).decode()
-        
-        return f"data:image/png;base64,{img_str}"
-        
-    except Exception as e:
-        print(f"❌ SDXL 이미지 생성 실패: {type(e).__name__}: {e}")
-        import traceback
-        traceback.print_exc()
-        raise Exception(f"SDXL 이미지 생성 실패: {e}")
+# provider별 공유 InferenceClient (요청마다 새로 만들지 않음)
+_clients: Dict[str, InferenceClient] = {}
 
 
-async def generate_image_flux(prompt: str, base_image: bytes = None) -> str:
+def get_hf_client(provider: str) -> InferenceClient:
     """
-    FLUX.2-dev를 사용한 이미지 생성
-    공식 문서 예제 패턴: fal-ai provider 사용
+    provider별 공유 InferenceClient
     
     Args:
-        prompt: 이미지 생성 프롬프트 (영어)
-        base_image: 기본 이미지 바이트 (image-to-image용, 선택적)
-    
-    Returns:
-        base64 인코딩된 이미지 문자열 (data:image/png;base64,...)
-    """
-    try:
-        client = get_hf_client_fal()
-        
-        if base_image:
-            # Image-to-Image (공식 문서 예제 패턴)
-            # output is a PIL.Image object
-            image = client.image_to_image(
-                base_image,
-                prompt=prompt,
-                model="black-forest-labs/FLUX.2-dev"
-            )
+        provider: fal-ai, nebius, nscale 등 Inference Provider 이름
+                  ("hf-inference"는 provider를 지정하지 않은 기본 클라이언트)
+    """
+    client = _clients.get(provider)
+    if client is None:
+        api_key = get_hf_api_key()
+        if provider == "hf-inference":
+            client = InferenceClient(token=api_key, timeout=HF_REQUEST_TIMEOUT)
         else:
-            # Text-to-Image
-            image = client.text_to_image(
-                prompt,
-                model="black-forest-labs/FLUX.2-dev"
-            )
-        
-        # base64로 인코딩
-        buffered = BytesIO()
-        image.save(buffered, format="PNG")
-        img_str = base64.b64encode(buffered.getvalue()).decode()
-        
-        return f"data:image/png;base64,{img_str}"
-        
-    except Exception as e:
-        print(f"❌ FLUX 이미지 생성 실패: {type(e).__name__}: {e}")
-        import traceback
-        traceback.print_exc()
-        raise Exception(f"FLUX 이미지 생성 실패: {e}")
+            client = InferenceClient(provider=provider, api_key=api_key, timeout=HF_REQUEST_TIMEOUT)
+        _clients[provider] = client
+        print(f"✅ HuggingFace 클라이언트 생성 ({provider}, API 키 길이: {len(api_key)} 문자)")
+    return client
 
 
-async def generate_image_flux_schnell(prompt: str) -> str:
-    """
-    FLUX.1-schnell을 사용한 텍스트→이미지 생성 (빠른 버전)
-    fal-ai provider 사용
-    
-    Args:
-        prompt: 이미지 생성 프롬프트 (영어)
-    
-    Returns:
-        base64 인코딩된 이미지 문자열
-    """
-    try:
-        client = get_hf_client_fal()
-        
-        image = client.text_to_image(
-            prompt,
-            model="black-forest-labs/flux-schnell"
-        )
-        
-        buffered = BytesIO()
-        image.save(buffered, format="PNG")
-        img_str = base64.b64encode(buffered.getvalue()).decode()
-        
-        return f"data:image/png;base64,{img_str}"
-        
-    except Exception as e:
-        print(f"❌ FLUX Schnell 이미지 생성 실패: {type(e).__name__}: {e}")
-        import traceback
-        traceback.print_exc()
-        raise Exception(f"FLUX Schnell 이미지 생성 실패: {e}")
+# provider별 전용 스레드 풀 (기본 스레드 풀은 이미지 저장소 등과 공유하므로 사용하지 않음)
+_executors: Dict[str, ThreadPoolExecutor] = {}
 
 
-async def generate_image_flux_dev(prompt: str) -> str:
+def _get_executor(provider: str) -> ThreadPoolExecutor:
     """
-    FLUX.1-dev를 사용한 텍스트→이미지 생성
-    공식 문서 예제 패턴: nebius provider 사용
-    
-    Args:
-        prompt: 이미지 생성 프롬프트 (영어)
-    
-    Returns:
-        base64 인코딩된 이미지 문자열
+    provider의 admission 동시 실행 한도만큼 스레드를 가진 풀
+    (슬롯은 스레드가 끝날 때 반환하므로 스레드 수가 한도를 넘지 않음)
     """
-    try:
-        client = get_hf_client_nebius()
-        
-        # output is a PIL.Image object (공식 문서 예제와 동일)
-        image = client.text_to_image(
-            prompt,
-            model="black-forest-labs/FLUX.1-dev"
+    executor = _executors.get(provider)
+    if executor is None:
+        workers = max(
+            [int(config.get("concurrency", ADMISSION_DEFAULT_CONCURRENCY))
+             for name, config in ADMISSION_LIMITS.items()
+             if name == provider or name.startswith(f"{provider}/")]
+            or [ADMISSION_DEFAULT_CONCURRENCY]
         )
-        
-        buffered = BytesIO()
-        image.save(buffered, format="PNG")
-        img_str = base64.b64encode(buffered.getvalue()).decode()
-        
-        return f"data:image/png;base64,{img_str}"
-        
-    except Exception as e:
-        print(f"❌ FLUX.1-dev 이미지 생성 실패: {type(e).__name__}: {e}")
-        import traceback
-        traceback.print_exc()
-        raise Exception(f"FLUX.1-dev 이미지 생성 실패: {e}")
+        executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f"hf-{provider}")
+        _executors[provider] = executor
+    return executor
 
 
-async def generate_image_playground_v25(prompt: str) -> str:
-    """
-    Playground v2.5를 사용한 텍스트→이미지 생성
-    
-    Args:
-        prompt: 이미지 생성 프롬프트 (영어)
-    
-    Returns:
-        base64 인코딩된 이미지 문자열
-    """
-    try:
-        client = get_hf_client_default()
-        
-        image = client.text_to_image(
-            prompt,
-            model="playgroundai/playground-v2.5-1024px-aesthetic"
-        )
-        
-        buffered = BytesIO()
-        image.save(buffered, format="PNG")
-        img_str = base64.b64encode(buffered.getvalue()).decode()
-        
-        return f"data:image/png;base64,{img_str}"
-        
-    except Exception as e:
-        print(f"❌ Playground v2.5 이미지 생성 실패: {type(e).__name__}: {e}")
-        import traceback
-        traceback.print_exc()
-        raise Exception(f"Playground v2.5 이미지 생성 실패: {e}")
+def _encode_png(image: Image.Image) -> GeneratedImage:
+    # InferenceClient가 PIL.Image로 디코딩해서 돌려주므로 PNG로 다시 인코딩
+    buffered = BytesIO()
+    image.save(buffered, format="PNG")
+    return GeneratedImage(buffered.getvalue(), "image/png")
 
 
-async def generate_image_sd15(prompt: str) -> str:
+async def _run_hf(provider: str, fn, *args, **kwargs) -> GeneratedImage:
     """
-    Stable Diffusion 1.5를 사용한 텍스트→이미지 생성
+    admission 슬롯을 확보한 뒤 블로킹 InferenceClient 호출과 PNG 인코딩을 provider 스레드 풀에서 실행
     
-    Args:
-        prompt: 이미지 생성 프롬프트 (영어)
-    
-    Returns:
-        base64 인코딩된 이미지 문자열
-    """
-    try:
-        client = get_hf_client_default()
-        
-        image = client.text_to_image(
-            prompt,
-            model="runwayml/stable-diffusion-v1-5"
-        )
-        
-        buffered = BytesIO()
-        image.save(buffered, format="PNG")
-        img_str = base64.b64encode(buffered.getvalue()).decode()
-        
-        return f"data:image/png;base64,{img_str}"
-        
-    except Exception as e:
-        print(f"❌ SD 1.5 이미지 생성 실패: {type(e).__name__}: {e}")
-        import traceback
-        traceback.print_exc()
-        raise Exception(f"SD 1.5 이미지 생성 실패: {e}")
-
-
-async def generate_image_realistic_vision(prompt: str) -> str:
-    """
-    Realistic Vision을 사용한 텍스트→이미지 생성 (사실적인 이미지)
+    호출 측이 제한 시간 초과 등으로 취소되어도 슬롯은 스레드가 실제로 끝날 때 반환합니다.
     
     Args:
-        prompt: 이미지 생성 프롬프트 (영어)
-    
-    Returns:
-        base64 인코딩된 이미지 문자열
+        provider: admission 키로 사용할 provider 이름 (fal-ai, nebius, nscale, hf-inference)
+        fn: client.text_to_image / client.image_to_image
     """
+    permit = await get_admission_controller().acquire(provider, kwargs.get("model"))
     try:
-        client = get_hf_client_default()
-        
-        image = client.text_to_image(
-            prompt,
-            model="SG161222/Realistic_Vision_V5.1_noVAE"
+        future = asyncio.get_running_loop().run_in_executor(
+            _get_executor(provider), lambda: _encode_png(fn(*args, **kwargs))
         )
-        
-        buffered = BytesIO()
-        image.save(buffered, format="PNG")
-        img_str = base64.b64encode(buffered.getvalue()).decode()
-        
-        return f"data:image/png;base64,{img_str}"
-        
-    except Exception as e:
-        print(f"❌ Realistic Vision 이미지 생성 실패: {type(e).__name__}: {e}")
-        import traceback
-        traceback.print_exc()
-        raise Exception(f"Realistic Vision 이미지 생성 실패: {e}")
+    except BaseException:
+        permit.release()
+        raise
 
+    def _on_done(done: asyncio.Future) -> None:
+        permit.release()
+        if not done.cancelled():
+            done.exception()  # 호출 측이 먼저 포기한 경우 미처리 예외 경고 방지
 
-async def generate_image_dreamshaper(prompt: str) -> str:
-    """
-    DreamShaper를 사용한 텍스트→이미지 생성
-    
-    Args:
-        prompt: 이미지 생성 프롬프트 (영어)
-    
-    Returns:
-        base64 인코딩된 이미지 문자열
-    """
-    try:
-        client = get_hf_client_default()
-        
-        image = client.text_to_image(
-            prompt,
-            model="Lykon/DreamShaper"
-        )
-        
-        buffered = BytesIO()
-        image.save(buffered, format="PNG")
-        img_str = base64.b64encode(buffered.getvalue()).decode()
-        
-        return f"data:image/png;base64,{img_str}"
-        
-    except Exception as e:
-        print(f"❌ DreamShaper 이미지 생성 실패: {type(e).__name__}: {e}")
-        import traceback
-        traceback.print_exc()
-        raise Exception(f"DreamShaper 이미지 생성 실패: {e}")
+    future.add_done_callback(_on_done)
+    return await asyncio.shield(future)
 
 
-async def generate_image_flux_image_to_image(base_image: bytes, prompt: str) -> str:
+async def generate_image_hf(
+    provider: str,
+    model: str,
+    prompt: str,
+    base_image: bytes = None,
+    label: str = None,
+    **params
+) -> GeneratedImage:
     """
-    FLUX.2-dev를 사용한 이미지→이미지 변환
-    공식 문서 예제 패턴: fal-ai provider 사용
+    HuggingFace Inference Provider를 사용한 이미지 생성
+    공식 문서 예제 패턴: client.text_to_image / client.image_to_image (output is a PIL.Image object)
     
     Args:
-        base_image: 기본 이미지 바이트
-        prompt: 수정 프롬프트 (영어)
+        provider: Inference Provider 이름 (get_hf_client 참고)
+        model: HuggingFace 모델 저장소 (예: black-forest-labs/FLUX.2-dev)
+        prompt: 이미지 생성 프롬프트 (영어)
+        base_image: 기본 이미지 바이트 (image-to-image용, 선택적)
+        label: 로그/오류 메시지에 표시할 모델 이름
+        **params: 추가 생성 파라미터 (num_inference_steps, guidance_scale 등)
     
     Returns:
-        base64 인코딩된 이미지 문자열
+        PNG 이미지 (GeneratedImage)
     """
+    label = label or model
     try:
-        client = get_hf_client_fal()
+        client = get_hf_client(provider)
         
-        # output is a PIL.Image object (공식 문서 예제와 동일)
-        image = client.image_to_image(
-            base_image,
-            prompt=prompt,
-            model="black-forest-labs/FLUX.2-dev"
-        )
-        
-        buffered = BytesIO()
-        image.save(buffered, format="PNG")
-        img_str = base64.b64encode(buffered.getvalue()).decode()
-        
-        return f"data:image/png;base64,{img_str}"
+        if base_image:
+            # Image-to-Image
+            return await _run_hf(provider, client.image_to_image, base_image, prompt=prompt, model=model, **params)
+        # Text-to-Image
+        return await _run_hf(provider, client.text_to_image, prompt, model=model, **params)
         
+    except APIError:
+        raise
     except Exception as e:
-        print(f"❌ FLUX 이미지→이미지 변환 실패: {type(e).__name__}: {e}")
+        print(f"❌ {label} 이미지 생성 실패: {type(e).__name__}: {e}")
         import traceback
         traceback.print_exc()
-        raise Exception(f"FLUX 이미지→이미지 변환 실패: {e}")
+        raise Exception(f"{label} 이미지 생성 실패: {e}")
@@ -0,0 +1,150 @@
+"""
+이미지 생성 결과 캐시
+같은 모델 + 프롬프트 + 기본 이미지 + 생성 파라미터로 다시 요청하면
+업스트림(Gemini 할당량, 느린 HF provider)을 호출하지 않고 저장된 이미지를 바로 반환합니다.
+
+- 키: 모델 ID, 공백을 정리한 프롬프트, 기본 이미지 SHA-256 (정규화 전 원본이므로 적중 시 전처리도 생략), 기본값을 합친 생성 파라미터
+  (인물/스타일 참고 사진이 있으면 순서대로 SHA-256 추가)
+- 값: 이미지 저장소 digest 목록 (ResultCache "image", 메모리 LRU + 디스크 계층)
+- 이미지 바이트는 이미지 저장소에만 있으므로 용량 기준 LRU 삭제는 저장소가 담당하고,
+  저장소에서 삭제된 이미지를 가리키는 항목은 miss로 처리하여 다시 생성
+- fresh=True면 캐시를 건너뛰고 새로 생성한 결과로 덮어씀
+- 같은 키의 동시 요청은 single-flight로 한 번만 생성
+"""
+import hashlib
+from typing import Dict, List, Optional, Tuple
+from app.core.config import (
+    IMAGE_CACHE_ENABLED,
+    IMAGE_CACHE_TTL,
+    IMAGE_CACHE_MEMORY_ENTRIES,
+    IMAGE_CACHE_DISK_ENTRIES,
+)
+from app.core.images import GeneratedImage
+from app.core.image_store import get_image_store
+from app.core.metrics import get_metrics_registry
+from app.core.result_cache import get_result_cache
+from app.core.singleflight import canonical_key, get_single_flight
+from app.services.image_model_registry import MULTI_IMAGE, ImageModelSpec
+
+# 생성 방식(서비스 코드/기본 파라미터 의미)이 바뀌면 올려서 기존 캐시 무효화
+IMAGE_CACHE_VERSION = "image-v1"
+
+
+def _image_cache():
+    return get_result_cache(
+        "image",
+        ttl=IMAGE_CACHE_TTL,
+        max_entries=IMAGE_CACHE_MEMORY_ENTRIES,
+        max_disk_entries=IMAGE_CACHE_DISK_ENTRIES,
+    )
+
+
+def normalize_prompt(prompt: str) -> str:
+    """앞뒤 공백 제거 + 연속 공백/줄바꿈 정리 (대소문자는 결과에 영향을 줄 수 있으므로 유지)"""
+    return " ".join(prompt.split())
+
+
+def _digest(data: Optional[bytes]) -> Optional[str]:
+    return hashlib.sha256(data).hexdigest() if data else None
+
+
+def image_cache_key(
+    spec: ImageModelSpec,
+    prompt: str,
+    base_image: Optional[bytes] = None,
+    person_image: Optional[bytes] = None,
+    style_images: Optional[List[bytes]] = None,
+    **params
+) -> str:
+    """결과 캐시 키: 모델 + 정규화된 프롬프트 + 기본/참고 이미지 해시 + 실제로 적용될 생성 파라미터"""
+    params = {**spec.default_params, **params}
+    if not spec.supports(MULTI_IMAGE):
+        params.pop("number_of_images", None)
+    parts = [IMAGE_CACHE_VERSION, spec.id, spec.repo, normalize_prompt(prompt), _digest(base_image), params]
+    if person_image or style_images:
+        # 참고 사진이 없는 요청의 키는 그대로 유지 (기존 캐시 재사용)
+        parts.append({"person": _digest(person_image), "styles": [_digest(image) for image in style_images or []]})
+    return canonical_key(*parts)
+
+
+async def _load_cached(entry: dict) -> Optional[List[GeneratedImage]]:
+    """캐시 항목의 digest로 저장소에서 이미지 읽기 (하나라도 없으면 None)"""
+    store = get_image_store()
+    images = []
+    for digest in entry.get("digests", []):
+        image = await store.read(digest)
+        if image is None:
+            return None
+        images.append(image)
+    return images or None
+
+
+async def _generate_and_cache(
+    key: str,
+    spec: ImageModelSpec,
+    prompt: str,
+    base_image: Optional[bytes],
+    references: Dict,
+    params: dict
+) -> List[GeneratedImage]:
+    images = await spec.generate(prompt, base_image, **references, **params)
+    store = get_image_store()
+    digests = []
+    for image in images:
+        try:
+            digest = await store.put(image)
+        except Exception as e:
+            # 저장 실패 시 캐시하지 않음 (생성 결과는 그대로 반환)
+            print(f"⚠️ 이미지 저장 실패, 결과 캐시 생략: {e}")
+            return images
+        image.metadata["X-Image-Digest"] = digest
+        digests.append(digest)
+    await _image_cache().set(key, {"model": spec.id, "digests": digests})
+    return images
+
+
+async def generate_images_cached(
+    spec: ImageModelSpec,
+    prompt: str,
+    base_image: Optional[bytes] = None,
+    fresh: bool = False,
+    person_image: Optional[bytes] = None,
+    style_images: Optional[List[bytes]] = None,
+    **params
+) -> Tuple[List[GeneratedImage], bool]:
+    """
+    캐시를 거쳐 이미지 생성
+
+    Args:
+        spec: 이미지 모델 (image_model_registry)
+        fresh: True면 캐시를 건너뛰고 새로 생성 (결과는 캐시에 덮어씀)
+        person_image, style_images: 인물/스타일 참고 사진 (reference-images 모델)
+        params: spec.generate에 전달할 생성 파라미터
+
+    Returns:
+        (생성된 이미지 목록, 캐시 적중 여부)
+    """
+    references = {"person_image": person_image, "style_images": style_images} if person_image or style_images else {}
+    if not IMAGE_CACHE_ENABLED:
+        return await spec.generate(prompt, base_image, **references, **params), False
+
+    registry = get_metrics_registry()
+    key = image_cache_key(spec, prompt, base_image, **references, **params)
+    if fresh:
+        registry.inc("result_cache_requests_total", cache="image", result="bypass")
+    else:
+        entry = await _image_cache().get(key)
+        if entry is not None:
+            images = await _load_cached(entry)
+            if images is not None:
+                print(f"✅ 이미지 캐시 적중 ({spec.id}, {len(images)}장)")
+                return images, True
+            # 저장소 용량 정리로 이미지가 삭제된 경우
+            _image_cache().invalidate(key)
+            registry.inc("result_cache_requests_total", cache="image", result="evicted")
+
+    images = await get_single_flight("image_generation").do(
+        key,
+        lambda: _generate_and_cache(key, spec, prompt, base_image, references, params)
+    )
+    return images, False
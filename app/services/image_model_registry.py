@@ -0,0 +1,192 @@
+"""
+이미지 생성 모델 레지스트리
+모델마다 provider, 지원 기능(text-to-image / image-to-image), 비용 등급, 기본 파라미터를 선언하고
+요청 라우팅과 /image/models 목록을 모두 여기서 만듭니다.
+
+새 모델 추가는 IMAGE_MODELS에 ImageModelSpec 한 줄을 추가하는 것으로 충분합니다.
+HuggingFace provider는 huggingface_service의 provider별 공유 클라이언트를 사용합니다.
+"""
+import asyncio
+import time
+from dataclasses import dataclass, field
+from typing import Dict, FrozenSet, List, Optional
+from app.core.exceptions import APIError, bad_request
+from app.core.image_input import normalize_input_image
+from app.core.resilience import EwmaStats, get_ewma_stats
+from app.core.images import GeneratedImage
+from app.services.huggingface_service import generate_image_hf
+from app.services.gemini_image_service import generate_image_gemini3
+from app.services.imagen_service import generate_image_imagen
+
+TEXT_TO_IMAGE = "text-to-image"
+IMAGE_TO_IMAGE = "image-to-image"
+MULTI_IMAGE = "multi-image"  # 한 번에 여러 장 생성 (number_of_images)
+REFERENCE_IMAGES = "reference-images"  # 기본 이미지와 함께 인물/스타일 참고 사진 입력
+
+T2I = frozenset({TEXT_TO_IMAGE})
+T2I_I2I = frozenset({TEXT_TO_IMAGE, IMAGE_TO_IMAGE})
+
+
+@dataclass(frozen=True)
+class ImageModelSpec:
+    id: str                          # API에서 사용하는 모델 ID
+    name: str                        # 표시 이름
+    provider: str                    # fal-ai, nebius, nscale, hf-inference, imagen (admission 키와 동일), google
+    capabilities: FrozenSet[str]
+    description: str = ""
+    repo: Optional[str] = None       # HuggingFace 모델 저장소 (google 모델은 없음)
+    cost_tier: str = "free"          # free, premium
+    default_params: Dict = field(default_factory=dict)
+    input_max_side: int = 1024       # 입력 이미지(image-to-image) 최대 해상도, 넘으면 전송 전에 축소
+
+    def supports(self, capability: str) -> bool:
+        return capability in self.capabilities
+
+    async def generate(
+        self,
+        prompt: str,
+        base_image: bytes = None,
+        person_image: Optional[bytes] = None,
+        style_images: Optional[List[bytes]] = None,
+        **params
+    ) -> List[GeneratedImage]:
+        """
+        이미지 생성 (base_image가 있으면 image-to-image)
+
+        Args:
+            person_image, style_images: 인물/스타일 참고 사진 (reference-images 모델만, base_image 필요)
+            params: default_params를 덮어쓸 생성 파라미터 (number_of_images는 multi-image 모델만)
+
+        Returns:
+            생성된 이미지 목록 (multi-image 모델이 아니면 1장)
+
+        Raises:
+            APIError: 지원하지 않는 기능을 요청했거나 입력 이미지를 디코딩할 수 없는 경우 (400)
+        """
+        if base_image and not self.supports(IMAGE_TO_IMAGE):
+            raise bad_request("image_to_image_not_supported", {
+                "model": self.id,
+                "supported_models": [m.id for m in list_image_models(IMAGE_TO_IMAGE)],
+            })
+        if (person_image or style_images) and not (base_image and self.supports(REFERENCE_IMAGES)):
+            raise bad_request("reference_images_not_supported", {
+                "model": self.id,
+                "supported_models": [m.id for m in list_image_models(REFERENCE_IMAGES)],
+            })
+        if params.get("number_of_images", 1) != 1 and not self.supports(MULTI_IMAGE):
+            raise bad_request("multi_image_not_supported", {
+                "model": self.id,
+                "supported_models": [m.id for m in list_image_models(MULTI_IMAGE)],
+            })
+        if not self.supports(MULTI_IMAGE):
+            params.pop("number_of_images", None)
+        params = {**self.default_params, **params}
+        if base_image:
+            base_image = await normalize_input_image(base_image, self.input_max_side)
+        references = {}
+        if person_image or style_images:
+            # 참고 사진도 같은 해상도로 정규화 (여러 장이면 병렬)
+            if person_image:
+                person_image = await normalize_input_image(person_image, self.input_max_side)
+            style_images = list(await asyncio.gather(*(
+                normalize_input_image(image, self.input_max_side) for image in style_images or []
+            )))
+            references = {"person_image": person_image, "style_images": style_images}
+
+        # 모델별 지연 시간/오류율 기록 (auto 라우팅에 사용, admission 거절은 모델 상태와 무관하므로 제외)
+        started = time.monotonic()
+        try:
+            images = await self._dispatch(prompt, base_image, params, references)
+        except APIError:
+            raise
+        except Exception:
+            self.health.record_failure()
+            raise
+        self.health.record_success(time.monotonic() - started)
+        return images
+
+    @property
+    def health(self) -> EwmaStats:
+        return get_ewma_stats(f"image:{self.id}")
+
+    async def _dispatch(self, prompt: str, base_image: Optional[bytes], params: dict, references: dict) -> List[GeneratedImage]:
+        if self.provider == "google":
+            return [await generate_image_gemini3(prompt, base_image, **references)]
+        if self.provider == "imagen":
+            return await generate_image_imagen(prompt, **params)
+        return [await generate_image_hf(
+            self.provider,
+            self.repo,
+            prompt,
+            base_image,
+            label=self.name,
+            **params
+        )]
+
+    def describe(self) -> dict:
+        return {
+            "id": self.id,
+            "name": self.name,
+            "provider": self.provider,
+            "capabilities": sorted(self.capabilities),
+            "supports_image_to_image": self.supports(IMAGE_TO_IMAGE),
+            "cost_tier": self.cost_tier,
+            "input_max_side": self.input_max_side,
+            "default_params": self.default_params,
+            "description": self.description,
+            "health": self.health.stats(),
+        }
+
+
+IMAGE_MODELS: Dict[str, ImageModelSpec] = {}
+
+
+def register_image_model(spec: ImageModelSpec) -> ImageModelSpec:
+    IMAGE_MODELS[spec.id] = spec
+    return spec
+
+
+for _spec in [
+    ImageModelSpec("sdxl", "Stable Diffusion XL", "nscale", T2I,
+                   "고품질 텍스트→이미지 생성", repo="stabilityai/stable-diffusion-xl-base-1.0"),
+    ImageModelSpec("flux", "FLUX.2-dev", "fal-ai", T2I_I2I,
+                   "최신 FLUX 모델, 텍스트 및 이미지→이미지 지원", repo="black-forest-labs/FLUX.2-dev"),
+    ImageModelSpec("flux-schnell", "FLUX.1-schnell", "fal-ai", T2I,
+                   "빠른 생성 속도의 FLUX 모델", repo="black-forest-labs/flux-schnell"),
+    ImageModelSpec("flux-dev", "FLUX.1-dev", "nebius", T2I,
+                   "FLUX.1 개발 버전, 텍스트→이미지", repo="black-forest-labs/FLUX.1-dev"),
+    ImageModelSpec("playground", "Playground v2.5", "hf-inference", T2I,
+                   "고품질 미학적 이미지 생성", repo="playgroundai/playground-v2.5-1024px-aesthetic"),
+    ImageModelSpec("sd15", "Stable Diffusion 1.5", "hf-inference", T2I,
+                   "기본 SD 모델, 빠른 생성", repo="runwayml/stable-diffusion-v1-5"),
+    ImageModelSpec("realistic-vision", "Realistic Vision V5.1", "hf-inference", T2I,
+                   "사실적인 이미지 생성에 특화", repo="SG161222/Realistic_Vision_V5.1_noVAE"),
+    ImageModelSpec("dreamshaper", "DreamShaper", "hf-inference", T2I,
+                   "다양한 스타일의 이미지 생성", repo="Lykon/DreamShaper"),
+    ImageModelSpec("gemini", "Gemini 3 Pro Image Preview", "google", T2I_I2I | {REFERENCE_IMAGES},
+                   "유료 서비스, gemini-3-pro-image-preview 모델 사용", cost_tier="premium",
+                   input_max_side=1536),
+    ImageModelSpec("imagen", "Imagen 3.0", "imagen", frozenset({TEXT_TO_IMAGE, MULTI_IMAGE}),
+                   "유료 서비스, 한 번에 최대 4장 생성 (number_of_images)", cost_tier="premium",
+                   default_params={"number_of_images": 1}),
+]:
+    register_image_model(_spec)
+
+
+def get_image_model(model_id: str) -> ImageModelSpec:
+    """
+    Raises:
+        APIError: 등록되지 않은 모델 (400)
+    """
+    spec = IMAGE_MODELS.get(model_id)
+    if spec is None:
+        raise bad_request("unknown_model", {"model": model_id, "available": list(IMAGE_MODELS)})
+    return spec
+
+
+def list_image_models(capability: str = None, cost_tier: str = None) -> List[ImageModelSpec]:
+    return [
+        spec for spec in IMAGE_MODELS.values()
+        if (capability is None or spec.supports(capability))
+        and (cost_tier is None or spec.cost_tier == cost_tier)
+    ]
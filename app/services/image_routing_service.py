@@ -0,0 +1,155 @@
+"""
+이미지 모델 자동 라우팅 (model="auto")
+비슷한 결과를 내는 후보 모델(IMAGE_AUTO_MODELS) 중 최근 상태가 가장 좋은 모델로 요청을 보내고,
+실패하거나 제한 시간을 넘기면 같은 요청 제한 시간(IMAGE_AUTO_BUDGET_MS) 안에서 다음 후보로 전환합니다.
+
+- 상태: ImageModelSpec.generate가 모든 호출(auto가 아닌 요청 포함)의 지연 시간/오류율 EWMA를 기록
+- 점수: 예상 지연 시간 / (1 - 오류율), 기록이 없는 모델은 IMAGE_AUTO_DEFAULT_LATENCY로 가정
+- 오류율이 IMAGE_AUTO_MAX_ERROR_RATE를 넘는 모델은 마지막 실패 후 IMAGE_AUTO_COOLDOWN 동안 제외하고,
+  그 뒤에는 정상 후보가 모두 실패한 경우에만 시험 삼아 호출
+- admission 거절(429/503)은 모델 장애로 기록하지 않고 다음 후보로 전환
+- 인물/스타일 참고 사진이 있으면 reference-images 모델만 후보로 사용
+"""
+import asyncio
+import math
+import time
+from typing import List, Optional, Tuple
+from app.core.config import (
+    IMAGE_AUTO_MODELS,
+    IMAGE_AUTO_BUDGET_MS,
+    IMAGE_AUTO_ATTEMPT_TIMEOUT_MS,
+    IMAGE_AUTO_DEFAULT_LATENCY,
+    IMAGE_AUTO_MAX_ERROR_RATE,
+    IMAGE_AUTO_COOLDOWN,
+)
+from app.core.exceptions import APIError, bad_request, service_unavailable
+from app.core.images import GeneratedImage
+from app.core.metrics import get_metrics_registry
+from app.services.image_cache_service import generate_images_cached
+from app.services.image_model_registry import IMAGE_TO_IMAGE, IMAGE_MODELS, REFERENCE_IMAGES, ImageModelSpec
+
+AUTO_MODEL = "auto"
+
+
+def _score(spec: ImageModelSpec) -> float:
+    health = spec.health
+    latency = health.latency if health.latency is not None else IMAGE_AUTO_DEFAULT_LATENCY
+    return latency / max(0.05, 1.0 - health.error_rate)
+
+
+def _healthy(spec: ImageModelSpec) -> bool:
+    return spec.health.error_rate <= IMAGE_AUTO_MAX_ERROR_RATE
+
+
+def eligible_auto_models(base_image: bool = False, references: bool = False) -> List[ImageModelSpec]:
+    """요청에 필요한 기능을 지원하는 auto 후보 모델 (상태와 무관, IMAGE_AUTO_MODELS 순서)"""
+    return [
+        IMAGE_MODELS[model_id] for model_id in IMAGE_AUTO_MODELS
+        if model_id in IMAGE_MODELS
+        and (not base_image or IMAGE_MODELS[model_id].supports(IMAGE_TO_IMAGE))
+        and (not references or IMAGE_MODELS[model_id].supports(REFERENCE_IMAGES))
+    ]
+
+
+def _cooldown_remaining(spec: ImageModelSpec, now: float) -> float:
+    return IMAGE_AUTO_COOLDOWN - (now - spec.health.last_failure_at)
+
+
+def auto_candidates(base_image: bool = False, references: bool = False) -> List[ImageModelSpec]:
+    """
+    auto 후보 모델을 시도할 순서대로 반환
+    정상 모델은 점수 순 (같으면 IMAGE_AUTO_MODELS 순서), 비정상 모델은 쿨다운이 지난 것만 뒤에 붙임
+    """
+    specs = eligible_auto_models(base_image, references)
+    now = time.monotonic()
+    healthy = sorted((spec for spec in specs if _healthy(spec)), key=_score)
+    recovering = sorted(
+        (spec for spec in specs if not _healthy(spec) and _cooldown_remaining(spec, now) <= 0),
+        key=_score
+    )
+    return healthy + recovering
+
+
+async def generate_images_auto(
+    prompt: str,
+    base_image: Optional[bytes] = None,
+    fresh: bool = False,
+    budget_ms: int = IMAGE_AUTO_BUDGET_MS,
+    person_image: Optional[bytes] = None,
+    style_images: Optional[List[bytes]] = None,
+) -> Tuple[List[GeneratedImage], bool, ImageModelSpec, List[dict]]:
+    """
+    후보 모델을 순서대로 시도하여 처음 성공한 결과 반환
+
+    Returns:
+        (생성된 이미지, 캐시 적중 여부, 실제로 사용한 모델, 시도 기록)
+
+    Raises:
+        APIError: 요청 기능을 지원하는 후보가 없는 경우 (400),
+            모든 후보가 쿨다운 중이거나 실패/제한 시간을 넘긴 경우 (503)
+    """
+    references = bool(person_image or style_images)
+    eligible = eligible_auto_models(base_image is not None, references)
+    if not eligible:
+        raise bad_request("no_auto_candidates", {
+            "models": IMAGE_AUTO_MODELS,
+            "image_to_image": base_image is not None,
+            "reference_images": references,
+        })
+    candidates = auto_candidates(base_image is not None, references)
+    if not candidates:
+        # 요청 문제가 아니라 일시적인 업스트림 장애: 가장 먼저 쿨다운이 끝나는 시점 이후 재시도
+        now = time.monotonic()
+        retry_after = max(1, math.ceil(min(_cooldown_remaining(spec, now) for spec in eligible)))
+        raise service_unavailable("all_models_failed", retry_after=retry_after, data={
+            "attempts": [],
+            "cooling_down": [spec.id for spec in eligible],
+        })
+
+    registry = get_metrics_registry()
+    deadline = time.monotonic() + budget_ms / 1000
+    attempts = []
+    for spec in candidates:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        started = time.monotonic()
+        attempt = {"model": spec.id}
+        try:
+            images, cached = await asyncio.wait_for(
+                generate_images_cached(spec, prompt, base_image, fresh=fresh, person_image=person_image, style_images=style_images),
+                min(remaining, IMAGE_AUTO_ATTEMPT_TIMEOUT_MS / 1000)
+            )
+        except asyncio.TimeoutError:
+            # 제한 시간 초과는 generate 안에서 기록되지 않으므로 여기서 실패로 기록
+            spec.health.record_failure()
+            attempt["status"] = "timeout"
+        except APIError as e:
+            if e.status_code < 429:
+                # 요청 자체의 문제 (다른 모델로 바꿔도 같은 결과)
+                raise
+            attempt.update({"status": "rejected", "error": e.message})
+        except Exception as e:
+            print(f"⚠️ auto 라우팅: {spec.id} 실패, 다음 후보로 전환 ({type(e).__name__}: {e})")
+            attempt.update({"status": "failed", "error": str(e)})
+        else:
+            attempt.update({"status": "succeeded", "cached": cached})
+            attempt["latency_ms"] = int((time.monotonic() - started) * 1000)
+            attempts.append(attempt)
+            registry.inc("image_auto_route_total", model=spec.id, result="succeeded", attempt=str(len(attempts)))
+            return images, cached, spec, attempts
+        attempt["latency_ms"] = int((time.monotonic() - started) * 1000)
+        attempts.append(attempt)
+        registry.inc("image_auto_route_total", model=spec.id, result=attempt["status"], attempt=str(len(attempts)))
+
+    raise service_unavailable("all_models_failed", retry_after=30, data={"attempts": attempts})
+
+
+def describe_auto() -> dict:
+    """/image/models에 표시할 auto 라우팅 정보"""
+    return {
+        "id": AUTO_MODEL,
+        "candidates": [spec.id for spec in auto_candidates()],
+        "image_to_image_candidates": [spec.id for spec in auto_candidates(base_image=True)],
+        "budget_ms": IMAGE_AUTO_BUDGET_MS,
+    }
@@ -2,12 +2,12 @@
 Imagen 이미지 생성 서비스
 공식 문서: https://ai.google.dev/gemini-api/docs/imagen
 """
-import base64
-from io import BytesIO
-from PIL import Image
-from google import genai
 from google.genai import types
 from app.core.config import GEMINI_API_KEY
+from app.core.admission import get_admission_controller
+from app.core.exceptions import APIError
+from app.core.images import GeneratedImage
+from app.services.gemini_service import get_gemini_client
 
 # Imagen 모델명
 # 사용자 요청: imagen-3.0-generate-002
@@ -22,7 +22,7 @@ async def generate_image_imagen(
     image_size: str = "1K",  # "1K" or "2K"
     aspect_ratio: str = "1:1",  # "1:1", "3:4", "4:3", "9:16", "16:9"
     person_generation: str = "allow_adult"  # "dont_allow", "allow_adult", "allow_all"
-) -> list[str]:
+) -> list[GeneratedImage]:
     """
     Imagen을 사용한 이미지 생성 (text-to-image)
     
@@ -38,14 +38,14 @@ async def generate_image_imagen(
         use_ultra: True면 Imagen 4.0 Ultra 사용 (고품질, 한 번에 하나만 생성)
     
     Returns:
-        base64 인코딩된 이미지 문자열 리스트
+        생성된 이미지 리스트 (Imagen이 반환한 바이트를 재인코딩 없이 사용)
     """
     if not GEMINI_API_KEY:
         raise ValueError("GEMINI_API_KEY not configured in .env")
     
     try:
-        # Imagen 클라이언트 초기화
-        client = genai.Client(api_key=GEMINI_API_KEY)
+        # 공유 클라이언트 사용
+        client = get_gemini_client()
         
         # Imagen 3.0 모델 사용
         model = IMAGEN_MODEL
@@ -62,43 +62,36 @@ async def generate_image_imagen(
         print(f"   사람 생성: {person_generation}")
         
         # Imagen API 호출
-        response = client.models.generate_images(
-            model=model,
-            prompt=prompt,
-            config=types.GenerateImagesConfig(
-                number_of_images=number_of_images,
-                image_size=image_size,
-                aspect_ratio=aspect_ratio,
-                person_generation=person_generation
+        async with get_admission_controller().slot("imagen", model):
+            response = await client.aio.models.generate_images(
+                model=model,
+                prompt=prompt,
+                config=types.GenerateImagesConfig(
+                    number_of_images=number_of_images,
+                    image_size=image_size,
+                    aspect_ratio=aspect_ratio,
+                    person_generation=person_generation
+                )
             )
-        )
         
         print(f"✅ Imagen 응답 수신: {len(response.generated_images)}개 이미지")
         
-        # 생성된 이미지들을 base64로 변환
-        base64_images = []
+        # generated_image.image는 types.Image (image_bytes, mime_type) - 디코딩 없이 그대로 사용
+        images = []
         for i, generated_image in enumerate(response.generated_images):
-            try:
-                # generated_image.image는 PIL Image 객체
-                image = generated_image.image
-                
-                # PIL Image를 base64로 변환
-                img_buffer = BytesIO()
-                image.save(img_buffer, format='PNG')
-                img_bytes = img_buffer.getvalue()
-                img_b64 = base64.b64encode(img_bytes).decode('utf-8')
-                
-                base64_images.append(f"data:image/png;base64,{img_b64}")
-                print(f"✅ 이미지 {i+1}/{len(response.generated_images)} 변환 완료")
-            except Exception as img_error:
-                print(f"⚠️ 이미지 {i+1} 변환 실패: {img_error}")
+            image = generated_image.image
+            if image is None or not image.image_bytes:
+                print(f"⚠️ 이미지 {i+1} 데이터 없음")
                 continue
+            images.append(GeneratedImage.from_bytes(image.image_bytes, image.mime_type))
         
-        if not base64_images:
+        if not images:
             raise ValueError("No images were successfully generated")
         
-        return base64_images
+        return images
         
+    except APIError:
+        raise
     except Exception as e:
         error_msg = str(e)
         print(f"❌ Imagen 이미지 생성 실패: {type(e).__name__}: {e}")
@@ -0,0 +1,238 @@
+"""
+로컬 청첩장 문구 생성기 (템플릿 + 문구 조합)
+LLM 없이 즉시 문구를 만들어 Gemini가 늦거나 실패할 때 대체 응답으로 사용합니다.
+
+- 톤별 문구 뱅크(여는 말 / 본문 / 부모님 인사 / 맺음말)를 조합하여 옵션을 만듭니다.
+- 스타일(STYLE_MAP)별 첫 줄을 붙여 요청한 분위기를 반영합니다.
+- 같은 요청에는 항상 같은 결과가 나오도록 요청 내용으로 조합을 고릅니다. (캐시/재요청 일관성)
+- 이름 뒤 조사(과/와)는 받침 유무에 맞춰 붙입니다.
+"""
+import hashlib
+import random
+from typing import List
+
+# 스타일 코드 → 프롬프트/템플릿에 사용하는 톤 설명
+STYLE_MAP = {
+    "CLASSIC": "전통적이고 우아한",
+    "MODERN": "현대적이고 세련된",
+    "VINTAGE": "빈티지하고 로맨틱한",
+    "MINIMAL": "미니멀하고 깔끔한",
+    "LUXURY": "고급스럽고 화려한",
+    "NATURE": "자연스럽고 따뜻한",
+    "ROMANTIC": "로맨틱하고 감성적인"
+}
+DEFAULT_STYLE_DESC = "따뜻하고 정중한"
+
+# 스타일별 첫 줄 (빈 문자열이면 첫 줄 없이 본문부터)
+STYLE_LEADS = {
+    "CLASSIC": ["", "삼가 기쁜 소식을 전합니다.", "좋은 날을 택하여 혼례를 올리게 되었습니다."],
+    "MODERN": ["", "새로운 챕터를 시작합니다.", "우리, 같은 방향을 보기로 했습니다."],
+    "VINTAGE": ["", "오래된 편지처럼 마음을 담아 전합니다.", "천천히 익어 온 마음이 결실을 맺었습니다."],
+    "MINIMAL": ["", "", "저희 결혼합니다."],
+    "LUXURY": ["", "가장 빛나는 날에 귀한 분들을 모십니다.", "평생 한 번뿐인 순간에 초대합니다."],
+    "NATURE": ["", "꽃이 피고 바람이 좋은 날,", "푸른 계절을 닮은 사랑으로"],
+    "ROMANTIC": ["", "사랑이 머무는 자리에 초대합니다.", "설레는 마음을 한 장에 담았습니다."],
+}
+DEFAULT_LEADS = ["", "기쁜 소식을 전합니다."]
+
+# 톤별 문구 뱅크 ({groom_and}: 신랑 이름 + 과/와, {couple}: "신랑 · 신부")
+TONE_PHRASES = {
+    "affectionate": {
+        "main": [
+            "{groom_and} {bride}\n서로를 향한 마음을 담아\n평생의 동반자가 되려 합니다.",
+            "{groom_and} {bride}\n다정한 손을 맞잡고\n같은 길을 걸어가려 합니다.",
+            "서로의 가장 좋은 친구였던\n{groom_and} {bride}\n이제 한 가족이 됩니다.",
+        ],
+        "greeting": [
+            "두 사람의 시작을 축복해주세요.",
+            "따뜻한 마음으로 두 사람을 응원해 주세요.",
+        ],
+        "closing": [
+            "소중한 분들을 모시고 싶어\n이렇게 초대합니다.",
+            "함께해 주시면 더없이 기쁘겠습니다.",
+        ],
+    },
+    "cheerful": {
+        "main": [
+            "{groom} ♥ {bride}\n우리 결혼해요!",
+            "드디어 {groom_and} {bride}\n결혼합니다!",
+            "{couple}\n행복한 출발을 알려요!",
+        ],
+        "greeting": [
+            "함께 축하해주세요!",
+            "기쁜 날, 웃으며 만나요!",
+        ],
+        "closing": [
+            "행복한 출발을 함께해요!",
+            "꼭 오셔서 축하해 주세요!",
+        ],
+    },
+    "polite": {
+        "main": [
+            "{couple}\n두 사람이 혼인하오니\n귀한 걸음 하시어\n자리를 빛내주시면 감사하겠습니다.",
+            "{groom_and} {bride}\n두 사람이 새 가정을 이루게 되었습니다.\n바쁘시더라도 축복해 주시면 감사하겠습니다.",
+            "{couple} 두 사람이 하나가 되어\n새로운 인생을 시작합니다.",
+        ],
+        "greeting": [
+            "두 집안의 경사를 함께하시길 청합니다.",
+            "저희 두 사람의 앞날을 지켜봐 주십시오.",
+        ],
+        "closing": [
+            "부디 참석하시어 축복해주시기 바랍니다.",
+            "바쁘시겠지만 참석해 주시면 감사하겠습니다.",
+        ],
+    },
+    "formal": {
+        "main": [
+            "{couple}\n두 사람의 결혼을 알리오니\n부디 참석하시어\n축복해 주시기 바랍니다.",
+            "{couple}\n두 사람이 만나\n하나의 가정을 이루려 합니다.",
+            "{groom_and} {bride}\n두 사람이 백년가약을 맺게 되었기에\n삼가 알려드립니다.",
+        ],
+        "greeting": [
+            "삼가 청첩드립니다.",
+            "양가 부모님의 뜻을 모아 정중히 모십니다.",
+        ],
+        "closing": [
+            "귀한 시간 내어 주시면\n더없는 영광이겠습니다.",
+            "소중한 분들을 모시고 싶어\n이렇게 초대의 말씀을 드립니다.",
+        ],
+    },
+    "emotional": {
+        "main": [
+            "서로를 향한 마음이 모여\n하나의 사랑이 되었습니다.\n{groom_and} {bride}, 두 사람의 시작을\n함께 지켜봐 주세요.",
+            "{groom_and} {bride}\n사랑으로 하나가 되어\n새로운 가정을 이룹니다.",
+            "같은 계절을 여러 번 함께 지나\n{groom_and} {bride}\n이제 평생을 약속합니다.",
+        ],
+        "greeting": [
+            "두 사람이 만들어갈 아름다운 이야기에\n소중한 한 페이지가 되어주세요.",
+            "오래 기억될 하루를 함께 나누고 싶습니다.",
+        ],
+        "closing": [
+            "여러분의 축복이\n두 사람에게 큰 힘이 되겠습니다.",
+            "소중한 시간 함께해 주시면 더욱 기쁘겠습니다.",
+        ],
+    },
+}
+
+# 톤 순서와 설명 (톤 추천 응답의 tones 배열 순서와 동일)
+TONES = [
+    ("affectionate", "다정한"),
+    ("cheerful", "밝고 명랑한"),
+    ("polite", "예의 있는"),
+    ("formal", "격식 있는"),
+    ("emotional", "감성적인"),
+]
+
+# 문구 추천 옵션 1~5의 톤 (전통·정중 / 감성·로맨틱 / 현대·밝음 / 따뜻·친근 / 우아·격식)
+OPTION_TONES = ["polite", "emotional", "cheerful", "affectionate", "formal"]
+
+
+def style_description(style) -> str:
+    return STYLE_MAP.get(style, DEFAULT_STYLE_DESC) if style else DEFAULT_STYLE_DESC
+
+
+def _has_final_consonant(word: str) -> bool:
+    if not word:
+        return False
+    code = ord(word[-1]) - 0xAC00
+    return 0 <= code <= 11171 and code % 28 != 0
+
+
+def _with_and(name: str) -> str:
+    """이름 + 과/와"""
+    return f"{name}{'과' if _has_final_consonant(name) else '와'}"
+
+
+def _wedding_info(request) -> str:
+    return f"{request.wedding_date}\n{request.wedding_time or ''}\n{request.wedding_location or ''}"
+
+
+def _rng(request, salt: str) -> random.Random:
+    """요청 내용으로 정해지는 난수 생성기 (같은 요청 → 같은 조합)"""
+    seed = "|".join(str(v) for v in (
+        request.groom_name, request.bride_name, request.wedding_date,
+        request.wedding_time, request.wedding_location, request.style, salt,
+    ))
+    return random.Random(hashlib.sha256(seed.encode("utf-8")).digest())
+
+
+class _Composer:
+    """요청 하나에 대해 톤별 문구를 조합 (같은 톤을 여러 번 쓰면 다른 조합을 선택)"""
+
+    def __init__(self, request, salt: str):
+        self.request = request
+        self.rng = _rng(request, salt)
+        self.values = {
+            "groom": request.groom_name,
+            "bride": request.bride_name,
+            "groom_and": _with_and(request.groom_name),
+            "couple": f"{request.groom_name} · {request.bride_name}",
+        }
+        self.leads = list(STYLE_LEADS.get(request.style, DEFAULT_LEADS))
+        self.rng.shuffle(self.leads)
+        self._used = {}
+
+    def _pick(self, tone: str, part: str) -> str:
+        phrases = TONE_PHRASES[tone][part]
+        # 톤별로 한 번 섞은 순서를 차례로 사용하여 옵션 간 중복을 줄임
+        key = (tone, part)
+        if key not in self._used:
+            order = list(range(len(phrases)))
+            self.rng.shuffle(order)
+            self._used[key] = [order, 0]
+        order, position = self._used[key]
+        self._used[key][1] = position + 1
+        return phrases[order[position % len(order)]].format(**self.values)
+
+    def compose(self, tone: str, index: int) -> dict:
+        lead = self.leads[index % len(self.leads)]
+        main_text = self._pick(tone, "main")
+        return {
+            "main_text": f"{lead}\n\n{main_text}" if lead else main_text,
+            "parents_greeting": self._pick(tone, "greeting"),
+            "closing": self._pick(tone, "closing"),
+        }
+
+
+def generate_local_options(request, count: int = 5) -> List[dict]:
+    """
+    문구 추천(/invitation/text-recommend) 형식의 옵션을 로컬 템플릿으로 생성
+
+    Returns:
+        [{"main_text", "groom_father", "groom_mother", "bride_father", "bride_mother",
+          "wedding_info", "reception_info", "closing_text"}, ...]
+    """
+    composer = _Composer(request, "options")
+    options = []
+    for index in range(count):
+        text = composer.compose(OPTION_TONES[index % len(OPTION_TONES)], index)
+        options.append({
+            "main_text": text["main_text"],
+            "groom_father": request.groom_father_name or "",
+            "groom_mother": request.groom_mother_name or "",
+            "bride_father": request.bride_father_name or "",
+            "bride_mother": request.bride_mother_name or "",
+            "wedding_info": _wedding_info(request),
+            "reception_info": request.wedding_location or "",
+            "closing_text": text["closing"],
+        })
+    return options
+
+
+def generate_local_tones(request) -> List[dict]:
+    """
+    톤 추천(/invitation/tone-recommend) 형식의 5가지 톤을 로컬 템플릿으로 생성
+    """
+    composer = _Composer(request, "tones")
+    tones = []
+    for index, (tone, description) in enumerate(TONES):
+        text = composer.compose(tone, index)
+        tones.append({
+            "tone": tone,
+            "description": description,
+            "main_text": text["main_text"],
+            "parents_greeting": text["parents_greeting"],
+            "wedding_info": _wedding_info(request),
+            "closing": text["closing"],
+        })
+    return tones
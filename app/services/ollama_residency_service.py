@@ -0,0 +1,185 @@
+"""
+Ollama 모델 상주 관리
+허용된 채팅 모델만 사용하도록 제한하고, 어떤 모델을 메모리에 올려둘지 관리합니다.
+
+- 핫 모델(OLLAMA_HOT_MODELS): 앱 시작 시 미리 로드/워밍업하고 keep_alive=-1로 고정
+- 그 외 허용 모델: OLLAMA_KEEP_ALIVE 동안 유지, 상주 모델 수가 OLLAMA_MAX_RESIDENT를 넘으면
+  가장 오래 사용하지 않은(LRU) 모델부터 언로드 (진행 중인 요청이 있는 모델은 제외)
+
+상주 상태는 Ollama 호스트(OllamaBackend)별로 관리합니다.
+"""
+import asyncio
+import time
+from typing import Dict, List, Optional, Tuple
+from app.core.config import (
+    OLLAMA_CHAT_MODELS,
+    OLLAMA_HOT_MODELS,
+    OLLAMA_MAX_RESIDENT,
+    OLLAMA_KEEP_ALIVE,
+    LLM_FALLBACK_MODEL,
+)
+from app.core.exceptions import bad_request
+from app.core.metrics import get_metrics_registry
+from app.services.ollama_service import OllamaBackend, get_ollama_pool
+
+
+class ModelResidencyManager:
+
+    _snapshot_ttl = 10.0  # 상주 모델 목록(ps) 재조회 간격(초)
+
+    def __init__(
+        self,
+        allowed: List[str],
+        hot: List[str],
+        max_resident: int = OLLAMA_MAX_RESIDENT,
+        keep_alive=OLLAMA_KEEP_ALIVE,
+    ):
+        self.hot = list(dict.fromkeys(hot))
+        self.allowed = list(dict.fromkeys(allowed + self.hot))
+        self.max_resident = max(max_resident, len(self.hot))
+        self.keep_alive = keep_alive
+        # (호스트, 모델) 단위 마지막 사용 시각과 진행 중인 요청 수
+        self._last_used: Dict[Tuple[str, str], float] = {}
+        self._in_flight: Dict[Tuple[str, str], int] = {}
+        self._warmup: Dict[str, dict] = {}
+
+    def check(self, model: str) -> None:
+        """
+        허용된 모델인지 확인
+
+        Raises:
+            APIError: 허용 목록에 없는 모델 (400)
+        """
+        if model not in self.allowed:
+            raise bad_request("model_not_allowed", {"model": model, "allowed": self.allowed})
+
+    def keep_alive_for(self, model: str):
+        return -1 if model in self.hot else self.keep_alive
+
+    async def acquire(self, model: str, backend: OllamaBackend):
+        """
+        호스트에서 모델 사용 시작 (필요하면 LRU 모델을 언로드하여 자리 확보)
+
+        Returns:
+            이 요청에 사용할 keep_alive 값
+        """
+        self.check(model)
+        key = (backend.host, model)
+        self._in_flight[key] = self._in_flight.get(key, 0) + 1
+        self._last_used[key] = time.monotonic()
+        try:
+            await self._ensure_room(model, backend)
+        except Exception as e:
+            # 상주 관리 실패는 요청 자체를 막지 않음 (Ollama가 자체적으로 메모리를 관리)
+            print(f"⚠️ Ollama 상주 모델 확인/언로드 실패 ({backend.host}): {e}")
+        return self.keep_alive_for(model)
+
+    def release(self, model: str, backend: OllamaBackend) -> None:
+        """모델 사용 종료"""
+        key = (backend.host, model)
+        count = self._in_flight.get(key, 0) - 1
+        if count > 0:
+            self._in_flight[key] = count
+        else:
+            self._in_flight.pop(key, None)
+
+    async def _ensure_room(self, model: str, backend: OllamaBackend) -> None:
+        # 최근에 상주를 확인한 모델이면 ps 조회 없이 바로 사용
+        if model in backend.models and time.monotonic() - backend.models_at < self._snapshot_ttl:
+            return
+        async with backend.lock:
+            resident = list(await backend.refresh_models())
+            if model in resident:
+                return
+            while len(resident) >= self.max_resident:
+                victim = self._pick_victim(resident, backend)
+                if victim is None:
+                    break
+                await self.unload(victim, backend)
+                resident.remove(victim)
+            # 이번 요청으로 로드될 모델
+            backend.models = resident + [model]
+
+    def _pick_victim(self, resident: List[str], backend: OllamaBackend) -> Optional[str]:
+        """핫 모델과 사용 중인 모델을 제외하고 가장 오래 사용하지 않은 모델"""
+        candidates = [
+            m for m in resident
+            if m not in self.hot and not self._in_flight.get((backend.host, m))
+        ]
+        if not candidates:
+            return None
+        # 이 프로세스에서 사용한 적 없는 모델이 가장 오래된 것으로 간주
+        return min(candidates, key=lambda m: self._last_used.get((backend.host, m), 0.0))
+
+    async def unload(self, model: str, backend: OllamaBackend) -> None:
+        await backend.client.generate(model=model, keep_alive=0)
+        self._last_used.pop((backend.host, model), None)
+        get_metrics_registry().inc("ollama_model_unloaded_total", host=backend.host, model=model)
+        print(f"📤 Ollama 모델 언로드 (LRU, {backend.host}): {model}")
+
+    async def _warmup_backend(self, backend: OllamaBackend) -> None:
+        for model in self.hot:
+            key = f"{backend.host}/{model}"
+            self._warmup[key] = {"status": "loading"}
+            started = time.monotonic()
+            try:
+                await backend.client.generate(
+                    model=model,
+                    prompt="안녕하세요",
+                    options={"num_predict": 1},
+                    keep_alive=-1,
+                )
+                elapsed = time.monotonic() - started
+                self._warmup[key] = {"status": "ready", "load_seconds": round(elapsed, 2)}
+                self._last_used[(backend.host, model)] = time.monotonic()
+                get_metrics_registry().observe("ollama_warmup_seconds", elapsed, host=backend.host, model=model)
+                print(f"✅ Ollama 모델 워밍업 완료: {model} ({backend.host}, {elapsed:.1f}s)")
+            except Exception as e:
+                self._warmup[key] = {"status": "failed", "error": str(e)}
+                print(f"⚠️  WARNING: Ollama 모델 워밍업 실패 ({model}, {backend.host}): {e}")
+
+    async def warmup(self, backends: List[OllamaBackend] = None) -> None:
+        """모든 호스트에 핫 모델을 올리고 짧은 생성으로 워밍업 (keep_alive=-1로 고정)"""
+        backends = get_ollama_pool().backends if backends is None else backends
+        await asyncio.gather(*(self._warmup_backend(b) for b in backends))
+
+    async def _backend_status(self, backend: OllamaBackend) -> dict:
+        try:
+            response = await backend.client.ps()
+            resident = [
+                {
+                    "model": item.model,
+                    "size": item.size,
+                    "size_vram": item.size_vram,
+                    "expires_at": item.expires_at.isoformat() if item.expires_at else None,
+                    "pinned": item.model in self.hot,
+                    "in_flight": self._in_flight.get((backend.host, item.model), 0),
+                }
+                for item in (response.models or [])
+            ]
+            error = None
+        except Exception as e:
+            resident, error = [], str(e)
+        return {**backend.stats(), "resident": resident, "error": error}
+
+    async def status(self, backends: List[OllamaBackend] = None) -> dict:
+        """허용/핫 모델 목록과 호스트별 상주 모델"""
+        backends = get_ollama_pool().backends if backends is None else backends
+        return {
+            "allowed": self.allowed,
+            "hot": self.hot,
+            "max_resident": self.max_resident,
+            "warmup": self._warmup,
+            "hosts": await asyncio.gather(*(self._backend_status(b) for b in backends)),
+        }
+
+
+_manager: Optional[ModelResidencyManager] = None
+
+
+def get_residency_manager() -> ModelResidencyManager:
+    global _manager
+    if _manager is None:
+        # 텍스트 폴백 모델은 항상 허용
+        _manager = ModelResidencyManager(OLLAMA_CHAT_MODELS + [LLM_FALLBACK_MODEL], OLLAMA_HOT_MODELS)
+    return _manager
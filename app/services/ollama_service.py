@@ -0,0 +1,227 @@
+"""
+Ollama 비동기 클라이언트 풀
+OLLAMA_HOSTS에 지정된 Ollama 서버마다 AsyncClient(httpx 연결 풀)를 하나씩 두고
+요청을 분산합니다.
+
+- 라우팅: 진행 중인 요청이 가장 적은 호스트 (least outstanding requests)
+- 모델 친화성: 요청한 모델이 이미 로드된 호스트를 우선 (부하 차이가 OLLAMA_AFFINITY_SLACK 이내일 때)
+- 헬스 체크: 주기적으로 /api/ps를 조회하여 상태와 로드된 모델 목록 갱신
+- 제외(ejection): 연결 실패가 OLLAMA_EJECT_FAILURES회 연속되면 OLLAMA_EJECT_SECONDS 동안 라우팅에서 제외
+"""
+import asyncio
+import inspect
+import random
+import time
+from typing import Iterable, List, Optional
+import httpx
+from ollama import AsyncClient, ResponseError
+from app.core.config import (
+    OLLAMA_HOSTS,
+    OLLAMA_CONNECT_TIMEOUT,
+    OLLAMA_READ_TIMEOUT,
+    OLLAMA_MAX_CONNECTIONS,
+    OLLAMA_HEALTH_INTERVAL,
+    OLLAMA_EJECT_FAILURES,
+    OLLAMA_EJECT_SECONDS,
+    OLLAMA_AFFINITY_SLACK,
+)
+from app.core.exceptions import service_unavailable
+from app.core.metrics import get_metrics_registry
+
+
+def _create_client(host: str) -> AsyncClient:
+    return AsyncClient(
+        host=host,
+        timeout=httpx.Timeout(OLLAMA_READ_TIMEOUT, connect=OLLAMA_CONNECT_TIMEOUT),
+        limits=httpx.Limits(
+            max_connections=OLLAMA_MAX_CONNECTIONS,
+            max_keepalive_connections=OLLAMA_MAX_CONNECTIONS,
+        ),
+    )
+
+
+async def _close_client(client: AsyncClient) -> None:
+    """
+    클라이언트의 httpx 연결 풀 종료
+    ollama.AsyncClient는 외부 httpx 클라이언트를 받지 않고 공개 close API도 없으므로,
+    공개 메서드가 있으면 사용하고 없으면 내부 httpx 클라이언트를 찾아 닫습니다.
+    (라이브러리 구조가 바뀌어도 종료 과정에서 예외가 나지 않도록 getattr로 확인)
+    """
+    close = getattr(client, "aclose", None) or getattr(client, "close", None)
+    if close is None:
+        close = getattr(getattr(client, "_client", None), "aclose", None)
+    if close is None:
+        print(f"⚠️ Ollama 클라이언트 종료 방법을 찾지 못했습니다 ({type(client).__name__})")
+        return
+    try:
+        result = close()
+        if inspect.isawaitable(result):
+            await result
+    except Exception as e:
+        print(f"⚠️ Ollama 클라이언트 종료 실패: {type(e).__name__}: {e}")
+
+
+def is_backend_failure(error: BaseException) -> bool:
+    """호스트 장애로 볼 수 있는 오류 (연결 실패, 5xx). 모델 없음 같은 요청 오류는 제외"""
+    if isinstance(error, (httpx.TransportError, ConnectionError)):
+        return True
+    return isinstance(error, ResponseError) and error.status_code >= 500
+
+
+class OllamaBackend:
+    """Ollama 서버 하나의 클라이언트와 상태"""
+
+    def __init__(self, host: str, client: Optional[AsyncClient] = None):
+        self.host = host
+        self.client = client or _create_client(host)
+        self.outstanding = 0
+        self.failures = 0
+        self.healthy = True
+        self.ejected_until = 0.0
+        self.models: List[str] = []  # 마지막으로 확인한 로드된 모델 목록
+        self.models_at = 0.0
+        self.lock = asyncio.Lock()
+
+    @property
+    def available(self) -> bool:
+        return self.healthy and time.monotonic() >= self.ejected_until
+
+    async def refresh_models(self) -> List[str]:
+        response = await self.client.ps()
+        self.models = [item.model for item in (response.models or [])]
+        self.models_at = time.monotonic()
+        return self.models
+
+    def record_success(self) -> None:
+        self.failures = 0
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self.failures >= OLLAMA_EJECT_FAILURES and time.monotonic() >= self.ejected_until:
+            self.ejected_until = time.monotonic() + OLLAMA_EJECT_SECONDS
+            get_metrics_registry().inc("ollama_backend_ejected_total", host=self.host)
+            print(f"⚠️ Ollama 호스트 제외 ({self.host}, 연속 실패 {self.failures}회, {OLLAMA_EJECT_SECONDS:.0f}s)")
+
+    def stats(self) -> dict:
+        return {
+            "host": self.host,
+            "available": self.available,
+            "healthy": self.healthy,
+            "outstanding": self.outstanding,
+            "failures": self.failures,
+            "ejected_for": max(0.0, round(self.ejected_until - time.monotonic(), 1)),
+            "models": self.models,
+        }
+
+
+class BackendLease:
+    """선택된 호스트 사용권 (release는 여러 번 호출해도 한 번만 반영)"""
+
+    def __init__(self, backend: OllamaBackend):
+        self.backend = backend
+        self._released = False
+
+    @property
+    def client(self) -> AsyncClient:
+        return self.backend.client
+
+    def release(self, failed: bool = False) -> None:
+        if self._released:
+            return
+        self._released = True
+        self.backend.outstanding -= 1
+        if failed:
+            self.backend.record_failure()
+        else:
+            self.backend.record_success()
+
+
+class OllamaPool:
+
+    def __init__(self, backends: List[OllamaBackend]):
+        self.backends = backends
+        self._health_task: Optional[asyncio.Task] = None
+
+    def _pick(self, model: str, exclude: Iterable[OllamaBackend]) -> OllamaBackend:
+        candidates = [b for b in self.backends if b.available and b not in exclude]
+        if not candidates:
+            retry_after = min((b.ejected_until for b in self.backends), default=0.0) - time.monotonic()
+            raise service_unavailable(
+                "ollama_unavailable",
+                max(1, int(retry_after)),
+                {"hosts": [b.stats() for b in self.backends]},
+            )
+
+        least = min(b.outstanding for b in candidates)
+        warm = [b for b in candidates if model in b.models]
+        # 모델이 로드된 호스트가 크게 밀려 있지 않으면 로딩 비용을 피하도록 우선 선택
+        if warm and min(b.outstanding for b in warm) - least <= OLLAMA_AFFINITY_SLACK:
+            candidates = warm
+            least = min(b.outstanding for b in candidates)
+        return random.choice([b for b in candidates if b.outstanding == least])
+
+    def acquire(self, model: str, exclude: Iterable[OllamaBackend] = ()) -> BackendLease:
+        """
+        요청을 보낼 호스트 선택
+
+        Raises:
+            APIError: 사용 가능한 호스트가 없는 경우 (503)
+        """
+        backend = self._pick(model, list(exclude))
+        backend.outstanding += 1
+        get_metrics_registry().inc("ollama_backend_requests_total", host=backend.host)
+        return BackendLease(backend)
+
+    async def _check(self, backend: OllamaBackend) -> None:
+        try:
+            await asyncio.wait_for(backend.refresh_models(), OLLAMA_CONNECT_TIMEOUT)
+        except Exception as e:
+            if backend.healthy:
+                print(f"⚠️ Ollama 헬스 체크 실패 ({backend.host}): {e}")
+            backend.healthy = False
+            return
+        if not backend.healthy:
+            print(f"✅ Ollama 호스트 복구: {backend.host}")
+        backend.healthy = True
+
+    async def check_health(self) -> None:
+        await asyncio.gather(*(self._check(b) for b in self.backends))
+
+    async def _health_loop(self, interval: float) -> None:
+        while True:
+            await self.check_health()
+            await asyncio.sleep(interval)
+
+    def start_health_checks(self, interval: float = OLLAMA_HEALTH_INTERVAL) -> None:
+        if self._health_task is None:
+            self._health_task = asyncio.create_task(self._health_loop(interval))
+
+    async def close(self) -> None:
+        if self._health_task is not None:
+            self._health_task.cancel()
+            self._health_task = None
+        for backend in self.backends:
+            await _close_client(backend.client)
+
+    def stats(self) -> List[dict]:
+        return [b.stats() for b in self.backends]
+
+
+_pool: Optional[OllamaPool] = None
+
+
+def get_ollama_pool() -> OllamaPool:
+    """공유 Ollama 호스트 풀 (요청마다 클라이언트를 새로 생성하지 않음)"""
+    global _pool
+    if _pool is None:
+        _pool = OllamaPool([OllamaBackend(host) for host in OLLAMA_HOSTS])
+        get_metrics_registry().register_gauge("ollama_backends", _pool.stats)
+    return _pool
+
+
+async def close_ollama_pool() -> None:
+    """애플리케이션 종료 시 헬스 체크 중단 및 연결 풀 정리"""
+    global _pool
+    if _pool is not None:
+        await _pool.close()
+        _pool = None
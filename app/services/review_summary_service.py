@@ -2,9 +2,25 @@
 리뷰 요약 서비스 - 감성 분석 + Gemini 요약
 """
 from typing import Dict, Any, List
-from google import genai
-from app.core.config import GEMINI_API_KEY, GEMINI_MODEL
+from app.core.config import GEMINI_MODEL
 from app.services.sentiment_service import get_sentiment_service
+from app.services.text_generation_service import generate_text
+from app.services.gemini_cache_service import register_prompt_prefix
+
+
+# 리뷰 요약 고정 지시문 (프리픽스 캐시에 등록, 요청마다 리뷰 목록만 전송)
+REVIEW_SUMMARY_INSTRUCTION = """사용자가 웨딩 관련 리뷰 목록을 제공합니다. 리뷰들을 분석하여 한글로 요약해주세요.
+
+**중요 지시사항:**
+1. 각 리뷰의 감성을 분석하여 긍정/부정을 판단해주세요 (한글 리뷰 포함)
+2. 전체적인 평가를 긍정/부정 비율로 요약해주세요
+3. 주요 긍정 포인트를 2-3개 나열해주세요
+4. 주요 부정 포인트나 개선 사항이 있으면 나열해주세요
+5. 종합 의견을 제시해주세요
+
+요약은 200자 이내로 간결하게 작성해주세요. 한글로만 답변해주세요."""
+
+REVIEW_SUMMARY_PREFIX = register_prompt_prefix("review_summary", REVIEW_SUMMARY_INSTRUCTION)
 
 
 async def summarize_reviews_with_sentiment(
@@ -156,12 +172,7 @@ async def _generate_summary_with_gemini(
     """
     Gemini를 사용하여 리뷰 요약 생성
     """
-    if not GEMINI_API_KEY:
-        return "Gemini API 키가 설정되지 않았습니다."
-    
     try:
-        client = genai.Client(api_key=GEMINI_API_KEY)
-        
         # 프롬프트 구성
         vendor_info = ""
         if vendor_name:
@@ -181,42 +192,13 @@ async def _generate_summary_with_gemini(
 - 전체 감성: {sentiment_analysis['overall_sentiment']}
 """
         
-        prompt = f"""다음은 웨딩 관련 리뷰 목록입니다. 리뷰들을 분석하여 한글로 요약해주세요.
-
-{vendor_info}{sentiment_info}
+        # 요청별 가변 부분만 전송 (고정 지시문은 REVIEW_SUMMARY_PREFIX)
+        prompt = f"""{vendor_info}{sentiment_info}
 리뷰 목록:
-{reviews_text}
-
-**중요 지시사항:**
-1. 각 리뷰의 감성을 분석하여 긍정/부정을 판단해주세요 (한글 리뷰 포함)
-2. 전체적인 평가를 긍정/부정 비율로 요약해주세요
-3. 주요 긍정 포인트를 2-3개 나열해주세요
-4. 주요 부정 포인트나 개선 사항이 있으면 나열해주세요
-5. 종합 의견을 제시해주세요
+{reviews_text}"""
 
-요약은 200자 이내로 간결하게 작성해주세요. 한글로만 답변해주세요."""
-
-        response = client.models.generate_content(
-            model=GEMINI_MODEL,
-            contents=prompt
-        )
-        
-        # 응답에서 텍스트 추출
-        if hasattr(response, 'text'):
-            summary = response.text
-        elif hasattr(response, 'candidates') and len(response.candidates) > 0:
-            # candidates에서 텍스트 추출
-            candidate = response.candidates[0]
-            if hasattr(candidate, 'content') and hasattr(candidate.content, 'parts'):
-                parts = candidate.content.parts
-                if parts and len(parts) > 0:
-                    summary = parts[0].text if hasattr(parts[0], 'text') else str(parts[0])
-                else:
-                    summary = str(response)
-            else:
-                summary = str(response)
-        else:
-            summary = str(response)
+        # 서킷 브레이커/헤지 요청 적용, Gemini 장애 시 로컬 Ollama 모델로 폴백
+        summary = await generate_text(prompt, GEMINI_MODEL, REVIEW_SUMMARY_PREFIX)
         
         return summary.strip()
         
@@ -0,0 +1,172 @@
+"""
+텍스트 생성 복원력 계층
+Gemini 호출을 모델별 서킷 브레이커와 헤지 요청으로 감싸고,
+Gemini가 차단되었거나 실패하면 로컬 Ollama 모델로 자동 폴백합니다.
+
+청첩장 문구 추천, 리뷰 요약처럼 짧은 비스트리밍 텍스트 생성에 사용합니다.
+"""
+import asyncio
+import time
+from typing import Optional
+from app.core.config import (
+    GEMINI_API_KEY,
+    GEMINI_MODEL,
+    LLM_PRIMARY_TIMEOUT,
+    LLM_FALLBACK_TIMEOUT,
+    LLM_HEDGE_ENABLED,
+    LLM_FALLBACK_ENABLED,
+    LLM_FALLBACK_MODEL,
+)
+from app.core.exceptions import APIError
+from app.core.metrics import get_metrics_registry
+from app.core.admission import Permit, get_admission_controller
+from app.core.resilience import CircuitBreaker, HedgeSkipped, get_circuit_breaker, get_latency_window, hedged_call
+from app.core.singleflight import canonical_key, get_single_flight
+from app.services.gemini_service import generate_content_with_prefix
+from app.services.gemini_cache_service import get_prefix_cache
+from app.services.chat_service import generate_chat_text
+
+
+class TextGenerationError(Exception):
+    """Gemini와 폴백 모델 모두 응답하지 못한 경우"""
+
+
+def _response_text(response) -> str:
+    """generate_content 응답에서 텍스트 추출"""
+    text = getattr(response, 'text', None)
+    if not text and getattr(response, 'candidates', None):
+        parts = getattr(response.candidates[0].content, 'parts', None) or []
+        text = "".join(part.text for part in parts if getattr(part, 'text', None))
+    if not text:
+        raise ValueError("빈 응답")
+    return text
+
+
+async def _gemini_text(contents, model: str, prefix_key: Optional[str], permit: Permit = None) -> str:
+    response = await generate_content_with_prefix(contents, model, prefix_key, permit=permit)
+    return _response_text(response)
+
+
+async def _gemini_hedge(contents, model: str, prefix_key: Optional[str]) -> str:
+    """
+    헤지 시도: 빈 admission 슬롯이 바로 있을 때만 호출
+
+    대기열에서 기다리거나 503/429로 거절되면 부하만 늘리므로 HedgeSkipped로 헤지를 생략합니다.
+    """
+    permit = await get_admission_controller().try_acquire("gemini", model)
+    if permit is None:
+        raise HedgeSkipped("gemini")
+    async with permit:
+        return await _gemini_text(contents, model, prefix_key, permit)
+
+
+async def _call_guarded(
+    breaker: CircuitBreaker,
+    factory,
+    timeout: float,
+    hedge_delay: Optional[float] = None,
+    hedge_factory=None
+) -> str:
+    """
+    서킷 브레이커를 통과한 경우에만 호출하고 결과를 브레이커에 기록
+
+    자체 admission 거절(APIError)과 클라이언트 취소는 업스트림 장애로 보지 않습니다.
+    """
+    window = get_latency_window(breaker.name)
+    started = time.monotonic()
+    try:
+        text = await asyncio.wait_for(hedged_call(factory, hedge_delay, breaker.name, hedge_factory), timeout)
+    except (APIError, asyncio.CancelledError):
+        breaker.record_ignored()
+        raise
+    except Exception:
+        breaker.record_failure()
+        raise
+    breaker.record_success()
+    window.add(time.monotonic() - started)
+    return text
+
+
+async def generate_text(
+    contents,
+    model: str = None,
+    prefix_key: str = None,
+    fallback: bool = True
+) -> str:
+    """
+    Gemini 텍스트 생성 (서킷 브레이커 + 헤지 요청 + Ollama 폴백)
+
+    같은 (모델, 고정 지시문, 프롬프트) 요청이 동시에 들어오면 업스트림 호출은 한 번만 하고
+    결과를 공유합니다. (single-flight, 프리픽스 키별로 집계)
+
+    Args:
+        contents: 프롬프트
+        model: Gemini 모델명 (기본값: GEMINI_MODEL)
+        prefix_key: 등록된 고정 지시문 키 (폴백 시 system 메시지로 전달)
+        fallback: Gemini 실패 시 로컬 Ollama 모델로 폴백할지 여부
+
+    Returns:
+        str: 생성된 텍스트
+
+    Raises:
+        TextGenerationError: 모든 경로가 실패한 경우
+        APIError: 폴백 없이 admission에서 거절된 경우
+    """
+    model = model or GEMINI_MODEL
+    key = canonical_key(model, prefix_key, contents, fallback)
+    return await get_single_flight(prefix_key or "text_generation").do(
+        key,
+        lambda: _generate_text(contents, model, prefix_key, fallback)
+    )
+
+
+async def _generate_text(contents, model: str, prefix_key: Optional[str], fallback: bool) -> str:
+    registry = get_metrics_registry()
+    breaker = get_circuit_breaker(f"gemini/{model}")
+    reason = "no_api_key"
+
+    if GEMINI_API_KEY:
+        reason = "circuit_open"
+        if breaker.allow():
+            # half-open 시험 호출은 헤지하지 않음 (장애 중인 업스트림에 부하를 더하지 않도록)
+            hedge = LLM_HEDGE_ENABLED and breaker.state == CircuitBreaker.CLOSED
+            delay = get_latency_window(breaker.name).hedge_delay() if hedge else None
+            try:
+                return await _call_guarded(
+                    breaker,
+                    lambda: _gemini_text(contents, model, prefix_key),
+                    LLM_PRIMARY_TIMEOUT,
+                    delay,
+                    lambda: _gemini_hedge(contents, model, prefix_key),
+                )
+            except APIError as e:
+                if not fallback:
+                    raise
+                reason = "admission"
+                print(f"⚠️ Gemini admission 거절, 폴백 사용: {e.message}")
+            except asyncio.TimeoutError:
+                reason = "timeout"
+                print(f"⚠️ Gemini 응답 시간 초과 ({LLM_PRIMARY_TIMEOUT}s)")
+            except Exception as e:
+                reason = "error"
+                print(f"⚠️ Gemini 텍스트 생성 실패: {e}")
+
+    if not fallback or not LLM_FALLBACK_ENABLED:
+        raise TextGenerationError(f"Gemini 호출 실패 ({reason})")
+
+    registry.inc("llm_fallback_total", source=f"gemini/{model}", target=f"ollama/{LLM_FALLBACK_MODEL}", reason=reason)
+    fallback_breaker = get_circuit_breaker(f"ollama/{LLM_FALLBACK_MODEL}")
+    if not fallback_breaker.allow():
+        raise TextGenerationError(f"Gemini({reason})와 폴백 모델 모두 사용할 수 없습니다")
+
+    system = get_prefix_cache().get_instruction(prefix_key) if prefix_key else None
+    try:
+        return await _call_guarded(
+            fallback_breaker,
+            lambda: generate_chat_text(contents, LLM_FALLBACK_MODEL, system),
+            LLM_FALLBACK_TIMEOUT,
+        )
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        raise TextGenerationError(f"Gemini({reason}) 및 폴백 모델 실패: {e}") from e
@@ -0,0 +1,30 @@
+"""
+공용 fixture: Gemini 캐시 서비스를 로컬 백엔드로 구성
+옵션을 바꿔야 하는 테스트는 반환된 캐시의 속성(ttl, min_bytes 등)을 직접 수정합니다.
+"""
+import pytest
+from app.services.gemini_cache_service import LocalCacheBackend, PromptPrefixCache
+from app.services.gemini_file_service import LocalFileBackend, ReferenceUploadCache
+
+@pytest.fixture
+def cache_backend() -> LocalCacheBackend:
+    return LocalCacheBackend()
+
+
+@pytest.fixture
+def prefix_cache(cache_backend) -> PromptPrefixCache:
+    cache = PromptPrefixCache(backend=cache_backend, ttl=3600, refresh_margin=60, retry_after=600, enabled=True)
+    cache.register("invitation", "청첩장 문구 작성 지시문")
+    return cache
+
+
+@pytest.fixture
+def file_backend() -> LocalFileBackend:
+    return LocalFileBackend(ttl=3600)
+
+
+@pytest.fixture
+def reference_cache(file_backend) -> ReferenceUploadCache:
+    return ReferenceUploadCache(
+        backend=file_backend, ttl=3600, refresh_margin=60, min_bytes=100, enabled=True, prune_interval=600
+    )
@@ -0,0 +1,106 @@
+"""
+프로바이더별 admission control
+"""
+import asyncio
+import pytest
+from app.core.admission import AdmissionController
+from app.core.exceptions import APIError
+
+
+def make_controller(**config) -> AdmissionController:
+    options = {"concurrency": 1, "qps": 0, "queue": 1, "timeout": 0.05}
+    options.update(config)
+    return AdmissionController(limits={"test": options})
+
+
+async def test_rejects_with_503_when_queue_is_full():
+    admission = make_controller(queue=0)
+    permit = await admission.acquire("test")
+
+    with pytest.raises(APIError) as exc:
+        await admission.acquire("test")
+
+    assert exc.value.status_code == 503
+    assert exc.value.data["reason"] == "queue_full"
+    assert int(exc.value.headers["Retry-After"]) >= 1
+    permit.release()
+
+
+async def test_rejects_with_503_after_queue_timeout():
+    admission = make_controller()
+    permit = await admission.acquire("test")
+
+    with pytest.raises(APIError) as exc:
+        await admission.acquire("test")
+
+    assert exc.value.status_code == 503
+    assert exc.value.data["reason"] == "queue_timeout"
+    permit.release()
+
+
+async def test_rejects_with_429_when_qps_exceeded():
+    admission = make_controller(concurrency=10, qps=1, timeout=0.01)
+    await admission.acquire("test")
+
+    with pytest.raises(APIError) as exc:
+        await admission.acquire("test")
+
+    assert exc.value.status_code == 429
+    assert exc.value.data["reason"] == "rate_limited"
+    assert exc.value.headers["Retry-After"] == "1"
+
+
+async def test_queue_timeout_refunds_qps_token():
+    admission = make_controller(qps=2)
+    limiter = admission._limiter_for("test", None)
+    permit = await admission.acquire("test")
+    tokens = limiter._tokens
+
+    with pytest.raises(APIError):
+        await admission.acquire("test")
+
+    # 슬롯을 얻지 못한 요청은 QPS 토큰을 소비하지 않음
+    assert limiter._tokens >= tokens
+    permit.release()
+
+
+async def test_permit_release_is_idempotent():
+    admission = make_controller(concurrency=2)
+    limiter = admission._limiter_for("test", None)
+    first = await admission.acquire("test")
+    second = await admission.acquire("test")
+
+    first.release()
+    first.release()
+
+    assert limiter.active == 1
+    second.release()
+    assert limiter.active == 0
+    # 세마포어가 한도 이상으로 늘어나지 않음
+    await admission.acquire("test")
+    await admission.acquire("test")
+    assert limiter._semaphore.locked()
+
+
+async def test_slot_releases_on_error():
+    admission = make_controller()
+
+    with pytest.raises(RuntimeError):
+        async with admission.slot("test"):
+            raise RuntimeError("upstream failed")
+
+    permit = await asyncio.wait_for(admission.acquire("test"), 1)
+    permit.release()
+
+
+async def test_try_acquire_never_waits():
+    admission = make_controller()
+    permit = await admission.try_acquire("test")
+    limiter = admission._limiter_for("test", None)
+
+    assert permit is not None
+    assert await admission.try_acquire("test") is None
+    # 대기 없이 실패한 시도는 거절로 집계하지 않음
+    assert limiter.rejected == 0
+    permit.release()
+    assert await admission.try_acquire("test") is not None
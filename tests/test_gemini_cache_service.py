@@ -0,0 +1,116 @@
+"""
+프롬프트 프리픽스 캐시 (LocalCacheBackend 사용)
+"""
+import pytest
+from types import SimpleNamespace
+from google.genai import errors as genai_errors
+from app.services import gemini_service
+from app.services.gemini_cache_service import is_cache_unusable_error
+
+MODEL = "gemini-test"
+KEY = "invitation"  # conftest의 prefix_cache에 등록된 키
+
+
+async def test_reuses_cached_content(cache_backend, prefix_cache):
+    first = await prefix_cache.build_config(KEY, MODEL)
+    second = await prefix_cache.build_config(KEY, MODEL)
+
+    assert first.cached_content == second.cached_content
+    assert cache_backend.resolve(first.cached_content) == prefix_cache.get_instruction(KEY)
+    assert cache_backend.create_calls == 1
+    assert prefix_cache.stats["hits"] == 1
+
+
+async def test_falls_back_to_system_instruction_when_create_fails(cache_backend, prefix_cache):
+    cache_backend.min_chars = 10_000
+
+    config = await prefix_cache.build_config(KEY, MODEL)
+
+    assert config.cached_content is None
+    assert config.system_instruction == prefix_cache.get_instruction(KEY)
+    assert prefix_cache.stats["fallbacks"] == 1
+
+    # 재시도 간격 안에서는 생성을 다시 시도하지 않음
+    config = await prefix_cache.build_config(KEY, MODEL)
+    assert config.system_instruction == prefix_cache.get_instruction(KEY)
+    assert cache_backend.create_calls == 1
+
+
+async def test_retries_create_after_retry_window(cache_backend, prefix_cache):
+    cache_backend.min_chars = 10_000
+    prefix_cache.retry_after = 0
+
+    config = await prefix_cache.build_config(KEY, MODEL)
+    assert config.system_instruction == prefix_cache.get_instruction(KEY)
+
+    cache_backend.min_chars = 0
+    config = await prefix_cache.build_config(KEY, MODEL)
+
+    assert cache_backend.create_calls == 2
+    assert cache_backend.resolve(config.cached_content) == prefix_cache.get_instruction(KEY)
+    assert prefix_cache.stats["created"] == 1
+
+
+async def test_refreshes_before_expiry_and_recreates_after_invalidate(cache_backend, prefix_cache):
+    prefix_cache.refresh_margin = 7200
+
+    first = await prefix_cache.build_config(KEY, MODEL)
+    # 남은 시간이 refresh_margin보다 짧으므로 TTL 갱신
+    await prefix_cache.build_config(KEY, MODEL)
+    assert cache_backend.refresh_calls == 1
+
+    prefix_cache.invalidate(KEY, MODEL)
+    second = await prefix_cache.build_config(KEY, MODEL)
+    assert second.cached_content != first.cached_content
+    assert cache_backend.create_calls == 2
+
+
+def client_error(code: int, message: str) -> genai_errors.ClientError:
+    return genai_errors.ClientError(code, {"error": {"code": code, "message": message, "status": ""}})
+
+
+def test_only_cache_errors_are_unusable():
+    assert is_cache_unusable_error(client_error(404, "CachedContent not found"))
+    assert is_cache_unusable_error(client_error(403, "Permission denied on cached content"))
+    assert is_cache_unusable_error(client_error(400, "Invalid cached_content name"))
+    assert not is_cache_unusable_error(client_error(400, "Request contains an invalid argument."))
+    assert not is_cache_unusable_error(client_error(429, "Resource exhausted"))
+    assert not is_cache_unusable_error(TimeoutError())
+
+
+def use_failing_client(monkeypatch, prefix_cache, error: Exception) -> list:
+    """cached content를 사용한 요청만 error로 실패하는 클라이언트 (요청별 config 기록)"""
+    monkeypatch.setattr(gemini_service, "get_prefix_cache", lambda: prefix_cache)
+    configs = []
+
+    async def generate_content(model, contents, config):
+        configs.append(config)
+        if config.cached_content:
+            raise error
+        return "ok"
+
+    client = SimpleNamespace(aio=SimpleNamespace(models=SimpleNamespace(generate_content=generate_content)))
+    monkeypatch.setattr(gemini_service, "get_gemini_client", lambda: client)
+    return configs
+
+
+async def test_retries_with_system_instruction_when_cache_is_gone(monkeypatch, prefix_cache):
+    configs = use_failing_client(monkeypatch, prefix_cache, client_error(404, "CachedContent not found"))
+
+    result = await gemini_service.generate_content_with_prefix("내용", MODEL, KEY)
+
+    assert result == "ok"
+    assert configs[1].system_instruction == prefix_cache.get_instruction(KEY)
+    assert prefix_cache.stats["invalidated"] == 1
+
+
+async def test_does_not_retry_overload_errors(monkeypatch, prefix_cache):
+    error = genai_errors.ServerError(503, {"error": {"code": 503, "message": "overloaded", "status": ""}})
+    configs = use_failing_client(monkeypatch, prefix_cache, error)
+
+    with pytest.raises(genai_errors.ServerError) as exc:
+        await gemini_service.generate_content_with_prefix("내용", MODEL, KEY)
+    assert exc.value is error
+    assert len(configs) == 1
+    # 캐시는 그대로 유지
+    assert prefix_cache.stats["invalidated"] == 0
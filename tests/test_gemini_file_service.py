@@ -0,0 +1,104 @@
+"""
+참조 이미지 업로드 캐시 (LocalFileBackend 사용)
+"""
+import time
+import pytest
+from types import SimpleNamespace
+from app.services import gemini_file_service, gemini_image_service
+from app.services.gemini_file_service import LocalFileBackend
+
+IMAGE = b"\xff\xd8\xff" + b"a" * 1000
+OTHER = b"\xff\xd8\xff" + b"b" * 1000
+
+
+async def test_same_bytes_are_uploaded_once(file_backend, reference_cache):
+    first, digest = await reference_cache.part(IMAGE, "image/jpeg")
+    second, same_digest = await reference_cache.part(IMAGE, "image/jpeg")
+
+    assert file_backend.upload_calls == 1
+    assert digest == same_digest
+    assert first.inline_data.data == second.inline_data.data == IMAGE
+    assert reference_cache.stats["hits"] == 1
+
+    await reference_cache.part(OTHER, "image/jpeg")
+    assert file_backend.upload_calls == 2
+
+
+async def test_small_images_are_sent_inline(file_backend, reference_cache):
+    reference_cache.min_bytes = 10_000
+
+    part, digest = await reference_cache.part(IMAGE, "image/jpeg")
+
+    assert digest is None
+    assert part.inline_data.data == IMAGE
+    assert file_backend.upload_calls == 0
+
+
+async def test_reuploads_after_invalidate(file_backend, reference_cache):
+    _, digest = await reference_cache.part(IMAGE, "image/jpeg")
+    reference_cache.invalidate(digest)
+    await reference_cache.part(IMAGE, "image/jpeg")
+
+    assert file_backend.upload_calls == 2
+    assert reference_cache.stats["invalidated"] == 1
+
+
+async def test_reuploads_after_expiry(monkeypatch, file_backend, reference_cache):
+    now = time.time()
+
+    await reference_cache.part(IMAGE, "image/jpeg")
+    # 만료 refresh_margin초 전부터는 다시 업로드
+    monkeypatch.setattr(gemini_file_service.time, "time", lambda: now + 3600 - 30)
+    await reference_cache.part(IMAGE, "image/jpeg")
+
+    assert file_backend.upload_calls == 2
+
+
+async def test_prune_removes_expired_handles(monkeypatch, reference_cache):
+    reference_cache.prune_interval = 0
+    now = time.time()
+
+    await reference_cache.part(IMAGE, "image/jpeg")
+    monkeypatch.setattr(gemini_file_service.time, "time", lambda: now + 7200)
+    await reference_cache.part(OTHER, "image/jpeg")
+
+    assert reference_cache.stats["pruned"] == 1
+    assert len(reference_cache._entries) == 1
+
+
+async def test_upload_failure_falls_back_to_inline(reference_cache):
+    class FailingBackend(LocalFileBackend):
+        async def upload(self, data, mime_type, display_name):
+            raise OSError("upload failed")
+
+    reference_cache.backend = FailingBackend()
+
+    part, digest = await reference_cache.part(IMAGE, "image/jpeg")
+
+    assert digest is None
+    assert part.inline_data.data == IMAGE
+    assert reference_cache.stats["fallbacks"] == 1
+    assert reference_cache._entries == {}
+
+
+async def test_failed_reference_edit_raises_and_invalidates_uploads(monkeypatch, reference_cache):
+    monkeypatch.setattr(gemini_image_service, "get_reference_upload_cache", lambda: reference_cache)
+    text_only_calls = []
+
+    async def text_only(prompt):
+        text_only_calls.append(prompt)
+
+    async def failing_stream(**kwargs):
+        raise RuntimeError("stream failed")
+
+    client = SimpleNamespace(aio=SimpleNamespace(models=SimpleNamespace(generate_content_stream=failing_stream)))
+    monkeypatch.setattr(gemini_image_service, "get_gemini_client", lambda: client)
+    monkeypatch.setattr(gemini_image_service, "_generate_image_gemini", text_only)
+
+    with pytest.raises(RuntimeError):
+        await gemini_image_service._generate_image_with_reference("꽃 추가", IMAGE, person_image=OTHER)
+
+    # 참조 이미지를 무시한 텍스트 기반 결과로 대체하지 않음
+    assert text_only_calls == []
+    assert reference_cache._entries == {}
+    assert reference_cache.stats["invalidated"] == 2
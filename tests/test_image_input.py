@@ -0,0 +1,123 @@
+"""
+입력 이미지 정규화
+"""
+import itertools
+import struct
+from io import BytesIO
+import pytest
+from PIL import Image, ImageCms
+from app.core import image_input
+from app.core.exceptions import APIError
+from app.core.image_input import normalize_input_image
+
+
+def encode(image: Image.Image, format: str = "JPEG", **kwargs) -> bytes:
+    buffered = BytesIO()
+    image.save(buffered, format=format, **kwargs)
+    return buffered.getvalue()
+
+
+def _s15(value: float) -> bytes:
+    return struct.pack(">i", round(value * 65536))
+
+
+def cmyk_profile() -> bytes:
+    """
+    테스트용 최소 CMYK ICC 프로필 (v2, A2B0 lut8)
+    CLUT 꼭짓점은 단순 변환 R = (1 - C)(1 - K) ... 값을 sRGB → Lab으로 옮긴 값
+    """
+    corners = list(itertools.product((0, 255), repeat=4))
+    rgb = Image.new("RGB", (len(corners), 1))
+    rgb.putdata([tuple(round((255 - v) * (255 - k) / 255) for v in (c, m, y)) for c, m, y, k in corners])
+    lab = ImageCms.profileToProfile(rgb, ImageCms.createProfile("sRGB"), ImageCms.createProfile("LAB"), outputMode="LAB")
+    identity = bytes(range(256))
+    # LAB 이미지의 tobytes()는 a/b를 부호 있는 값으로 내보내므로 채널별로 꺼내 ICC 8비트 인코딩 그대로 사용
+    white_point = _s15(0.9642) + _s15(1.0) + _s15(0.8249)
+    tags = [
+        (b"desc", b"desc" + bytes(4) + struct.pack(">I", 5) + b"CMYK\0" + bytes(78)),
+        (b"wtpt", b"XYZ " + bytes(4) + white_point),
+        (b"A2B0", b"mft1" + bytes(4) + bytes([4, 3, 2, 0])
+            + b"".join(_s15(v) for v in (1, 0, 0, 0, 1, 0, 0, 0, 1))
+            + identity * 4 + bytes(itertools.chain(*zip(*(band.tobytes() for band in lab.split()))))
+            + identity * 3),
+    ]
+    offset = 128 + 4 + 12 * len(tags)
+    table, body = b"", b""
+    for signature, data in tags:
+        data += bytes(-len(data) % 4)
+        table += signature + struct.pack(">II", offset + len(body), len(data))
+        body += data
+    header = (
+        struct.pack(">I", offset + len(body)) + bytes(4) + struct.pack(">I", 0x02100000)
+        + b"prtrCMYKLab " + bytes(12) + b"acsp" + bytes(28) + white_point + bytes(48)
+    )
+    return header + struct.pack(">I", len(tags)) + table + body
+
+
+async def test_small_clean_image_is_passed_through():
+    data = encode(Image.new("RGB", (64, 32), (200, 10, 10)), "PNG")
+
+    assert await normalize_input_image(data, 1024) is data
+
+
+async def test_applies_exif_orientation_and_strips_metadata():
+    image = Image.new("RGB", (40, 20), (200, 10, 10))
+    exif = Image.Exif()
+    exif[0x0112] = 6  # 시계 방향 90도 회전해서 봐야 하는 사진
+    data = encode(image, exif=exif)
+
+    result = Image.open(BytesIO(await normalize_input_image(data, 1024)))
+
+    assert result.size == (20, 40)
+    assert not result.getexif()
+
+
+async def test_downscales_to_max_side():
+    data = encode(Image.new("RGB", (2000, 1000)))
+
+    result = Image.open(BytesIO(await normalize_input_image(data, 500)))
+
+    assert result.format == "JPEG"
+    assert result.size == (500, 250)
+
+
+async def test_keeps_transparency_as_png():
+    data = encode(Image.new("RGBA", (800, 400), (0, 0, 0, 0)), "PNG")
+
+    result = Image.open(BytesIO(await normalize_input_image(data, 200)))
+
+    assert result.format == "PNG"
+    assert result.mode == "RGBA"
+
+
+async def test_cmyk_with_icc_profile_is_converted_to_srgb_without_profile():
+    profile = cmyk_profile()
+    data = encode(Image.new("CMYK", (2000, 1000), (255, 0, 0, 0)), icc_profile=profile)
+
+    result = Image.open(BytesIO(await normalize_input_image(data, 500)))
+
+    assert result.mode == "RGB"
+    assert "icc_profile" not in result.info
+    red, green, blue = result.getpixel((250, 125))
+    assert red < 30 and green > 225 and blue > 225
+
+
+async def test_rgb_icc_profile_is_kept():
+    profile = ImageCms.ImageCmsProfile(ImageCms.createProfile("sRGB")).tobytes()
+    data = encode(Image.new("RGB", (2000, 1000)), icc_profile=profile)
+
+    result = Image.open(BytesIO(await normalize_input_image(data, 500)))
+
+    assert result.info["icc_profile"] == profile
+
+
+async def test_rejects_invalid_and_oversized_images(monkeypatch):
+    with pytest.raises(APIError) as exc:
+        await normalize_input_image(b"not an image", 1024)
+    assert exc.value.status_code == 400
+    assert exc.value.message == "invalid_image"
+
+    monkeypatch.setattr(image_input, "IMAGE_INPUT_MAX_PIXELS", 100)
+    with pytest.raises(APIError) as exc:
+        await normalize_input_image(encode(Image.new("RGB", (20, 20))), 1024)
+    assert exc.value.message == "image_too_large"
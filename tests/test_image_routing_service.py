@@ -0,0 +1,95 @@
+"""
+이미지 모델 자동 라우팅 (model="auto")
+"""
+import pytest
+
+pytest.importorskip("huggingface_hub")
+
+from app.core import resilience
+from app.core.exceptions import APIError, bad_request
+from app.core.images import GeneratedImage
+from app.services import image_routing_service
+from app.services.image_model_registry import T2I, ImageModelSpec
+
+MODELS = ["model-a", "model-b"]
+
+
+@pytest.fixture
+def models(monkeypatch):
+    """후보 모델 2개와 모델별 동작(outcomes)을 설정하고 호출 순서를 기록"""
+    specs = {model_id: ImageModelSpec(model_id, model_id, "test", T2I) for model_id in MODELS}
+    monkeypatch.setattr(image_routing_service, "IMAGE_MODELS", specs)
+    monkeypatch.setattr(image_routing_service, "IMAGE_AUTO_MODELS", MODELS)
+    monkeypatch.setattr(resilience, "_ewma_stats", {})
+    outcomes, calls = {}, []
+
+    async def generate_images_cached(spec, prompt, base_image, fresh=False, **kwargs):
+        calls.append(spec.id)
+        outcome = outcomes.get(spec.id)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return [GeneratedImage(b"image", "image/png")], False
+
+    monkeypatch.setattr(image_routing_service, "generate_images_cached", generate_images_cached)
+    return specs, outcomes, calls
+
+
+async def test_fails_over_to_next_candidate(models):
+    specs, outcomes, calls = models
+    outcomes["model-a"] = RuntimeError("upstream error")
+
+    images, cached, spec, attempts = await image_routing_service.generate_images_auto("prompt")
+
+    assert spec is specs["model-b"]
+    assert calls == ["model-a", "model-b"]
+    assert [attempt["status"] for attempt in attempts] == ["failed", "succeeded"]
+
+
+async def test_client_errors_are_not_failed_over(models):
+    _, outcomes, calls = models
+    outcomes["model-a"] = bad_request("invalid_prompt")
+
+    with pytest.raises(APIError) as exc:
+        await image_routing_service.generate_images_auto("prompt")
+
+    assert exc.value.status_code == 400
+    assert calls == ["model-a"]
+
+
+async def test_prefers_faster_healthy_model(models):
+    specs, _, calls = models
+    specs["model-a"].health.record_success(30.0)
+    specs["model-b"].health.record_success(2.0)
+
+    _, _, spec, _ = await image_routing_service.generate_images_auto("prompt")
+
+    assert spec is specs["model-b"]
+    assert calls == ["model-b"]
+
+
+async def test_all_models_cooling_down_returns_503_with_retry_after(models):
+    specs, _, calls = models
+    for spec in specs.values():
+        for _ in range(3):
+            spec.health.record_failure()
+
+    with pytest.raises(APIError) as exc:
+        await image_routing_service.generate_images_auto("prompt")
+
+    assert exc.value.status_code == 503
+    assert exc.value.message == "all_models_failed"
+    assert exc.value.data["cooling_down"] == MODELS
+    assert 1 <= int(exc.value.headers["Retry-After"]) <= image_routing_service.IMAGE_AUTO_COOLDOWN
+    assert calls == []
+
+
+async def test_all_candidates_failing_returns_503(models):
+    _, outcomes, _ = models
+    for model_id in MODELS:
+        outcomes[model_id] = RuntimeError("upstream error")
+
+    with pytest.raises(APIError) as exc:
+        await image_routing_service.generate_images_auto("prompt")
+
+    assert exc.value.status_code == 503
+    assert [attempt["model"] for attempt in exc.value.data["attempts"]] == MODELS
@@ -0,0 +1,73 @@
+"""
+생성 이미지 저장소 (content-addressed)
+"""
+import hashlib
+import os
+import time
+from app.core.image_store import ImageStore
+from app.core.images import GeneratedImage
+
+
+def png(payload: bytes) -> GeneratedImage:
+    return GeneratedImage(b"\x89PNG\r\n\x1a\n" + payload, "image/png")
+
+
+async def test_same_bytes_are_stored_once(tmp_path):
+    store = ImageStore(tmp_path, max_bytes=1024)
+    image = png(b"a")
+
+    first = await store.put(image)
+    second = await store.put(png(b"a"))
+
+    assert first == second == hashlib.sha256(image.data).hexdigest()
+    assert len(list(tmp_path.glob("*/*/*.png"))) == 1
+    assert store.stats()["bytes"] == len(image.data)
+
+    stored = await store.read(first)
+    assert stored.data == image.data
+    assert stored.mime_type == "image/png"
+    assert stored.metadata == {"X-Image-Digest": first}
+
+
+async def test_index_is_rebuilt_from_disk(tmp_path):
+    digest = await ImageStore(tmp_path, max_bytes=1024).put(png(b"a"))
+
+    restarted = ImageStore(tmp_path, max_bytes=1024)
+
+    assert (await restarted.read(digest)).data == png(b"a").data
+    assert restarted.stats()["images"] == 1
+
+
+async def test_evicts_least_recently_used_over_limit(tmp_path):
+    size = len(png(b"a").data)
+    store = ImageStore(tmp_path, max_bytes=size * 2)
+    first = await store.put(png(b"a"))
+    second = await store.put(png(b"b"))
+    # first를 최근 사용으로 만들어 second가 먼저 삭제되도록 함
+    store._index[second].last_used = time.time() - 60
+    await store.get(first)
+
+    third = await store.put(png(b"c"))
+
+    assert await store.get(second) is None
+    assert await store.get(first) is not None
+    assert await store.get(third) is not None
+    assert store.stats()["bytes"] == size * 2
+
+
+async def test_keeps_new_image_even_if_larger_than_limit(tmp_path):
+    store = ImageStore(tmp_path, max_bytes=4)
+
+    digest = await store.put(png(b"large"))
+
+    assert await store.get(digest) is not None
+
+
+async def test_missing_file_and_invalid_digest(tmp_path):
+    store = ImageStore(tmp_path, max_bytes=1024)
+    digest = await store.put(png(b"a"))
+    os.remove(store._index[digest].path)
+
+    assert await store.read(digest) is None
+    assert store.stats() == {"images": 0, "bytes": 0, "max_bytes": 1024, "loaded": True}
+    assert await store.read("../../etc/passwd") is None
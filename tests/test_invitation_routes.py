@@ -0,0 +1,74 @@
+"""
+청첩장 문구 추천 기한 초과 처리 (upgrade_id)
+"""
+import asyncio
+import pytest
+from app.core.exceptions import APIError
+from app.routers import invitation_routes
+from app.routers.invitation_routes import InvitationTextRecommendReq
+
+RESULT = {"message": "text_recommended", "data": {"options": [{"main_text": "gemini"}]}}
+
+
+def make_request(**kwargs) -> InvitationTextRecommendReq:
+    return InvitationTextRecommendReq(groom_name="민준", bride_name="서연", wedding_date="2026-05-16", **kwargs)
+
+
+def slow_generation(calls: list, release: asyncio.Event):
+    async def generate():
+        calls.append(1)
+        await release.wait()
+        return RESULT
+    return generate
+
+
+async def test_late_response_gets_opaque_upgrade_id():
+    request = make_request(deadline_ms=10)
+    release = asyncio.Event()
+    calls = []
+
+    result, upgrade_id = await invitation_routes._generate_within_deadline(
+        "text", "cache-key-1", request, slow_generation(calls, release)
+    )
+
+    assert result is None
+    assert upgrade_id != "cache-key-1"
+    assert len(upgrade_id) == 32
+    pending = await invitation_routes.get_invitation_upgrade(upgrade_id)
+    assert pending["data"]["status"] == "pending"
+
+    release.set()
+    await asyncio.wait_for(invitation_routes._pending_upgrades[upgrade_id], 1)
+    ready = await invitation_routes.get_invitation_upgrade(upgrade_id)
+    assert ready["message"] == "upgrade_ready"
+    assert ready["data"]["options"] == RESULT["data"]["options"]
+
+
+async def test_cache_key_is_not_an_upgrade_id():
+    request = make_request(deadline_ms=10)
+    release = asyncio.Event()
+    await invitation_routes._generate_within_deadline("text", "cache-key-2", request, slow_generation([], release))
+    release.set()
+
+    with pytest.raises(APIError) as exc:
+        await invitation_routes.get_invitation_upgrade("cache-key-2")
+    assert exc.value.status_code == 404
+
+
+async def test_identical_requests_share_generation_but_regenerate_starts_fresh():
+    release = asyncio.Event()
+    calls = []
+    factory = slow_generation(calls, release)
+
+    first = asyncio.create_task(invitation_routes._generate_within_deadline("text", "cache-key-3", make_request(deadline_ms=0), factory))
+    await asyncio.sleep(0)
+    second = asyncio.create_task(invitation_routes._generate_within_deadline("text", "cache-key-3", make_request(deadline_ms=0), factory))
+    await asyncio.sleep(0)
+    fresh = asyncio.create_task(invitation_routes._generate_within_deadline(
+        "text", "cache-key-3", make_request(deadline_ms=0, regenerate=True), factory
+    ))
+    await asyncio.sleep(0)
+    release.set()
+    await asyncio.gather(first, second, fresh)
+
+    assert len(calls) == 2
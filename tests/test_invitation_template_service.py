@@ -0,0 +1,59 @@
+"""
+로컬 청첩장 문구 생성기
+"""
+from types import SimpleNamespace
+from app.services.invitation_template_service import (
+    DEFAULT_STYLE_DESC,
+    generate_local_options,
+    generate_local_tones,
+    style_description,
+)
+
+
+def make_request(**kwargs):
+    fields = {
+        "groom_name": "민준", "bride_name": "서연", "wedding_date": "2026-05-16",
+        "wedding_time": "12:30", "wedding_location": "더채플", "style": "MODERN",
+        "groom_father_name": "김철수", "groom_mother_name": None,
+        "bride_father_name": None, "bride_mother_name": "박영희",
+    }
+    fields.update(kwargs)
+    return SimpleNamespace(**fields)
+
+
+def test_same_request_gives_same_options():
+    assert generate_local_options(make_request()) == generate_local_options(make_request())
+    assert generate_local_options(make_request()) != generate_local_options(make_request(bride_name="지우"))
+
+
+def test_options_have_text_recommend_shape():
+    options = generate_local_options(make_request(), count=5)
+
+    assert len(options) == 5
+    assert len({option["main_text"] for option in options}) == 5
+    assert options[0]["groom_father"] == "김철수"
+    assert options[0]["groom_mother"] == ""
+    assert options[0]["wedding_info"] == "2026-05-16\n12:30\n더채플"
+
+
+def test_tones_cover_five_tones():
+    tones = generate_local_tones(make_request())
+
+    assert len(tones) == 5
+    assert len({tone["tone"] for tone in tones}) == 5
+    assert all(tone["main_text"] and tone["closing"] for tone in tones)
+
+
+def test_name_particle_follows_final_consonant():
+    texts = " ".join(
+        option["main_text"] for name in ("민준", "지우")
+        for option in generate_local_options(make_request(groom_name=name), count=20)
+    )
+
+    assert "민준와" not in texts
+    assert "지우과" not in texts
+
+
+def test_unknown_style_uses_default_description():
+    assert style_description("UNKNOWN") == DEFAULT_STYLE_DESC
+    assert style_description(None) == DEFAULT_STYLE_DESC
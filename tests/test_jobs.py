@@ -0,0 +1,138 @@
+"""
+비동기 작업 큐 (JobManager)
+"""
+import asyncio
+import json
+import time
+import pytest
+from app.core import jobs
+from app.core.exceptions import APIError
+from app.core.jobs import FAILED, QUEUED, SUCCEEDED, Job, JobManager, report_progress
+
+
+def make_manager(tmp_path, **kwargs) -> JobManager:
+    options = {"workers": 1, "max_queue": 4, "ttl": 60}
+    options.update(kwargs)
+    return JobManager("test", directory=tmp_path, **options)
+
+
+async def wait_finished(manager: JobManager, job_id: str) -> dict:
+    async for event in manager.subscribe(job_id, poll_interval=0.01):
+        pass
+    return await manager.snapshot(job_id)
+
+
+async def test_runs_job_and_persists_result(tmp_path):
+    manager = make_manager(tmp_path)
+
+    async def work():
+        report_progress("text", content="진행 중")
+        return {"value": 1}
+
+    job = await manager.submit("generate", work, meta={"model": "sdxl"})
+    events = [event async for event in manager.subscribe(job.id)]
+
+    assert [e["type"] for e in events] == ["status", "status", "text", "result", "status"]
+    saved = json.loads((tmp_path / f"{job.id}.json").read_text(encoding="utf-8"))
+    assert saved["status"] == SUCCEEDED
+    assert saved["result"] == {"value": 1}
+    assert saved["model"] == "sdxl"
+    await manager.close()
+
+
+async def test_rejects_when_queue_is_full(tmp_path):
+    manager = make_manager(tmp_path, workers=0, max_queue=1)
+
+    await manager.submit("generate", asyncio.sleep)
+    with pytest.raises(APIError) as exc:
+        await manager.submit("generate", asyncio.sleep)
+
+    assert exc.value.status_code == 503
+    assert exc.value.message == "job_queue_full"
+
+
+async def test_prunes_finished_jobs_after_ttl(tmp_path, monkeypatch):
+    manager = make_manager(tmp_path, ttl=10)
+
+    async def work():
+        return {}
+
+    job = await manager.submit("generate", work)
+    await wait_finished(manager, job.id)
+    now = time.time()
+    monkeypatch.setattr(jobs.time, "time", lambda: now + 11)
+
+    assert manager.get(job.id) is None
+    assert not (tmp_path / f"{job.id}.json").exists()
+    await manager.close()
+
+
+async def test_other_process_follows_snapshot(tmp_path):
+    manager = make_manager(tmp_path)
+    other = make_manager(tmp_path)
+    release = asyncio.Event()
+
+    async def work():
+        await release.wait()
+        return {"value": 2}
+
+    job = await manager.submit("generate", work)
+    follower = asyncio.create_task(wait_finished(other, job.id))
+    await asyncio.sleep(0.05)
+    release.set()
+    snapshot = await asyncio.wait_for(follower, 2)
+
+    assert snapshot["status"] == SUCCEEDED
+    assert snapshot["result"] == {"value": 2}
+    await manager.close()
+
+
+async def test_close_fails_unfinished_jobs(tmp_path):
+    manager = make_manager(tmp_path)
+    started = asyncio.Event()
+
+    async def work():
+        started.set()
+        await asyncio.sleep(10)
+
+    running = await manager.submit("generate", work)
+    queued = await manager.submit("generate", work)
+    await started.wait()
+    await manager.close()
+
+    other = make_manager(tmp_path)
+    assert (await other.snapshot(running.id))["error"] == {"message": "job_cancelled"}
+    assert (await other.snapshot(queued.id))["status"] == FAILED
+    assert (await other.snapshot(queued.id))["error"] == {"message": "server_shutdown"}
+
+
+async def test_stale_unfinished_snapshot_is_treated_as_failed(tmp_path):
+    job_id = "a" * 32
+    (tmp_path / f"{job_id}.json").write_text(json.dumps({
+        "job_id": job_id, "status": QUEUED, "created_at": time.time() - 120, "finished_at": None,
+    }))
+    manager = make_manager(tmp_path, stale_after=60, ttl=3600)
+
+    snapshot = await asyncio.wait_for(wait_finished(manager, job_id), 2)
+
+    assert snapshot["status"] == FAILED
+    assert snapshot["error"] == {"message": "job_lost"}
+
+    # 실패로 본 시점에서 ttl이 지나면 파일도 삭제
+    expired = make_manager(tmp_path, stale_after=60, ttl=30)
+    assert await expired.snapshot(job_id) is None
+    assert not (tmp_path / f"{job_id}.json").exists()
+
+
+def test_progress_events_are_capped(monkeypatch):
+    monkeypatch.setattr(Job, "MAX_PROGRESS_EVENTS", 3)
+    job = Job("generate", None)
+
+    job.emit("status", status=QUEUED)
+    for i in range(10):
+        job.emit("text", content=str(i))
+    job.emit("status", status=SUCCEEDED)
+
+    assert [e.get("content") for e in job.events if e["type"] == "text"] == ["7", "8", "9"]
+    assert [e["type"] for e in job.events].count("status") == 2
+    assert job.events[-1]["seq"] == 11
@@ -0,0 +1,72 @@
+"""
+LLM 스트리밍 응답용 증분 JSON 파서
+"""
+import json
+from app.core.json_stream import JsonArrayStreamParser
+
+OPTIONS = [
+    {"main_text": "두 사람이 {하나}가 됩니다", "closing": "와 주세요 [꼭]"},
+    {"main_text": "따옴표 \"인용\"과 역슬래시 \\ 포함", "closing": "감사합니다"},
+    {"main_text": "세 번째", "closing": "}]{["},
+]
+
+
+def feed_all(parser: JsonArrayStreamParser, chunks) -> list:
+    items = []
+    for chunk in chunks:
+        items.extend(parser.feed(chunk))
+    return items
+
+
+def test_skips_markdown_fence_and_trailing_text():
+    text = "다음은 추천 문구입니다.\n```json\n" + json.dumps({"options": OPTIONS}, ensure_ascii=False) + "\n```\n설명 끝"
+    parser = JsonArrayStreamParser()
+
+    assert feed_all(parser, [text]) == OPTIONS
+    assert parser.done
+    assert parser.result() == {"options": OPTIONS}
+
+
+def test_braces_and_escapes_inside_strings_are_not_structure():
+    parser = JsonArrayStreamParser()
+
+    items = feed_all(parser, [json.dumps({"options": OPTIONS}, ensure_ascii=False)])
+
+    assert items == OPTIONS
+    assert parser.emitted == 3
+
+
+def test_items_are_emitted_as_soon_as_they_close_across_split_chunks():
+    text = json.dumps({"options": OPTIONS}, ensure_ascii=False)
+    parser = JsonArrayStreamParser()
+    emitted_at = []
+
+    for index, char in enumerate(text):
+        for item in parser.feed(char):
+            emitted_at.append((index, item))
+
+    assert [item for _, item in emitted_at] == OPTIONS
+    # 첫 원소는 전체 응답이 끝나기 전에 나옴
+    assert emitted_at[0][0] < len(text) - 1
+
+
+def test_only_target_array_items_are_emitted():
+    payload = {"meta": [{"ignored": True}], "options": [{"nested": {"list": [{"deep": 1}]}}]}
+    parser = JsonArrayStreamParser()
+
+    assert feed_all(parser, [json.dumps(payload)]) == [{"nested": {"list": [{"deep": 1}]}}]
+
+
+def test_root_array_and_custom_key():
+    assert feed_all(JsonArrayStreamParser(), ['[{"a": 1}, ', '{"b": 2}]']) == [{"a": 1}, {"b": 2}]
+    assert feed_all(JsonArrayStreamParser("tones"), ['{"tones": [{"tone": "polite"}]}']) == [{"tone": "polite"}]
+
+
+def test_incomplete_response_has_no_result():
+    parser = JsonArrayStreamParser()
+
+    items = feed_all(parser, ['{"options": [{"a": 1}, {"b": '])
+
+    assert items == [{"a": 1}]
+    assert not parser.done
+    assert parser.result() is None
@@ -0,0 +1,86 @@
+"""
+서킷 브레이커와 헤지 요청
+"""
+import asyncio
+import pytest
+from app.core.resilience import CircuitBreaker, HedgeSkipped, hedged_call
+
+
+def attempt(result=None, error: Exception = None, delay: float = 0.0):
+    async def run():
+        await asyncio.sleep(delay)
+        if error is not None:
+            raise error
+        return result
+    return run
+
+
+async def test_hedge_wins_when_primary_is_slow():
+    result = await hedged_call(attempt("primary", delay=1), 0.01, hedge_factory=attempt("hedge"))
+
+    assert result == "hedge"
+
+
+async def test_no_hedge_without_delay():
+    hedges = []
+
+    async def hedge():
+        hedges.append(1)
+        return "hedge"
+
+    result = await hedged_call(attempt("primary", delay=0.02), None, hedge_factory=hedge)
+
+    assert result == "primary"
+    assert hedges == []
+
+
+async def test_skipped_hedge_waits_for_primary():
+    result = await hedged_call(attempt("primary", delay=0.05), 0.01, hedge_factory=attempt(error=HedgeSkipped()))
+
+    assert result == "primary"
+
+
+async def test_hedge_error_does_not_replace_primary_result():
+    hedge_error = RuntimeError("hedge rejected")
+    result = await hedged_call(attempt("primary", delay=0.05), 0.01, hedge_factory=attempt(error=hedge_error))
+
+    assert result == "primary"
+
+
+async def test_primary_error_is_raised_when_both_fail():
+    with pytest.raises(ValueError):
+        await hedged_call(
+            attempt(error=ValueError("primary"), delay=0.05),
+            0.01,
+            hedge_factory=attempt(error=RuntimeError("hedge")),
+        )
+
+
+async def test_losing_attempt_is_cancelled():
+    cancelled = asyncio.Event()
+
+    async def slow():
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    assert await hedged_call(slow, 0.01, hedge_factory=attempt("hedge")) == "hedge"
+    await asyncio.wait_for(cancelled.wait(), 1)
+
+
+def test_breaker_opens_and_allows_one_probe():
+    breaker = CircuitBreaker("test", failure_threshold=2, reset_timeout=0)
+
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+
+    # reset_timeout이 지나면 half-open에서 시험 호출 1건만 허용
+    assert breaker.allow()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert not breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
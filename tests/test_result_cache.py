@@ -0,0 +1,88 @@
+"""
+생성 결과 캐시 (메모리 LRU + 디스크)
+"""
+import os
+import time
+from app.core import result_cache
+from app.core.result_cache import ResultCache
+
+
+def make_cache(tmp_path, **kwargs) -> ResultCache:
+    options = {"ttl": 60, "max_entries": 2, "max_disk_entries": 10, "directory": tmp_path}
+    options.update(kwargs)
+    return ResultCache("test", **options)
+
+
+async def test_memory_only_cache_evicts_least_recently_used():
+    cache = ResultCache("test", ttl=60, max_entries=2)
+
+    await cache.set("a", 1)
+    await cache.set("b", 2)
+    assert await cache.get("a") == 1
+    await cache.set("c", 3)
+
+    assert await cache.get("b") is None
+    assert await cache.get("a") == 1
+    assert cache.directory is None
+
+
+async def test_memory_entries_expire_after_ttl(monkeypatch):
+    cache = ResultCache("test", ttl=60, max_entries=2)
+    now = time.time()
+
+    await cache.set("a", {"value": 1})
+    monkeypatch.setattr(result_cache.time, "time", lambda: now + 61)
+
+    assert await cache.get("a") is None
+
+
+async def test_disk_tier_survives_restart(tmp_path):
+    await make_cache(tmp_path).set("ab12", {"text": "문구"})
+
+    restarted = make_cache(tmp_path)
+
+    assert await restarted.get("ab12") == {"text": "문구"}
+    assert (tmp_path / "ab" / "ab12.json").exists()
+
+
+async def test_expired_disk_entries_are_deleted_on_read(tmp_path, monkeypatch):
+    await make_cache(tmp_path).set("ab12", 1)
+    now = time.time()
+    monkeypatch.setattr(result_cache.time, "time", lambda: now + 61)
+
+    assert await make_cache(tmp_path).get("ab12") is None
+    assert not (tmp_path / "ab" / "ab12.json").exists()
+
+
+async def test_prune_removes_expired_and_oldest_entries(tmp_path):
+    cache = make_cache(tmp_path, max_disk_entries=2)
+    now = time.time()
+    for key, age in [("aa01", 70), ("bb02", 40), ("cc03", 30), ("dd04", 20)]:
+        await cache.set(key, age)
+        os.utime(cache._path(key), (now - age, now - age))
+    # aa01은 TTL(60초)보다 오래됨 → 만료, 남은 3개 중 가장 오래된 bb02 삭제
+
+    cache._prune_disk()
+
+    remaining = sorted(path.stem for path in tmp_path.glob("*/*.json"))
+    assert remaining == ["cc03", "dd04"]
+
+
+async def test_prune_runs_every_n_disk_writes(tmp_path, monkeypatch):
+    cache = make_cache(tmp_path, max_disk_entries=3)
+    monkeypatch.setattr(ResultCache, "_prune_every", 5)
+
+    for index in range(5):
+        await cache.set(f"k{index:03d}", index)
+
+    assert len(list(tmp_path.glob("*/*.json"))) == 3
+
+
+async def test_invalidate_removes_both_tiers(tmp_path):
+    cache = make_cache(tmp_path)
+    await cache.set("ab12", 1)
+
+    cache.invalidate("ab12")
+
+    assert await make_cache(tmp_path).get("ab12") is None
+    assert await cache.get("ab12") is None
@@ -0,0 +1,83 @@
+"""
+동일 요청 단일 실행 (single-flight)
+"""
+import asyncio
+import pytest
+from app.core.singleflight import SingleFlight, canonical_key
+
+
+def test_canonical_key_ignores_dict_order():
+    assert canonical_key("m", {"a": 1, "b": 2}) == canonical_key("m", {"b": 2, "a": 1})
+    assert canonical_key("m", {"a": 1}) != canonical_key("m", {"a": 2})
+
+
+async def test_concurrent_calls_share_one_upstream_call():
+    flight = SingleFlight("test")
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "result"
+
+    results = await asyncio.gather(*(flight.do("key", fetch) for _ in range(5)))
+
+    assert results == ["result"] * 5
+    assert calls == [1]
+    assert flight.stats() == {"in_flight": 0, "waiters": 0}
+
+
+async def test_errors_are_shared_and_not_cached():
+    flight = SingleFlight("test")
+    calls = []
+
+    async def fail():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        raise ValueError("upstream failed")
+
+    results = await asyncio.gather(*(flight.do("key", fail) for _ in range(3)), return_exceptions=True)
+    assert all(isinstance(result, ValueError) for result in results)
+
+    # 끝난 호출은 재사용하지 않음
+    with pytest.raises(ValueError):
+        await flight.do("key", fail)
+    assert len(calls) == 2
+
+
+async def test_cancelling_one_waiter_keeps_the_call_for_others():
+    flight = SingleFlight("test")
+    release = asyncio.Event()
+
+    async def fetch():
+        await release.wait()
+        return "result"
+
+    first = asyncio.create_task(flight.do("key", fetch))
+    second = asyncio.create_task(flight.do("key", fetch))
+    await asyncio.sleep(0)
+    first.cancel()
+    await asyncio.sleep(0)
+    release.set()
+
+    assert await second == "result"
+    with pytest.raises(asyncio.CancelledError):
+        await first
+
+
+async def test_cancelling_every_waiter_cancels_the_call():
+    flight = SingleFlight("test")
+    cancelled = asyncio.Event()
+
+    async def fetch():
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    waiter = asyncio.create_task(flight.do("key", fetch))
+    await asyncio.sleep(0)
+    waiter.cancel()
+
+    await asyncio.wait_for(cancelled.wait(), 1)
@@ -0,0 +1,82 @@
+"""
+스트리밍 출력 병합과 백프레셔 (CoalescingStream)
+"""
+import asyncio
+import json
+import pytest
+from app.core.streaming import CoalescingStream, SlowConsumerError, ndjson_stream
+
+
+async def events(*items, delay: float = 0.0):
+    for item in items:
+        if delay:
+            await asyncio.sleep(delay)
+        yield item
+
+
+def content(text: str) -> dict:
+    return {"type": "content", "content": text}
+
+
+async def collect(stream) -> list:
+    return [batch async for batch in stream]
+
+
+async def test_merges_consecutive_content_and_keeps_control_events():
+    source = events({"type": "start"}, content("a"), content("b"), content("c"), {"type": "end"})
+
+    batches = await collect(CoalescingStream(source, max_delay=0.05))
+
+    flat = [event for batch in batches for event in batch]
+    assert flat[0] == {"type": "start"}
+    assert flat[-1] == {"type": "end"}
+    assert "".join(e["content"] for e in flat if e["type"] == "content") == "abc"
+    # 첫 content는 병합을 기다리지 않고 바로 전달되고, 나머지는 병합됨
+    assert len(flat) < 5
+
+
+async def test_flushes_when_batch_reaches_max_bytes():
+    source = events(*(content("x" * 10) for _ in range(6)))
+
+    batches = await collect(CoalescingStream(source, max_bytes=20, max_delay=1))
+
+    sizes = [len(batch[0]["content"]) for batch in batches]
+    assert sum(sizes) == 60
+    assert max(sizes) <= 30
+
+
+async def test_stalled_consumer_gets_slow_consumer_error():
+    source = events(*(content(str(i)) for i in range(20)))
+    stream = CoalescingStream(source, max_buffer=1, stall_timeout=0.05, max_delay=0)
+    batches = stream.__aiter__()
+
+    await batches.__anext__()
+    # 소비자가 읽지 않는 동안 버퍼가 가득 찬 상태로 stall_timeout이 지남
+    await asyncio.sleep(0.2)
+
+    with pytest.raises(SlowConsumerError):
+        async for _ in batches:
+            pass
+
+
+async def test_upstream_error_is_raised_after_buffered_events():
+    async def failing():
+        yield content("a")
+        raise RuntimeError("upstream failed")
+
+    received = []
+    with pytest.raises(RuntimeError):
+        async for batch in CoalescingStream(failing()):
+            received.extend(batch)
+    assert received == [content("a")]
+
+
+async def test_ndjson_stream_reports_slow_consumer_as_error_line():
+    source = events(*(content(str(i)) for i in range(20)))
+    chunks = ndjson_stream(source, max_buffer=1, stall_timeout=0.05, max_delay=0)
+
+    await chunks.__anext__()
+    await asyncio.sleep(0.2)
+    lines = [json.loads(line) for chunk in [c async for c in chunks] for line in chunk.splitlines()]
+
+    assert lines[-1]["type"] == "error"
@@ -0,0 +1,91 @@
+"""
+multipart 업로드 파싱 크기 제한
+"""
+import pytest
+from starlette.requests import Request
+from app.core.exceptions import APIError
+from app.core.uploads import parse_image_form
+
+BOUNDARY = "test-boundary"
+
+
+def multipart_body(fields: dict, files: dict) -> bytes:
+    parts = []
+    for name, value in fields.items():
+        parts.append(
+            f'--{BOUNDARY}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode()
+        )
+    for name, data in files.items():
+        parts.append(
+            f'--{BOUNDARY}\r\nContent-Disposition: form-data; name="{name}"; filename="{name}.jpg"\r\n'
+            f"Content-Type: image/jpeg\r\n\r\n".encode() + data + b"\r\n"
+        )
+    parts.append(f"--{BOUNDARY}--\r\n".encode())
+    return b"".join(parts)
+
+
+def make_request(body: bytes, content_length: bool = True, chunk_size: int = 1024) -> Request:
+    headers = [(b"content-type", f"multipart/form-data; boundary={BOUNDARY}".encode())]
+    if content_length:
+        headers.append((b"content-length", str(len(body)).encode()))
+    chunks = [body[i:i + chunk_size] for i in range(0, len(body), chunk_size)] or [b""]
+
+    async def receive():
+        chunk = chunks.pop(0) if chunks else b""
+        return {"type": "http.request", "body": chunk, "more_body": bool(chunks)}
+
+    scope = {"type": "http", "method": "POST", "path": "/", "headers": headers, "query_string": b""}
+    return Request(scope, receive)
+
+
+async def test_parses_fields_and_files():
+    body = multipart_body({"prompt": "a cat"}, {"base_image": b"x" * 100})
+
+    form = await parse_image_form(make_request(body), max_file_bytes=1000, max_files=2)
+
+    assert form.value("prompt") == "a cat"
+    assert form.file("base_image") == b"x" * 100
+
+
+async def test_oversized_file_is_rejected_with_413():
+    # 전체 본문 한도(파일 수 x 파일 크기 + 여유분) 안이지만 파일 하나가 한도를 넘는 경우
+    body = multipart_body({"prompt": "a cat"}, {"base_image": b"x" * 5000})
+
+    with pytest.raises(APIError) as exc_info:
+        await parse_image_form(make_request(body, content_length=False), max_file_bytes=1000, max_files=5)
+
+    assert exc_info.value.status_code == 413
+    assert exc_info.value.message == "file_too_large"
+
+
+async def test_oversized_body_is_rejected_before_reading():
+    body = multipart_body({}, {"base_image": b"x" * 200_000})
+
+    with pytest.raises(APIError) as exc_info:
+        await parse_image_form(make_request(body), max_file_bytes=1000, max_files=1)
+
+    assert exc_info.value.status_code == 413
+    assert exc_info.value.message == "request_too_large"
+
+
+async def test_rejects_non_multipart_request():
+    request = Request({"type": "http", "method": "POST", "path": "/", "headers": [], "query_string": b""})
+
+    with pytest.raises(APIError) as exc_info:
+        await parse_image_form(request)
+
+    assert exc_info.value.status_code == 400
+
+
+async def test_file_limit_holds_when_streaming_check_is_bypassed(monkeypatch):
+    # Starlette 내부 콜백 이름이 바뀌어 읽는 도중 검사가 호출되지 않는 상황
+    from starlette.formparsers import MultiPartParser
+    from app.core import uploads
+    monkeypatch.setattr(uploads._LimitedMultiPartParser, "on_part_data", MultiPartParser.on_part_data)
+    body = multipart_body({}, {"base_image": b"x" * 5000})
+
+    with pytest.raises(APIError) as exc_info:
+        await parse_image_form(make_request(body), max_file_bytes=1000, max_files=5)
+
+    assert exc_info.value.status_code == 413
+    assert exc_info.value.message == "file_too_large"